@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Quản lý ảnh dùng chung cho toàn bộ game.
+
+Mỗi ảnh chỉ được decode, convert() và scale MỘT lần rồi giữ lại trong bộ nhớ,
+thay vì gọi pygame.image.load ở mỗi frame như trước.
+"""
+
+import os
+from collections import OrderedDict
+
+import pygame
+
+import config
+
+
+class AssetManager:
+    """
+    Cache ảnh theo khóa (path, size, alpha) với giới hạn LRU.
+
+    - path  : đường dẫn tuyệt đối tới file ảnh
+    - size  : (w, h) cần scale, hoặc None để giữ kích thước gốc
+    - alpha : True -> convert_alpha(), False -> convert()
+    """
+
+    def __init__(self, max_items=128):
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _make_key(self, path, size, alpha, smooth):
+        size = tuple(int(v) for v in size) if size else None
+        return (os.path.normpath(path), size, bool(alpha), bool(smooth))
+
+    def _load(self, path, size, alpha, smooth):
+        image = pygame.image.load(path)
+        # convert() chỉ dùng được khi đã có cửa sổ hiển thị
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if alpha else image.convert()
+        if size and image.get_size() != size:
+            if smooth:
+                image = pygame.transform.smoothscale(image, size)
+            else:
+                image = pygame.transform.scale(image, size)
+        return image
+
+    def get(self, path, size=None, alpha=True, smooth=False):
+        """
+        Lấy ảnh đã xử lý từ cache (load nếu chưa có).
+
+        Returns:
+            pygame.Surface hoặc None nếu không load được (kết quả lỗi cũng được
+            cache để không thử lại mỗi frame, gọi invalidate() để thử lại).
+        """
+        key = self._make_key(path, size, alpha, smooth)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        try:
+            image = self._load(key[0], key[1], alpha, smooth)
+        except (pygame.error, FileNotFoundError, OSError) as e:
+            print(f"⚠️ Không thể load ảnh {path}: {e}")
+            image = None
+
+        self._cache[key] = image
+        while len(self._cache) > self.max_items:
+            self._cache.popitem(last=False)
+        return image
+
+    def get_setting(self, name, size=None, alpha=True, smooth=False):
+        """Lối tắt cho ảnh trong thư mục assets/tai_nguyen/setting"""
+        return self.get(os.path.join(config.ASSETS_DIR, "setting", name), size, alpha, smooth)
+
+    def preload(self, entries):
+        """
+        Load trước danh sách ảnh lúc khởi động.
+
+        Args:
+            entries: iterable các tuple (path, size) hoặc (path, size, alpha)
+        """
+        for entry in entries:
+            self.get(*entry)
+
+    def invalidate(self, path=None):
+        """Xóa mọi biến thể (mọi size/alpha) của một ảnh, hoặc toàn bộ cache nếu path=None"""
+        if path is None:
+            self._cache.clear()
+            return
+        norm = os.path.normpath(path)
+        for key in [k for k in self._cache if k[0] == norm]:
+            del self._cache[key]
+
+    def get_cache_info(self):
+        """Thông tin cache để debug"""
+        return {
+            "items": len(self._cache),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Instance dùng chung cho toàn bộ process
+assets = AssetManager()
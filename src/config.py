@@ -121,6 +121,7 @@ ASSETS_DIR = get_resource_path('assets/tai_nguyen')
 
 # Các file RESOURCE (không thay đổi) - sử dụng get_resource_path
 FONT_PATH = get_resource_path('assets/tai_nguyen/Roboto.ttf')
+SVN_FONT_PATH = get_resource_path('assets/tai_nguyen/font/svn.otf')
 ICON_PATH = get_resource_path('assets/tai_nguyen/icon.ico')
 ICON_DIR = get_resource_path('assets/tai_nguyen/NotoColorEmoji.ttf')
 DEFAULT_DIR = get_resource_path('assets/tai_nguyen/setting/default_avatar.png')
@@ -142,11 +143,52 @@ SOUND_WRONG_PATH = get_resource_path('assets/tai_nguyen/audio/error.wav')
 DATA_FILE_PATH = get_data_path('data/game_data.json')
 QUIZ_DATA_FILE_PATH = get_data_path('data/quiz.json')
 LESSON_DATA_FILE_PATH = get_data_path('data/lessons.json')
+# Phân trang bài học đã tính sẵn (đi kèm lessons.json)
+LESSON_PAGES_FILE_PATH = get_data_path('data/lessons.pages.json')
 
 BUNDLED_GAME_DATA_PATH = get_resource_path('assets/tai_nguyen/game_data.json')
 BUNDLED_QUIZ_DATA_PATH = get_resource_path('assets/tai_nguyen/quiz.json')
 BUNDLED_LESSON_DATA_PATH = get_resource_path('assets/tai_nguyen/lessons.json')
 
+# Khoảng thời gian tối thiểu (giây) giữa 2 lần ghi game_data.json.
+# Các thay đổi trong khoảng này được gộp lại thành một lần ghi.
+SAVE_INTERVAL = 5.0
+
+# Cache kết quả sinh bài học/quiz bằng AI (theo nội dung file + cấu hình)
+GENERATION_CACHE_DIR = get_data_path('data/generation_cache')
+# Tổng dung lượng cache trên đĩa, chia cho 2 cache: cả tài liệu và từng chunk
+# (data/generation_cache/chunks)
+GENERATION_CACHE_MAX_BYTES = 50 * 1024 * 1024
+GENERATION_CHUNK_CACHE_MAX_BYTES = 30 * 1024 * 1024
+
+# Gemini API: gốc URL (đặt biến môi trường GEMINI_API_BASE để trỏ tới server giả lập)
+# và số request sinh bài học chạy song song
+GEMINI_API_BASE = os.environ.get('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MAX_CONCURRENCY = 6
+
+# Hạn mức Gemini API (gói miễn phí của gemini-2.0-flash), dùng cho bộ giới hạn tốc độ
+GEMINI_REQUESTS_PER_MINUTE = 15
+GEMINI_TOKENS_PER_MINUTE = 1000000
+
+# Gộp nhiều chunk vào một request: giới hạn token đầu vào và số bài mỗi request
+# (GEMINI_BATCH_MAX_LESSONS = 1 để tắt chế độ gộp)
+GEMINI_BATCH_TOKEN_BUDGET = 6000
+GEMINI_BATCH_MAX_LESSONS = 4
+
+# Gửi responseSchema để Gemini trả về JSON đúng cấu trúc bài học
+GEMINI_STRUCTURED_OUTPUT = True
+
+# Độ tương đồng (Jaccard ước lượng bằng MinHash) để coi 2 câu hỏi là gần trùng
+QUESTION_SIMILARITY_THRESHOLD = 0.8
+
+# File lớn hơn ngưỡng này được đọc theo stream (bộ nhớ không phụ thuộc độ dài);
+# mỗi chunk chỉ giữ lại chừng này ký tự đầu để đưa vào prompt
+STREAM_INGEST_MIN_BYTES = 1024 * 1024
+STREAM_CHUNK_RETAIN_CHARS = 8000
+
+# Số process tối đa khi trích xuất text PDF song song
+PDF_EXTRACT_MAX_WORKERS = 4
+
 
 # Tùy chọn 2: Lưu trong user data folder (tốt hơn cho multi-user)
 # Uncomment các dòng dưới và comment các dòng trên nếu muốn dùng
@@ -187,10 +229,64 @@ def load_icon_safely(icon_path):
         icon.fill((255, 255, 255))
         return icon
 
+# ===============================
+# FONT REGISTRY (mỗi cặp font/size chỉ tạo MỘT lần)
+# ===============================
+
+_font_registry = {}
+_font_registry_stats = {"hits": 0, "misses": 0}
+
+def get_font(font_path, size):
+    """
+    Lấy pygame Font dùng chung cho (font_path, size).
+    font_path=None -> font mặc định của pygame.
+    """
+    key = (os.path.normpath(font_path) if font_path else None, int(size))
+    font = _font_registry.get(key)
+    if font is not None:
+        _font_registry_stats["hits"] += 1
+        return font
+    _font_registry_stats["misses"] += 1
+    if font_path:
+        font = load_font_safely(font_path, int(size))
+    else:
+        font = pygame.font.Font(None, int(size))
+    _font_registry[key] = font
+    return font
+
+def describe_font(font):
+    """Khóa (file font, size) của font trong registry, dùng làm khóa cache bền vững"""
+    for key, registered in _font_registry.items():
+        if registered is font:
+            if key[0] == "sysfont":
+                return list(key)
+            return [os.path.basename(key[0]) if key[0] else None, key[1]]
+    return ["unregistered", font.get_height()]
+
+def get_sys_font(name, size, bold=False, italic=False):
+    """Giống get_font nhưng cho pygame.font.SysFont"""
+    key = ("sysfont", name, int(size), bool(bold), bool(italic))
+    font = _font_registry.get(key)
+    if font is not None:
+        _font_registry_stats["hits"] += 1
+        return font
+    _font_registry_stats["misses"] += 1
+    font = pygame.font.SysFont(name, int(size), bold=bold, italic=italic)
+    _font_registry[key] = font
+    return font
+
+def get_font_registry_info():
+    """Số font đang sống trong registry, dùng để kiểm tra không có font bị tạo lại liên tục"""
+    return {
+        "live_fonts": len(_font_registry),
+        "hits": _font_registry_stats["hits"],
+        "misses": _font_registry_stats["misses"],
+    }
+
 # Khởi tạo font
-FONT_SMALL = load_font_safely(FONT_PATH, 22)
-FONT = load_font_safely(FONT_PATH, 26)
-FONT_TITLE = load_font_safely(FONT_PATH, 47)
+FONT_SMALL = get_font(FONT_PATH, 22)
+FONT = get_font(FONT_PATH, 26)
+FONT_TITLE = get_font(FONT_PATH, 47)
 
 # Khởi tạo icon
 ICON = load_icon_safely(ICON_PATH)
@@ -217,6 +313,43 @@ SCREEN_QUIZ_HARD = "quiz_hard"
 SCREEN_EXERCISE = "exercise"
 SCREEN_EXERCISE_QUIZ = "exercise_quiz"
 
+# ===============================
+# PYGAME EVENT TỰ ĐỊNH NGHĨA
+# ===============================
+
+EVENT_FORCE_REDRAW = pygame.USEREVENT
+EVENT_EXERCISE_TRANSITION = pygame.USEREVENT + 1  # tự chuyển câu trong bài tập
+EVENT_QUIZ_RELOAD = pygame.USEREVENT + 2          # nạp lại dữ liệu quiz
+EVENT_FILE_CHANGED = pygame.USEREVENT + 3         # file dữ liệu đổi nội dung (file_watcher)
+
+# Chu kỳ kiểm tra file dữ liệu (giây) khi không dùng được inotify
+FILE_WATCH_POLL_INTERVAL = 2.0
+
+# ===============================
+# CHẾ ĐỘ VẼ (DIRTY RECT)
+# ===============================
+
+# Bật để chỉ vẽ lại các vùng thay đổi (hover, HUD, hiệu ứng) thay vì cả màn hình.
+# Chỉ áp dụng cho các màn hình gần như tĩnh bên dưới, các màn hình khác vẫn flip toàn bộ.
+DIRTY_RECT_RENDERING = False
+DIRTY_RECT_SCREENS = {
+    SCREEN_LESSON,
+    SCREEN_SHOP,
+    SCREEN_ACCOUNT,
+    SCREEN_KNOWLEDGE_PAGE,
+}
+
+# ===============================
+# TỐC ĐỘ KHUNG HÌNH
+# ===============================
+
+# FPS tối đa khi đang có thao tác hoặc hiệu ứng động
+TARGET_FPS = 60
+# FPS khi không có input và không có hiệu ứng nào đang chạy
+IDLE_FPS = 5
+# Số giây không có input trước khi chuyển sang chế độ idle
+IDLE_AFTER_SECONDS = 2.0
+
 # ===============================
 # BẢNG MÀU
 # ===============================
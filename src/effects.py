@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Sprite dựng sẵn cho các hiệu ứng vẽ thủ công (huy chương, khung thành tựu,
+ngôi sao lấp lánh, hào quang gem).
+
+Trước đây account_screen vẽ bóng và gradient huy chương từng vòng bằng gfxdraw,
+khung thành tựu tạo lại các lớp glow và font.render lại chữ mỗi frame, còn
+collection_screen cấp phát 6 surface glow + 8 surface tia sáng kích thước đầy
+đủ mỗi frame. Ở đây mỗi hiệu ứng được vẽ một lần vào surface SRCALPHA và giữ
+lại; chuyển động chỉ còn là chọn khung dựng sẵn (nhịp phóng to, góc xoay lượng
+tử hóa) và đổi alpha của sprite bằng set_alpha() trước khi blit.
+
+Sprite thuộc riêng cache này (kể cả chữ, không dùng chung với text_cache) nên
+đổi alpha của nó không ảnh hưởng nơi khác; luôn blit qua blit_centered/blit_at.
+"""
+
+import math
+from collections import OrderedDict
+
+import pygame
+from pygame import gfxdraw
+
+PULSE_FRAMES = 5       # số mức phóng to dựng sẵn cho nhịp "thở"
+SPARKLE_FRAMES = 12    # số góc xoay của ngôi sao 4 cánh (chu kỳ 90°)
+RAY_FRAMES = 15        # số góc xoay của vòng 8 tia sáng (chu kỳ 45°)
+ROTATE_STEP = 1.0      # bước lượng tử hóa góc xoay ảnh (độ)
+
+
+def wave_frame(value, frames):
+    """Chỉ số khung cho giá trị dao động trong [-1, 1] (vd. math.sin(t))"""
+    return max(0, min(frames - 1, int(round((value + 1) * 0.5 * (frames - 1)))))
+
+
+def cycle_frame(phase, frames):
+    """Chỉ số khung cho pha tuần hoàn (phase tính theo số chu kỳ, lấy phần lẻ)"""
+    return int((phase % 1.0) * frames) % frames
+
+
+def _lerp_color(a, b, t):
+    return tuple(int(a[i] + (b[i] - a[i]) * t) for i in range(3))
+
+
+def _lighter(color, amount=50):
+    return tuple(min(255, c + amount) for c in color[:3])
+
+
+def _alpha_surface(size, color=(0, 0, 0)):
+    """
+    Surface SRCALPHA trong suốt mang sẵn màu của hiệu ứng: blit hòa trộn cả kênh
+    màu của đích, nền (0, 0, 0, 0) mặc định sẽ làm các lớp mờ bị tối đi.
+    """
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    surface.fill((*color[:3], 0))
+    return surface
+
+
+def _blend_circle(surface, center, radius, color):
+    """
+    Hình tròn mờ hòa trộn lên surface như khi vẽ thẳng lên màn hình (gfxdraw vẽ
+    lên surface SRCALPHA không giữ đúng alpha nên vẽ ra lớp riêng rồi blit).
+    """
+    if radius < 1:
+        return
+    layer = _alpha_surface((radius * 2 + 1, radius * 2 + 1), color)
+    pygame.draw.circle(layer, color, (radius, radius), radius)
+    surface.blit(layer, (int(center[0]) - radius, int(center[1]) - radius))
+
+
+class EffectSprites:
+    """
+    Args:
+        max_sprites : số sprite giữ lại (LRU)
+    """
+
+    def __init__(self, max_sprites=512):
+        self.max_sprites = max_sprites
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key, build):
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = build()
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    # -------------------------
+    # Blit với alpha
+    # -------------------------
+    @staticmethod
+    def blit_at(target, sprite, dest, alpha=255):
+        """Blit sprite tại dest (góc trên trái) với độ mờ alpha (0-255)"""
+        sprite.set_alpha(max(0, min(255, int(alpha))))
+        return target.blit(sprite, dest)
+
+    def blit_centered(self, target, sprite, center, alpha=255):
+        rect = sprite.get_rect(center=(int(center[0]), int(center[1])))
+        return self.blit_at(target, sprite, rect, alpha)
+
+    # -------------------------
+    # Chữ và ảnh
+    # -------------------------
+    def text(self, text, font, color):
+        """Chữ render một lần (màu RGB, độ mờ truyền khi blit)"""
+        color = tuple(color[:3])
+        return self._get(("text", text, font, color), lambda: font.render(text, True, color))
+
+    def scaled_text(self, text, font, color, frame, min_scale, max_scale, frames=PULSE_FRAMES):
+        """Chữ phóng to theo khung nhịp `frame` (từ min_scale tới max_scale)"""
+        def build():
+            base = self.text(text, font, color)
+            scale = min_scale + (max_scale - min_scale) * frame / max(1, frames - 1)
+            size = (max(1, int(base.get_width() * scale)), max(1, int(base.get_height() * scale)))
+            return pygame.transform.scale(base, size)
+        return self._get(("scaled_text", text, font, tuple(color[:3]), frame, min_scale, max_scale, frames), build)
+
+    def rotated(self, image, angle, step=ROTATE_STEP):
+        """Ảnh xoay theo góc lượng tử hóa (ảnh nguồn cần là surface dùng chung, vd. từ assets)"""
+        quantized = round(angle / step) * step
+        return self._get(("rotated", image, quantized),
+                         lambda: pygame.transform.rotate(image, quantized))
+
+    # -------------------------
+    # Huy chương
+    # -------------------------
+    def medal_body(self, outer, inner, accent, shine, frame, radius=55, pulse=0.03):
+        """
+        Thân huy chương (bóng đổ, gradient, vòng trong, điểm sáng, viền nổi) ở
+        khung nhịp `frame`; tâm huy chương là tâm sprite.
+        """
+        def build():
+            scale = 1.0 + pulse * (2.0 * frame / max(1, PULSE_FRAMES - 1) - 1.0)
+            half = radius + 17
+            surface = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
+            c = half
+            shadow_offset = 6
+            for i in range(5):
+                _blend_circle(surface, (c + shadow_offset, c + shadow_offset + i),
+                              radius + 6 - i, (0, 0, 0, 20 - i * 3))
+            for r in range(radius, int(radius * 0.7), -1):
+                progress = (radius - r) / (radius * 0.3)
+                gfxdraw.filled_circle(surface, c, c, int(r * scale), _lerp_color(outer, inner, progress))
+            inner_radius = int((radius - 10) * scale)
+            gfxdraw.filled_circle(surface, c, c, inner_radius, inner)
+            for i in range(15, 0, -3):
+                _blend_circle(surface, (c - radius // 4, c - radius // 3), i, (*shine, int(80 * (i / 15))))
+            pygame.draw.circle(surface, accent, (c, c), inner_radius, 4)
+            pygame.draw.circle(surface, shine, (c, c), inner_radius - 2, 2)
+            return surface
+        return self._get(("medal", outer, inner, accent, shine, frame, radius, pulse), build)
+
+    # -------------------------
+    # Khung thành tựu
+    # -------------------------
+    def achievement_glow(self, size, color, layers=5, spread=10, peak_alpha=80):
+        """Các lớp glow quanh khung (ở cường độ cao nhất), viền ngoài cách khung `spread` px"""
+        def build():
+            width, height = size
+            surface = _alpha_surface((width + spread * 2, height + spread * 2), color)
+            for i in range(layers):
+                offset = spread - i * 2
+                layer = _alpha_surface((width + offset * 2, height + offset * 2), color)
+                pygame.draw.rect(layer, (*color[:3], max(10, peak_alpha - i * 10)),
+                                 layer.get_rect(), border_radius=20)
+                surface.blit(layer, (spread - offset, spread - offset))
+            return surface
+        return self._get(("achievement_glow", tuple(size), tuple(color[:3]), layers, spread, peak_alpha), build)
+
+    def achievement_panel(self, size, bg_color, border_color, icon_color):
+        """Nền khung thành tựu: nền, viền, viền sáng bên trong, glow của icon và đường kẻ"""
+        def build():
+            width, height = size
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            rect = surface.get_rect()
+            pygame.draw.rect(surface, bg_color, rect, border_radius=18)
+            pygame.draw.rect(surface, border_color, rect, width=5, border_radius=18)
+            pygame.draw.rect(surface, _lighter(border_color), rect.inflate(-12, -12), width=2, border_radius=15)
+            for glow_r in range(35, 15, -5):
+                _blend_circle(surface, (40, 35), glow_r, (*icon_color, int(30 * (glow_r - 15) / 20)))
+            pygame.draw.line(surface, border_color, (20, 100), (width - 20, 100), 3)
+            return surface
+        return self._get(("achievement_panel", tuple(size), bg_color, border_color, icon_color), build)
+
+    def shine_dot(self, color, radius=8):
+        """Điểm sáng tròn mờ dần ra ngoài"""
+        def build():
+            surface = _alpha_surface((radius * 2 + 1, radius * 2 + 1), color)
+            for r in range(radius, 0, -2):
+                _blend_circle(surface, (radius, radius), r, (*color[:3], int(150 * (r / radius))))
+            return surface
+        return self._get(("shine", tuple(color[:3]), radius), build)
+
+    # -------------------------
+    # Ngôi sao lấp lánh
+    # -------------------------
+    def sparkle_star(self, color, size, frame):
+        """Ngôi sao 4 cánh bán kính `size` ở góc xoay thứ `frame` (trên SPARKLE_FRAMES)"""
+        def build():
+            half = size + 1
+            surface = pygame.Surface((half * 2 + 1, half * 2 + 1), pygame.SRCALPHA)
+            rotation = (math.pi / 2) * frame / SPARKLE_FRAMES
+            star_points = []
+            for i in range(4):
+                angle = math.pi / 2 * i + rotation
+                inner_angle = angle + math.pi / 4
+                star_points.append((half + size * math.cos(angle), half + size * math.sin(angle)))
+                star_points.append((half + size * 0.4 * math.cos(inner_angle),
+                                    half + size * 0.4 * math.sin(inner_angle)))
+            pygame.draw.polygon(surface, color[:3], star_points)
+            pygame.draw.polygon(surface, _lighter(color), star_points, 1)
+            return surface
+        return self._get(("sparkle", tuple(color[:3]), size, frame), build)
+
+    def sparkle_center(self, size):
+        """Chấm sáng ở tâm ngôi sao (độ sáng tối đa, nhấp nháy bằng alpha khi blit)"""
+        def build():
+            side = max(1, int(size))
+            surface = _alpha_surface((side, side), (255, 255, 255))
+            center_radius = max(2, int(size * 0.3))
+            c = int(size // 2)
+            for r in range(center_radius * 2, center_radius, -1):
+                glow_alpha = int(255 * (r - center_radius) / center_radius * 0.5)
+                _blend_circle(surface, (c, c), r, (255, 255, 255, glow_alpha))
+            _blend_circle(surface, (c, c), center_radius, (255, 255, 255, 255))
+            return surface
+        return self._get(("sparkle_center", size), build)
+
+    # -------------------------
+    # Hào quang gem
+    # -------------------------
+    def gem_glow(self, size, color, rings=6, peak_alpha=70):
+        """Các vòng glow đồng tâm quanh gem (ở cường độ cao nhất)"""
+        def build():
+            outer = size // 3 + (rings - 1) * 8
+            surface = _alpha_surface((outer * 2, outer * 2), color)
+            for i in range(rings):
+                radius = size // 3 + i * 8
+                layer = _alpha_surface((radius * 2, radius * 2), color)
+                pygame.draw.circle(layer, (*color[:3], max(0, peak_alpha - i * 10)), (radius, radius), radius)
+                surface.blit(layer, layer.get_rect(center=(outer, outer)))
+            return surface
+        return self._get(("gem_glow", size, tuple(color[:3]), rings, peak_alpha), build)
+
+    def gem_rays(self, size, color, frame, rays=8):
+        """Vòng tia sáng quanh gem ở góc xoay thứ `frame` (trên RAY_FRAMES, chu kỳ 360/rays độ)"""
+        def build():
+            surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            ray_length = size // 2 + 15
+            base = (360 / rays) * frame / RAY_FRAMES
+            for i in range(rays):
+                rad = math.radians(base + i * 360 / rays)
+                points = [
+                    (size, size),
+                    (size + math.cos(rad - 0.1) * ray_length * 0.3, size + math.sin(rad - 0.1) * ray_length * 0.3),
+                    (size + math.cos(rad) * ray_length, size + math.sin(rad) * ray_length),
+                    (size + math.cos(rad + 0.1) * ray_length * 0.3, size + math.sin(rad + 0.1) * ray_length * 0.3),
+                ]
+                pygame.draw.polygon(surface, color[:3], points)
+            return surface
+        return self._get(("gem_rays", size, tuple(color[:3]), frame, rays), build)
+
+    def clear(self):
+        self._sprites.clear()
+
+    def get_cache_info(self):
+        """Thông tin cache để debug"""
+        return {
+            "sprites": len(self._sprites),
+            "max_sprites": self.max_sprites,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Instance dùng chung
+effects = EffectSprites()
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Theo dõi file dữ liệu (lessons.json, quiz.json) bằng luồng nền.
+
+Trước đây các màn hình gọi os.path.getmtime mỗi frame rồi parse lại JSON và
+tính hash bằng json.dumps(sort_keys=True) trên toàn bộ dữ liệu. Ở đây một luồng
+nền chờ sự kiện inotify (Linux, qua ctypes) hoặc stat định kỳ với tần suất thấp
+(hệ điều hành khác / inotify lỗi). Khi nội dung file thật sự đổi, luồng tính
+hash theo từng khối byte và post event EVENT_FILE_CHANGED; vòng lặp chính gọi
+dispatch() để chuyển event tới các hàm đã subscribe (chạy trên luồng chính).
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import pygame
+
+import config
+
+# Tiền tố phiên bản của hash nội dung; hash cũ (không có tiền tố) được coi là
+# định dạng cũ, không so sánh được với hash mới
+CONTENT_HASH_PREFIX = "v2-sha256:"
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def content_hash(path, chunk_size=64 * 1024):
+    """Hash sha256 của file đọc theo từng khối, None nếu không đọc được"""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return CONTENT_HASH_PREFIX + h.hexdigest()
+
+
+def is_current_hash(value):
+    """Hash được tạo bởi content_hash (không phải hash định dạng cũ)"""
+    return isinstance(value, str) and value.startswith(CONTENT_HASH_PREFIX)
+
+
+class _Inotify:
+    """Bọc tối giản inotify của libc (chỉ Linux)"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 thất bại")
+        self.watches = {}
+
+    def add_directory(self, directory):
+        mask = _IN_CLOSE_WRITE | _IN_MODIFY | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_CREATE | _IN_DELETE
+        wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch thất bại: {directory}")
+        self.watches[wd] = directory
+
+    def read_names(self, timeout):
+        """Các đường dẫn có sự kiện trong khoảng timeout giây"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self.watches.get(wd)
+            if directory and name:
+                paths.add(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FileWatcher:
+    """
+    Args:
+        event_type    : loại pygame event được post khi file đổi
+        poll_interval : chu kỳ stat (giây) khi không dùng được inotify
+        debounce      : gộp các sự kiện ghi liên tiếp trong khoảng này (giây)
+    """
+
+    def __init__(self, event_type, poll_interval=2.0, debounce=0.2):
+        self.event_type = event_type
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._paths = {}        # path chuẩn hóa -> hash hiện tại
+        self._stats = {}        # path -> (mtime_ns, size, inode), dùng khi polling
+        self._subscribers = {}  # path -> [callback(path, hash)]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.mode = None
+        self.events_posted = 0
+
+    @staticmethod
+    def _normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def watch(self, path):
+        """Thêm file cần theo dõi (gọi trước start), hash ban đầu tính ngay"""
+        key = self._normalize(path)
+        with self._lock:
+            self._paths[key] = content_hash(key)
+            self._stats[key] = self._stat(key)
+
+    def subscribe(self, path, callback):
+        """callback(path, hash) được gọi trên luồng chính khi dispatch event của path"""
+        self._subscribers.setdefault(self._normalize(path), []).append(callback)
+
+    def get_hash(self, path):
+        """Hash nội dung mới nhất đã biết của file"""
+        with self._lock:
+            return self._paths.get(self._normalize(path))
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _check(self, path):
+        """Tính lại hash, post event nếu nội dung đổi"""
+        new_hash = content_hash(path)
+        with self._lock:
+            if self._paths.get(path) == new_hash:
+                return
+            self._paths[path] = new_hash
+        try:
+            pygame.event.post(pygame.event.Event(self.event_type, {"path": path, "content_hash": new_hash}))
+            self.events_posted += 1
+        except pygame.error as e:
+            print(f"⚠️ Không post được sự kiện đổi file {path}: {e}")
+
+    # -------------------------
+    # Luồng nền
+    # -------------------------
+    def _run_inotify(self, inotify):
+        try:
+            while not self._stop.is_set():
+                changed = {p for p in map(self._normalize, inotify.read_names(0.5)) if p in self._paths}
+                if not changed:
+                    continue
+                # Chờ thêm chút để gộp chuỗi sự kiện của một lần ghi
+                deadline = time.monotonic() + self.debounce
+                while time.monotonic() < deadline:
+                    changed |= {p for p in map(self._normalize, inotify.read_names(self.debounce))
+                                if p in self._paths}
+                for path in changed:
+                    self._check(path)
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            for path in list(self._paths):
+                stat = self._stat(path)
+                if stat != self._stats.get(path):
+                    self._stats[path] = stat
+                    self._check(path)
+
+    def _start_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            inotify = _Inotify()
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ Không dùng được inotify ({e}), chuyển sang kiểm tra định kỳ")
+            return None
+        try:
+            for directory in {os.path.dirname(p) for p in self._paths}:
+                os.makedirs(directory, exist_ok=True)
+                inotify.add_directory(directory)
+        except OSError as e:
+            print(f"⚠️ Không theo dõi được thư mục dữ liệu ({e}), chuyển sang kiểm tra định kỳ")
+            inotify.close()
+            return None
+        return inotify
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        inotify = self._start_inotify()
+        if inotify is not None:
+            self.mode = "inotify"
+            target, args = self._run_inotify, (inotify,)
+        else:
+            self.mode = "polling"
+            target, args = self._run_polling, ()
+        self._thread = threading.Thread(target=target, args=args, name="file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    # -------------------------
+    # Luồng chính
+    # -------------------------
+    def dispatch(self, event):
+        """Gọi từ vòng lặp event: chuyển EVENT_FILE_CHANGED tới các subscriber"""
+        if event.type != self.event_type:
+            return False
+        for callback in self._subscribers.get(event.path, ()):
+            try:
+                callback(event.path, event.content_hash)
+            except Exception as e:
+                print(f"⚠️ Lỗi xử lý thay đổi file {event.path}: {e}")
+        return True
+
+    def get_stats(self):
+        """Thông tin để debug"""
+        return {
+            "mode": self.mode,
+            "files": len(self._paths),
+            "events_posted": self.events_posted,
+        }
+
+
+# Instance dùng chung: theo dõi dữ liệu bài học và bài tập
+file_watcher = FileWatcher(config.EVENT_FILE_CHANGED, poll_interval=config.FILE_WATCH_POLL_INTERVAL)
+file_watcher.watch(config.LESSON_DATA_FILE_PATH)
+file_watcher.watch(config.QUIZ_DATA_FILE_PATH)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Điều tiết tốc độ khung hình cho vòng lặp chính.
+
+- Khi có input hoặc màn hình đang có hiệu ứng động: chạy ở config.TARGET_FPS.
+- Sau config.IDLE_AFTER_SECONDS không có input và không ai yêu cầu full rate:
+  hạ xuống config.IDLE_FPS, chờ event bằng pygame.event.wait(timeout) nên có
+  input là thức dậy ngay (wake-on-event) thay vì chờ hết khung hình.
+- Ghi lại histogram thời gian mỗi frame để kiểm tra.
+"""
+
+import time
+
+import pygame
+
+import config
+
+# Ngưỡng (ms) của các cột histogram, cột cuối là "lớn hơn ngưỡng cuối"
+HISTOGRAM_BUCKETS_MS = (5, 10, 17, 34, 50, 100, 250, 500)
+
+
+class FrameGovernor:
+    def __init__(self, target_fps=60, idle_fps=5, idle_after=2.0):
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.clock = pygame.time.Clock()
+        self._last_input = time.monotonic()
+        self._last_frame = time.monotonic()
+        self._full_rate_requested = False
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.frames = 0
+        self.idle_frames = 0
+
+    def notify_event(self, event):
+        """Gọi cho mỗi event lấy từ pygame.event.get() để thoát chế độ idle"""
+        self._last_input = time.monotonic()
+
+    def request_full_rate(self):
+        """Màn hình có hiệu ứng động gọi hàm này khi vẽ (chỉ có hiệu lực cho frame hiện tại)"""
+        self._full_rate_requested = True
+
+    def is_idle(self):
+        if self._full_rate_requested:
+            return False
+        return time.monotonic() - self._last_input > self.idle_after
+
+    def _record(self, now):
+        frame_ms = (now - self._last_frame) * 1000.0
+        self._last_frame = now
+        for i, limit in enumerate(HISTOGRAM_BUCKETS_MS):
+            if frame_ms <= limit:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def tick(self):
+        """Gọi MỘT lần ở cuối mỗi vòng lặp, sau khi đã đưa frame lên màn hình"""
+        if self.is_idle():
+            self.idle_frames += 1
+            # Ngủ tới khi có event hoặc hết khung hình idle
+            event = pygame.event.wait(int(1000 / self.idle_fps))
+            if event.type != pygame.NOEVENT:
+                # Trả event lại hàng đợi cho vòng lặp chính xử lý
+                pygame.event.post(event)
+            self.clock.tick()
+        else:
+            self.clock.tick(self.target_fps)
+        self._full_rate_requested = False
+        self.frames += 1
+        self._record(time.monotonic())
+
+    def get_stats(self):
+        """Thống kê để debug: số frame, số frame idle, histogram theo ms"""
+        labels = [f"<={limit}ms" for limit in HISTOGRAM_BUCKETS_MS]
+        labels.append(f">{HISTOGRAM_BUCKETS_MS[-1]}ms")
+        return {
+            "frames": self.frames,
+            "idle_frames": self.idle_frames,
+            "fps": round(self.clock.get_fps(), 1),
+            "histogram": dict(zip(labels, self.histogram)),
+        }
+
+
+# Instance dùng chung cho toàn bộ game
+governor = FrameGovernor(
+    target_fps=config.TARGET_FPS,
+    idle_fps=config.IDLE_FPS,
+    idle_after=config.IDLE_AFTER_SECONDS,
+)
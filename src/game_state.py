@@ -1,14 +1,61 @@
 import os
 import json
 import time
+import threading
+from dataclasses import dataclass
 from datetime import date, timedelta
 import random
 import config
+from assets import assets
+from persistence import WriteBehindWriter
+from file_watcher import is_current_hash
+from scheduler import seconds_until_next_midnight
 import subprocess
 import sys
 
+@dataclass(frozen=True)
+class GameStateSnapshot:
+    """
+    Bản chụp bất biến của các dữ liệu cần lưu / hiển thị.
+    Được tạo dưới lock nên các trường luôn nhất quán với nhau, sau đó có thể
+    đọc thoải mái từ bất kỳ luồng nào (luồng ghi file, luồng vẽ).
+    """
+    completed_lessons: tuple
+    lessons_hash: object
+    point: int
+    energy: int
+    streak: int
+    the_streak: int
+    last_day: date
+    owned_avatars: tuple
+    avatar_path: str
+    collected_gems: tuple
+    current_music: object
+    music_volume: float
+
+    def to_dict(self):
+        """Định dạng lưu xuống game_data.json"""
+        return {
+            "completed_lessons": list(self.completed_lessons),
+            "lessons_hash": self.lessons_hash,
+            "point": self.point,
+            "energy": self.energy,
+            "streak": self.streak,
+            "the_streak": self.the_streak,
+            "last_day": (self.last_day.isoformat() if self.last_day else date.today().isoformat()),
+            "owned_avatars": list(self.owned_avatars),
+            "avatar_path": os.path.basename(self.avatar_path),
+            "collected_gems": [dict(gem) for gem in self.collected_gems],
+            # THÊM PHẦN LƯU THÔNG TIN ÂM NHẠC
+            "current_music": self.current_music,
+            "music_volume": self.music_volume
+        }
+
+
 class GameState:
     def __init__(self, file_path): # file_path sẽ là config.DATA_FILE_PATH
+        # Khóa bảo vệ mọi thay đổi trạng thái (main thread + các luồng cập nhật nền)
+        self.lock = threading.RLock()
         self.click_sound = None
         self.current_music = "bg.mp3"  # nhạc mặc định
         self.music_volume = 0.4
@@ -31,6 +78,7 @@ class GameState:
         self.message_timer = 0
         self.buatangtoc_timer = None
         self.last_point_pack_time = 0
+        self._scheduler = None
 
         self.current_screen = "home"
 
@@ -44,6 +92,10 @@ class GameState:
             "selected": None
         }
 
+        # Luồng ghi nền: write_data() chỉ đánh dấu dirty, việc ghi file được gộp lại
+        self._writer = WriteBehindWriter(self.file_path, self._build_save_data, config.SAVE_INTERVAL)
+        self._writer.start()
+
         self.read_data()
 
         # Import GEM_TYPES here to avoid circular dependency with config.py
@@ -90,7 +142,8 @@ class GameState:
         else:
             print(f"Data file not found at {self.file_path}. Creating with default values.")
             self._set_default_data()
-            self.write_data() # Save defaults immediately
+            self.write_data()
+            self.flush_data() # Save defaults immediately
 
     def _set_default_data(self):
         self.completed_lessons = []
@@ -106,145 +159,234 @@ class GameState:
         self.current_music = "bg.mp3"
         self.music_volume = 0.4
 
+    def snapshot(self):
+        """Chụp trạng thái hiện tại dưới lock (copy các list để không bị sửa giữa chừng)"""
+        with self.lock:
+            return GameStateSnapshot(
+                completed_lessons=tuple(self.completed_lessons),
+                lessons_hash=self.lessons_hash,
+                point=self.point,
+                energy=self.energy,
+                streak=self.streak,
+                the_streak=self.the_streak,
+                last_day=self.last_day,
+                owned_avatars=tuple(self.owned_avatars),
+                avatar_path=self.avatar_path,
+                collected_gems=tuple({k: v for k, v in gem.items() if k != "rect"} for gem in self.collected_gems),
+                current_music=self.current_music,
+                music_volume=self.music_volume,
+            )
+
+    def _build_save_data(self):
+        """Dữ liệu cần lưu (gọi từ luồng ghi, chỉ giữ lock trong lúc chụp snapshot)"""
+        return self.snapshot().to_dict()
+
     def write_data(self):
-        try:
-            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-            data_to_save = {
-                "completed_lessons": self.completed_lessons,
-                "lessons_hash": self.lessons_hash,
-                "point": self.point,
-                "energy": self.energy,
-                "streak": self.streak,
-                "the_streak": self.the_streak,
-                "last_day": (self.last_day.isoformat() if self.last_day else date.today().isoformat()),
-                "owned_avatars": self.owned_avatars,
-                "avatar_path": os.path.basename(self.avatar_path),
-                "collected_gems": [{k: v for k, v in gem.items() if k != "rect"} for gem in self.collected_gems],
-                # THÊM PHẦN LƯU THÔNG TIN ÂM NHẠC
-                "current_music": self.current_music,
-                "music_volume": self.music_volume
-            }
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"Lỗi khi ghi dữ liệu: {e}")
+        """Đánh dấu dữ liệu đã thay đổi, luồng ghi nền sẽ lưu lại (tối đa 1 lần / SAVE_INTERVAL)"""
+        self._writer.mark_dirty()
+
+    def flush_data(self):
+        """Ghi ngay lập tức mọi thay đổi chưa lưu (đồng bộ)"""
+        self._writer.flush()
+
+    def close(self):
+        """Dừng luồng ghi và lưu lần cuối, gọi khi thoát game"""
+        self._writer.stop()
+
+    # --- Thao tác nguyên tử (an toàn khi gọi từ nhiều luồng) ---
+    def add_points(self, amount, cap=None):
+        with self.lock:
+            if cap is not None and self.point >= cap:
+                return False
+            self.point += amount
+        self.write_data()
+        return True
+
+    def debit_points(self, amount):
+        """Trừ điểm nếu đủ. Trả về True nếu đã trừ."""
+        with self.lock:
+            if self.point < amount:
+                return False
+            self.point -= amount
+        self.write_data()
+        return True
+
+    def consume_energy(self, amount=1):
+        """Trừ năng lượng nếu đủ. Trả về True nếu đã trừ."""
+        with self.lock:
+            if self.energy < amount:
+                return False
+            self.energy -= amount
+        self.write_data()
+        return True
+
+    def purchase_avatar(self, avatar_path, price):
+        """Mua avatar: trừ điểm + thêm vào danh sách sở hữu + dùng luôn, trong một bước"""
+        with self.lock:
+            if self.point < price:
+                return False
+            self.point -= price
+            if avatar_path not in self.owned_avatars:
+                self.owned_avatars.append(avatar_path)
+            if self.avatar_path != avatar_path:
+                # Bỏ mọi bản scale của avatar cũ khỏi cache ảnh
+                assets.invalidate(self.avatar_path)
+            self.avatar_path = avatar_path
+        self.write_data()
+        return True
+
+    def update_lessons_hash(self, new_hash):
+        """
+        Cập nhật hash bài học, reset bài đã hoàn thành nếu nội dung đã đổi.
+
+        Hash định dạng cũ (MD5 của JSON, không có tiền tố phiên bản) không so
+        sánh được với hash nội dung mới nên chỉ được thay thế, không reset tiến độ.
+        """
+        with self.lock:
+            if self.lessons_hash == new_hash:
+                return
+            if is_current_hash(self.lessons_hash):
+                self.completed_lessons = []
+            self.lessons_hash = new_hash
+        self.write_data()
 
     def show_message(self, msg, duration=3):
         self.purchase_message = msg
         self.message_timer = time.time()
 
-    # --- Background Update Threads ---
-    def update_energy_thread(self):
-        while True:
-            time.sleep(60 * 20)  # Cập nhật mỗi 20 phút
-            if self.energy < 10:
-                self.energy += 1
-            self.write_data()
+    # --- Background Updates (chạy trên luồng của scheduler) ---
+    ENERGY_INTERVAL = 60 * 20   # hồi 1 năng lượng mỗi 20 phút
+    POINT_INTERVAL = 5          # +1 điểm mỗi 5 giây
+    BOOSTED_POINT_INTERVAL = 1  # +1 điểm mỗi giây khi có bùa tăng tốc
 
-    def update_point_thread(self):
-        while True:
-            sleep_time = 1 if self.buatangtoc_timer and time.time() < self.buatangtoc_timer else 5
-            time.sleep(sleep_time)
-            if self.point < 999999:
-                self.point += 1
-            self.write_data()
+    def schedule_updates(self, scheduler):
+        """Đăng ký các cập nhật định kỳ với scheduler dùng chung"""
+        self._scheduler = scheduler
+        scheduler.every("energy", lambda: self.ENERGY_INTERVAL, self.tick_energy)
+        scheduler.every("points", self.next_point_delay, self.tick_points)
+        # Kiểm tra streak ngay sau khi mở game, sau đó đúng mỗi nửa đêm (theo giờ
+        # thực, để máy ngủ qua đêm vẫn qua ngày ngay khi thức dậy)
+        scheduler.every("streak", lambda: seconds_until_next_midnight() + 1, self.check_streak,
+                        first_delay=10, wall_clock=True)
+
+    def next_point_delay(self):
+        if self.buatangtoc_timer:
+            remaining = self.buatangtoc_timer - time.time()
+            if remaining > 0:
+                return self.BOOSTED_POINT_INTERVAL
+        return self.POINT_INTERVAL
 
-    def update_streak_thread(self):
-        while True:
-            time.sleep(10) # Check every 10 seconds
-            today = date.today()
-            if today != self.last_day:
-                if today - self.last_day == timedelta(days=1):
-                    self.streak += 1
-                    self.point += 10 # Reward for maintaining streak
+    def tick_energy(self):
+        with self.lock:
+            if self.energy >= 10:
+                return
+            self.energy += 1
+        self.write_data()
+
+    def tick_points(self):
+        self.add_points(1, cap=999999)
+
+    def check_streak(self):
+        today = date.today()
+        with self.lock:
+            if today == self.last_day:
+                return
+            if today - self.last_day == timedelta(days=1):
+                self.streak += 1
+                self.point += 10 # Reward for maintaining streak
+            else:
+                if self.the_streak > 0:
+                    self.the_streak -= 1
                 else:
-                    if self.the_streak > 0:
-                        self.the_streak -= 1
-                    else:
-                        self.streak = 1 # Reset streak
-                self.last_day = today
-                self.write_data()
+                    self.streak = 1 # Reset streak
+            self.last_day = today
+        self.write_data()
 
     # --- Game Actions (can be called by UI elements) ---
     def purchase_item(self, item_name, price):
-        # Kiểm tra xem có đủ điểm không
-        if self.point < price:
-            self.show_message("Không đủ điểm!")
-            return
+        # Toàn bộ giao dịch chạy dưới lock để luồng cộng điểm nền không chen vào giữa
+        with self.lock:
+            # Kiểm tra xem có đủ điểm không
+            if self.point < price:
+                self.show_message("Không đủ điểm!")
+                return
         
-        # Xử lý từng loại item
-        if item_name == "Thẻ bảo vệ streak":
-            self.the_streak += 1
-            self.point -= price
-            self.show_message("Đã mua thẻ bảo vệ streak!")
+            # Xử lý từng loại item
+            if item_name == "Thẻ bảo vệ streak":
+                self.the_streak += 1
+                self.point -= price
+                self.show_message("Đã mua thẻ bảo vệ streak!")
             
-        elif item_name == "Tinh thể kỳ ảo(V.I.P)":
-            # Logic mua tinh thể VIP
-            missing_gems = [g for g in self.GEM_TYPES 
-                          if not any(cg["id"] == g["id"] for cg in self.collected_gems)]
+            elif item_name == "Tinh thể kỳ ảo(V.I.P)":
+                # Logic mua tinh thể VIP
+                missing_gems = [g for g in self.GEM_TYPES 
+                              if not any(cg["id"] == g["id"] for cg in self.collected_gems)]
             
-            if missing_gems:
-                new_gem = random.choice(missing_gems).copy()
+                if missing_gems:
+                    new_gem = random.choice(missing_gems).copy()
+                    new_gem["collected_date"] = date.today().isoformat()
+                    self.collected_gems.append(new_gem)
+                    self.point -= price
+                    self.show_message(f"Bạn nhận được: {new_gem['name']}!")
+                else:
+                    self.show_message("Bạn đã sưu tập đủ 9 viên đá!")
+                
+            elif item_name == "Tinh thể kỳ ảo":
+                # Logic mua tinh thể thường
+                new_gem = random.choice(self.GEM_TYPES).copy()
                 new_gem["collected_date"] = date.today().isoformat()
                 self.collected_gems.append(new_gem)
                 self.point -= price
                 self.show_message(f"Bạn nhận được: {new_gem['name']}!")
-            else:
-                self.show_message("Bạn đã sưu tập đủ 9 viên đá!")
-                
-        elif item_name == "Tinh thể kỳ ảo":
-            # Logic mua tinh thể thường
-            new_gem = random.choice(self.GEM_TYPES).copy()
-            new_gem["collected_date"] = date.today().isoformat()
-            self.collected_gems.append(new_gem)
-            self.point -= price
-            self.show_message(f"Bạn nhận được: {new_gem['name']}!")
             
-            # Kiểm tra nếu đã đủ bộ sưu tập
-            if len(set(g["id"] for g in self.collected_gems)) >= len(self.GEM_TYPES):
-                self.show_message("Bạn đã sưu tập đủ 9 viên đá!")
-                self.point += price
+                # Kiểm tra nếu đã đủ bộ sưu tập
+                if len(set(g["id"] for g in self.collected_gems)) >= len(self.GEM_TYPES):
+                    self.show_message("Bạn đã sưu tập đủ 9 viên đá!")
+                    self.point += price
         
-        elif item_name == "Gói điểm":
-            # Logic mua gói điểm
-            current_time = time.time()
-            if current_time - self.last_point_pack_time >= 10:
-                bonus = random.randint(0, 200)
-                self.point += bonus - price  # Trừ điểm mua + cộng điểm nhận được
-                self.last_point_pack_time = current_time
-                self.show_message(f"Bạn nhận được {bonus} điểm!")
-            else:
-                remaining = int(10 - (current_time - self.last_point_pack_time))
-                self.show_message(f"Vui lòng đợi {remaining} giây để mua lại")
+            elif item_name == "Gói điểm":
+                # Logic mua gói điểm
+                current_time = time.time()
+                if current_time - self.last_point_pack_time >= 10:
+                    bonus = random.randint(0, 200)
+                    self.point += bonus - price  # Trừ điểm mua + cộng điểm nhận được
+                    self.last_point_pack_time = current_time
+                    self.show_message(f"Bạn nhận được {bonus} điểm!")
+                else:
+                    remaining = int(10 - (current_time - self.last_point_pack_time))
+                    self.show_message(f"Vui lòng đợi {remaining} giây để mua lại")
                 
-        elif item_name == "Hồi năng lượng":
-            # Logic hồi năng lượng
-            if self.energy >= 10:
-                self.show_message("Năng lượng đã đầy!")
-            else:
-                self.energy = 10
-                self.point -= price
-                self.show_message("Đã hồi đầy năng lượng!")
+            elif item_name == "Hồi năng lượng":
+                # Logic hồi năng lượng
+                if self.energy >= 10:
+                    self.show_message("Năng lượng đã đầy!")
+                else:
+                    self.energy = 10
+                    self.point -= price
+                    self.show_message("Đã hồi đầy năng lượng!")
                 
-        elif item_name == "Bùa tăng tốc điểm":
-            # Logic bùa tăng tốc
-            self.buatangtoc_timer = time.time() + 60
-            self.point -= price
-            self.show_message("Điểm sẽ tăng nhanh trong 60 giây!")
+            elif item_name == "Bùa tăng tốc điểm":
+                # Logic bùa tăng tốc
+                self.buatangtoc_timer = time.time() + 60
+                self.point -= price
+                self.show_message("Điểm sẽ tăng nhanh trong 60 giây!")
+                # Lần cộng điểm kế tiếp phải theo chu kỳ nhanh ngay lập tức
+                if self._scheduler:
+                    self._scheduler.reschedule("points")
             
         self.write_data()  # Lưu dữ liệu sau mỗi giao dịch
         
     def complete_lesson(self, lesson_id):
-        if lesson_id not in self.completed_lessons:
+        with self.lock:
+            if lesson_id in self.completed_lessons:
+                return
             self.completed_lessons.append(lesson_id)
-            self.write_data()
+        self.write_data()
             
     def start_lesson(self, lesson_id):
-        if self.energy > 0:
-            self.energy -= 1
+        if self.consume_energy(1):
             self.current_lesson_id = lesson_id
             self.current_page_index = 0
-            self.write_data()
             # self.show_message(f"Bắt đầu Bài {lesson_id}!")
             return True
         else:
@@ -275,9 +417,10 @@ class GameState:
         self.reset_quiz_question_state()
 
     def quiz_finish_session(self, quiz_passed_bonus=0):
-        self.point += quiz_passed_bonus
-        if self.quiz_state["bai"] not in self.completed_lessons:
-            self.completed_lessons.append(self.quiz_state["bai"])
+        with self.lock:
+            self.point += quiz_passed_bonus
+            if self.quiz_state["bai"] not in self.completed_lessons:
+                self.completed_lessons.append(self.quiz_state["bai"])
         self.show_message("Hoàn thành bài tập!")
         self.reset_quiz_question_state()
         self.write_data()
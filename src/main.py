@@ -1,12 +1,19 @@
+import multiprocessing
+# Process con (trích xuất PDF song song) của bản đóng gói dừng ở đây, không chạy game
+multiprocessing.freeze_support()
+
 import pygame
 import sys
 import time
-import threading
 import subprocess
 #import pkg_resources
 import os
 import json
 import config
+from assets import assets
+from renderer import renderer, circle_rect, SKIP
+from framerate import governor
+from scheduler import scheduler
 
 # ===== QUAN TRỌNG: Hàm lấy đường dẫn resource cho --onefile =====
 def get_resource_path(relative_path):
@@ -47,18 +54,20 @@ pygame.init()
 # Import các modules từ src
 from game_state import GameState
 import ui_elements
-import quiz_data as quiz_data_module
+from quiz_repository import quiz_repository
 import screens.home_screen
 import screens.lesson_screen
 import screens.shop_screen
 import screens.account_screen
 import screens.collection_screen
 import screens.knowledge_page_screen
-from screens.quiz_screen import draw_quiz_screen, set_sounds, check_answer_mcq, finish_quiz_session, next_quiz_question
+from screens.quiz_screen import draw_quiz_screen, set_sounds, check_answer_mcq, finish_quiz_session, next_quiz_question, reload_quiz_data
 import screens.exercise_screen
 from config import SCREEN_EXERCISE, SCREEN_EXERCISE_QUIZ
 import screens.setting_screen
 import screens.load_screen as load_screen
+from file_watcher import file_watcher
+from pagination import lesson_pages
 
 # === Âm thanh ===
 pygame.mixer.init()
@@ -83,6 +92,14 @@ SCREEN = pygame.display.set_mode((config.WIDTH, config.HEIGHT))
 pygame.display.set_caption("GEMXCEL")
 screens.shop_screen.load_item_images()  
 
+# Load trước các ảnh dùng ở mọi frame (decode + convert + scale một lần)
+BACKGROUND_PATH = os.path.join(config.ASSETS_DIR, "setting", "background.png")
+SETTING_ICON_PATH = os.path.join(config.ASSETS_DIR, "setting", "setting_icon.png")
+assets.preload([
+    (BACKGROUND_PATH, (config.WIDTH, config.HEIGHT), False),
+    (SETTING_ICON_PATH, (40, 40)),
+])
+
 # ===== LOAD ICON SỬ DỤNG get_resource_path() =====
 icon_path = get_resource_path("icon.ico")
 if os.path.exists(icon_path):
@@ -121,165 +138,210 @@ def handle_button_click(callback_function, *args):
         last_click_time = now
 
 def normal(name, size=None):
-    path=os.path.join(config.ASSETS_DIR,"setting", f"{name}")
-    image=pygame.image.load(path).convert_alpha()
-    if size:
-        image=pygame.transform.scale(image,size)
-    return image
+    return assets.get_setting(name, size)
 
 def hover(name,size=None):
-    path=os.path.join(config.ASSETS_DIR,"setting", f"{name}")
-    image=pygame.image.load(path).convert_alpha()
-    if size:
-        image=pygame.transform.scale(image,size)
-    return image
+    return assets.get_setting(name, size)
+
+# Widget của từng màn hình được dựng một lần và chỉ dựng lại khi trạng thái thay đổi
+widget_registry = ui_elements.WidgetRegistry()
+
+def build_menu_buttons(switch_screen_callback):
+    return [
+        ui_elements.RecButton(-3,120, normal("bai_hoc.png",(75,47)), hover("bai_hoc_hover.png",(75,47)),
+        lambda: switch_screen_callback(config.SCREEN_LESSON),
+        click_sound=click_sound),
+        ui_elements.RecButton(-3,220,normal("cua_hang.png",(75,47)), hover("cua_hang_hover.png",(74,47)),
+        lambda: switch_screen_callback(config.SCREEN_SHOP),
+        click_sound=click_sound),
+        ui_elements.RecButton(-3,320, normal("tai_khoan.png",(75,47)), hover("tai_khoan_hover.png",(75,47)),
+        lambda: switch_screen_callback(config.SCREEN_ACCOUNT),
+        click_sound=click_sound),
+        ui_elements.RecButton(-3,420,normal("bo_suu_tap.png",(75,47)), hover("bo_suu_tap_hover.png",(75,47)),
+        lambda: switch_screen_callback(config.SCREEN_COLLECTION),
+        click_sound=click_sound)
+    ]
+
+def build_lesson_buttons(game_state, switch_screen_callback):
+    buttons = []
+    quiz_file_exists = os.path.exists(config.QUIZ_DATA_FILE_PATH)
+
+    if quiz_file_exists:
+        buttons.append(ui_elements.Button(
+            x=config.WIDTH - 240,
+            y=530,
+            w=130,
+            h=50,
+            text="Bài tập",
+            callback=lambda: switch_screen_callback(config.SCREEN_EXERCISE),
+            color=config.COLORS["text"],
+            border_radius=10,
+            click_sound=click_sound
+        ))
+
+    load_file_btn_x = config.WIDTH - 315 if quiz_file_exists else config.WIDTH - 370
+    load_file_btn_y = 42 if quiz_file_exists else 320  
+    load_file_btn_w = 130 if quiz_file_exists else 200
+    load_file_btn_h = 50 if quiz_file_exists else 80
+
+    buttons.append(ui_elements.Button(
+        x=load_file_btn_x,
+        y=load_file_btn_y,
+        w=load_file_btn_w,
+        h=load_file_btn_h,
+        text="NẠP FILE",
+        callback=lambda: switch_screen_callback(config.SCREEN_LOAD),
+        color=config.COLORS["text"],
+        border_radius=10,
+        click_sound=click_sound
+    ))
+    
+    lessons = screens.lesson_screen.load_lessons_data()
+    if lessons:
+        for index, lesson in enumerate(lessons):
+            x_position, y_position = 240, 100 + index * 100
+            lesson_id = index + 1
+            button = ui_elements.TextButton(
+                x_position, y_position, "",
+                lambda lesson_id=lesson_id: switch_screen_callback(config.SCREEN_KNOWLEDGE_PAGE) if game_state.start_lesson(lesson_id) else None
+                ,click_sound=click_sound
+            )
+            buttons.append(button)
+    return buttons
+
+def build_shop_item_rects():
+    screens.shop_screen.item_rects = []
+    item_width, item_height = 300, 170
+    item_margin = 130
+    items_per_row = 2
+    start_x = 110
+    start_y = 120
+
+    for index, item in enumerate(screens.shop_screen.shop_items):
+        col = index % items_per_row
+        row = index // items_per_row
+        x_position = start_x + col * (item_width + item_margin)
+        y_position = start_y + row * (item_height - 50)
+        shrink = 83
+        rect = pygame.Rect(
+            x_position, 
+            y_position,
+            item_width, 
+            item_height - shrink
+        )
+        screens.shop_screen.item_rects.append({
+            "rect": rect,
+            "name": item["name"],
+            "price": item["price"]
+        })
+    # Shop không có nút riêng, chỉ cần vùng click của từng món hàng
+    return []
+
+def build_collection_buttons(game_state):
+    if game_state.viewing_gem is None:
+        return []
+    return [ui_elements.Button(
+        550, 140, 40, 40, "<",
+        lambda: screens.collection_screen.set_viewing_gem_to_none(game_state),
+        click_sound=click_sound
+    )]
+
+def build_knowledge_buttons(game_state, switch_screen_callback, handle_button_click_callback):
+    buttons = []
+    lesson_id = game_state.current_lesson_id
+    spread_index = game_state.current_page_index
+
+    if spread_index > 0:
+        buttons.append(ui_elements.Button(
+            config.WIDTH//2 - 150,
+            config.HEIGHT - 110,
+            100,
+            50,
+            "Trước",
+            lambda: handle_button_click_callback(game_state.goto_prev_page),
+            config.COLORS["text"],
+            click_sound=click_sound
+        ))
+
+    if hasattr(game_state, "lesson_spreads") and spread_index < len(game_state.lesson_spreads) - 1:
+        buttons.append(ui_elements.Button(
+            config.WIDTH//2 + 50,
+            config.HEIGHT - 110,
+            100,
+            50,
+            "Tiếp",
+            lambda: handle_button_click_callback(game_state.goto_next_page),
+            config.COLORS["text"],
+            click_sound=click_sound
+        ))
+    else:
+        buttons.append(ui_elements.Button(
+            config.WIDTH//2 + 50,
+            config.HEIGHT - 110, 
+            100, 
+            50, 
+            "Bài tập",
+            lambda: handle_button_click_callback(
+                screens.knowledge_page_screen.finish_lesson_and_start_quiz, 
+                game_state, 
+                lesson_id, 
+                switch_screen_callback
+            ),
+            config.COLORS["text"],
+            click_sound=click_sound
+        ))
+    return buttons
 
 def get_current_screen_buttons(current_screen_name, game_state, switch_screen_callback, handle_button_click_callback):    
-    # Menu buttons
+    # Menu buttons (không phụ thuộc trạng thái -> dựng đúng một lần)
     buttons=[]
     if current_screen_name != config.SCREEN_EXERCISE and current_screen_name != config.SCREEN_EXERCISE_QUIZ:
-        buttons.extend([
-            ui_elements.RecButton(-3,120, normal("bai_hoc.png",(75,47)), hover("bai_hoc_hover.png",(75,47)),
-            lambda: switch_screen_callback(config.SCREEN_LESSON),
-            click_sound=click_sound),
-            ui_elements.RecButton(-3,220,normal("cua_hang.png",(75,47)), hover("cua_hang_hover.png",(74,47)),
-            lambda: switch_screen_callback(config.SCREEN_SHOP),
-            click_sound=click_sound),
-            ui_elements.RecButton(-3,320, normal("tai_khoan.png",(75,47)), hover("tai_khoan_hover.png",(75,47)),
-            lambda: switch_screen_callback(config.SCREEN_ACCOUNT),
-            click_sound=click_sound),
-            ui_elements.RecButton(-3,420,normal("bo_suu_tap.png",(75,47)), hover("bo_suu_tap_hover.png",(75,47)),
-            lambda: switch_screen_callback(config.SCREEN_COLLECTION),
-            click_sound=click_sound)
-        ])
+        buttons.extend(widget_registry.get("menu", None, lambda: build_menu_buttons(switch_screen_callback)))
 
     if current_screen_name == config.SCREEN_LESSON and game_state.current_screen != config.SCREEN_KNOWLEDGE_PAGE:
-        quiz_file_exists = os.path.exists(config.QUIZ_DATA_FILE_PATH)
-
-        if quiz_file_exists:
-            buttons.append(ui_elements.Button(
-                x=config.WIDTH - 240,
-                y=530,
-                w=130,
-                h=50,
-                text="Bài tập",
-                callback=lambda: switch_screen_callback(config.SCREEN_EXERCISE),
-                color=config.COLORS["text"],
-                border_radius=10,
-                click_sound=click_sound
-            ))
-
-        load_file_btn_x = config.WIDTH - 315 if quiz_file_exists else config.WIDTH - 370
-        load_file_btn_y = 42 if quiz_file_exists else 320  
-        load_file_btn_w = 130 if quiz_file_exists else 200
-        load_file_btn_h = 50 if quiz_file_exists else 80
-
-        buttons.append(ui_elements.Button(
-            x=load_file_btn_x,
-            y=load_file_btn_y,
-            w=load_file_btn_w,
-            h=load_file_btn_h,
-            text="NẠP FILE",
-            callback=lambda: switch_screen_callback(config.SCREEN_LOAD),
-            color=config.COLORS["text"],
-            border_radius=10,
-            click_sound=click_sound
+        # Chỉ dựng lại khi file bài học / bài tập thay đổi
+        key = (file_watcher.get_hash(config.LESSON_DATA_FILE_PATH), file_watcher.get_hash(config.QUIZ_DATA_FILE_PATH))
+        buttons.extend(widget_registry.get(
+            config.SCREEN_LESSON, key,
+            lambda: build_lesson_buttons(game_state, switch_screen_callback)
         ))
-        
-        lessons = screens.lesson_screen.load_lessons_data()
-        if lessons:
-            for index, lesson in enumerate(lessons):
-                x_position, y_position = 240, 100 + index * 100
-                lesson_id = index + 1
-                button = ui_elements.TextButton(
-                    x_position, y_position, "",
-                    lambda lesson_id=lesson_id: switch_screen_callback(config.SCREEN_KNOWLEDGE_PAGE) if game_state.start_lesson(lesson_id) else None
-                    ,click_sound=click_sound
-                )
-                buttons.append(button)
     
     elif current_screen_name == config.SCREEN_EXERCISE:
-        buttons.extend(screens.exercise_screen.draw_exercise(SCREEN, game_state, switch_screen) or [])
+        buttons.extend(widget_registry.get(
+            config.SCREEN_EXERCISE, None,
+            lambda: screens.exercise_screen.draw_exercise(SCREEN, game_state, switch_screen)
+        ))
     elif current_screen_name == config.SCREEN_SHOP:
-        screens.shop_screen.item_rects = []
-        item_width, item_height = 300, 170
-        item_margin = 130
-        items_per_row = 2
-        start_x = 110
-        start_y = 120
-
-        for index, item in enumerate(screens.shop_screen.shop_items):
-            col = index % items_per_row
-            row = index // items_per_row
-            x_position = start_x + col * (item_width + item_margin)
-            y_position = start_y + row * (item_height - 50)
-            shrink = 83
-            rect = pygame.Rect(
-                x_position, 
-                y_position,
-                item_width, 
-                item_height - shrink
-            )
-            screens.shop_screen.item_rects.append({
-                "rect": rect,
-                "name": item["name"],
-                "price": item["price"]
-            })
+        widget_registry.get(config.SCREEN_SHOP, None, build_shop_item_rects)
         
     elif current_screen_name == config.SCREEN_COLLECTION:
-        if game_state.viewing_gem is not None:
-            buttons.append(ui_elements.Button(
-                550, 140, 40, 40, "<",
-                lambda: screens.collection_screen.set_viewing_gem_to_none(game_state),
-                click_sound=click_sound
-            ))
+        gem = game_state.viewing_gem
+        buttons.extend(widget_registry.get(
+            config.SCREEN_COLLECTION, gem["id"] if gem else None,
+            lambda: build_collection_buttons(game_state)
+        ))
     
     elif current_screen_name == config.SCREEN_KNOWLEDGE_PAGE:
-        lesson_id = game_state.current_lesson_id
-        spread_index = game_state.current_page_index
-
-        if spread_index > 0:
-            buttons.append(ui_elements.Button(
-                config.WIDTH//2 - 150,
-                config.HEIGHT - 110,
-                100,
-                50,
-                "Trước",
-                lambda: handle_button_click_callback(game_state.goto_prev_page),
-                config.COLORS["text"],
-                click_sound=click_sound
-            ))
-
-        if hasattr(game_state, "lesson_spreads") and spread_index < len(game_state.lesson_spreads) - 1:
-            buttons.append(ui_elements.Button(
-                config.WIDTH//2 + 50,
-                config.HEIGHT - 110,
-                100,
-                50,
-                "Tiếp",
-                lambda: handle_button_click_callback(game_state.goto_next_page),
-                config.COLORS["text"],
-                click_sound=click_sound
-            ))
-        else:
-            buttons.append(ui_elements.Button(
-                config.WIDTH//2 + 50,
-                config.HEIGHT - 110, 
-                100, 
-                50, 
-                "Bài tập",
-                lambda: handle_button_click_callback(
-                    screens.knowledge_page_screen.finish_lesson_and_start_quiz, 
-                    game_state, 
-                    lesson_id, 
-                    switch_screen_callback
-                ),
-                config.COLORS["text"],
-                click_sound=click_sound
-            ))
+        key = (
+            game_state.current_lesson_id,
+            game_state.current_page_index,
+            len(getattr(game_state, "lesson_spreads", []) or [])
+        )
+        buttons.extend(widget_registry.get(
+            config.SCREEN_KNOWLEDGE_PAGE, key,
+            lambda: build_knowledge_buttons(game_state, switch_screen_callback, handle_button_click_callback)
+        ))
 
     elif current_screen_name == config.SCREEN_QUIZ_SCREEN:
-        buttons = draw_quiz_screen(
+        quiz_state = getattr(game_state, "quiz_state", None) or {}
+        key = (
+            quiz_state.get("bai"),
+            quiz_state.get("index"),
+            quiz_state.get("answered"),
+            quiz_state.get("selected"),
+            quiz_repository.version
+        )
+        buttons = widget_registry.get(config.SCREEN_QUIZ_SCREEN, key, lambda: draw_quiz_screen(
             SCREEN,
             config.FONT_TITLE,
             config.FONT,
@@ -287,15 +349,78 @@ def get_current_screen_buttons(current_screen_name, game_state, switch_screen_ca
             config.COLORS,
             game_state,
             handle_button_click,
-            quiz_data_module.quiz_data
-        ) or []
+            quiz_repository.get_quiz_data()
+        ))
 
     return buttons
 
-# Khởi tạo các luồng cập nhật nền
-threading.Thread(target=game_state.update_energy_thread, daemon=True).start()
-threading.Thread(target=game_state.update_point_thread, daemon=True).start()
-threading.Thread(target=game_state.update_streak_thread, daemon=True).start()
+def get_setting_screen_buttons(game_state):
+    """Nút của màn hình cài đặt, chỉ dựng lại khi avatar/nhạc/màn hình con thay đổi"""
+    temp_screen = getattr(game_state, 'temp_screen', None)
+    key = (
+        temp_screen,
+        game_state.avatar_path,
+        tuple(game_state.owned_avatars),
+        game_state.current_music
+    )
+
+    def build():
+        if temp_screen == "avatar_selection":
+            return screens.setting_screen.draw_avatar_selection(
+                screen=SCREEN,
+                game_state=game_state,
+                click_sound=click_sound
+            )
+        elif temp_screen == "music_selection":
+            return screens.setting_screen.draw_music_selection(
+                screen=SCREEN,
+                game_state=game_state,
+                click_sound=click_sound
+            )
+        return screens.setting_screen.draw_setting(
+            screen=SCREEN,
+            game_state=game_state,
+            click_sound=click_sound
+        )
+
+    return widget_registry.get(config.SCREEN_SETTING, key, build)
+
+def get_exercise_quiz_buttons(game_state):
+    """Nút đáp án của màn hình làm bài, dựng lại khi sang câu mới hoặc vừa trả lời"""
+    state = getattr(game_state, 'exercise_state', None)
+    if state:
+        key = (id(state), state.get("current_question"), state.get("answered"),
+               state.get("user_answer"), state.get("completed"))
+    else:
+        key = None
+    return widget_registry.get(
+        config.SCREEN_EXERCISE_QUIZ, key,
+        lambda: screens.exercise_screen.build_exercise_quiz_buttons(game_state, switch_screen)
+    )
+
+# Cập nhật nền (năng lượng, điểm, streak) chạy chung trên một luồng hẹn giờ
+game_state.schedule_updates(scheduler)
+scheduler.start()
+
+# File dữ liệu đổi nội dung: các màn hình phản ứng theo event của file_watcher
+# thay vì gọi getmtime mỗi frame
+def on_lessons_file_changed(path, content_hash):
+    screens.lesson_screen.on_lessons_changed(game_state, content_hash)
+    lesson_pages.invalidate()
+    lesson_pages.precompute()
+    # quiz_data được dựng từ lessons.json
+    reload_quiz_data(game_state)
+    renderer.invalidate()
+
+def on_quiz_file_changed(path, content_hash):
+    reload_quiz_data(game_state)
+    renderer.invalidate()
+
+file_watcher.subscribe(config.LESSON_DATA_FILE_PATH, on_lessons_file_changed)
+file_watcher.subscribe(config.QUIZ_DATA_FILE_PATH, on_quiz_file_changed)
+# Đồng bộ hash bài học lúc khởi động (reset tiến độ nếu file đã đổi khi game tắt)
+screens.lesson_screen.on_lessons_changed(game_state, file_watcher.get_hash(config.LESSON_DATA_FILE_PATH))
+file_watcher.start()
 
 # Nút cài đặt hình tròn
 setting_button = ui_elements.CircleButton(
@@ -306,10 +431,24 @@ setting_button = ui_elements.CircleButton(
     click_sound=click_sound
 )
 
+def get_hover_rects():
+    """Các vùng có hiệu ứng hover trên màn hình hiện tại (dùng cho dirty rect)"""
+    rects = [button.rect for button in active_buttons if hasattr(button, "rect")]
+    rects.append(circle_rect(setting_button))
+    if game_state.current_screen == config.SCREEN_LESSON:
+        rects.extend(area["rect"] for area in screens.lesson_screen.lesson_click_areas)
+    elif game_state.current_screen == config.SCREEN_SHOP:
+        rects.extend(screens.shop_screen.item_hover_rects)
+    return rects
+
+HUD_RECT = pygame.Rect(80, config.HEIGHT - 150, 320, 80)
+MESSAGE_RECT = pygame.Rect(config.WIDTH // 2 - 200, config.HEIGHT - 70, 400, 50)
+
 # --- Vòng lặp chính ---
 running = True
 while running:
     for event in pygame.event.get():
+        governor.notify_event(event)
         if event.type == pygame.QUIT:
             running = False
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -321,33 +460,17 @@ while running:
                 for item_info in screens.shop_screen.item_rects:
                     if item_info["rect"].collidepoint(mouse_pos):
                         game_state.purchase_item(item_info["name"], item_info["price"])
-        if event.type == pygame.USEREVENT + 1:
+        if event.type == config.EVENT_EXERCISE_TRANSITION:
             screens.exercise_screen.check_timer_event(game_state, switch_screen, event)
-        if event.type == pygame.USEREVENT and hasattr(event, 'force_redraw'):
-            pygame.display.flip()
-        if event.type == pygame.USEREVENT + 2: 
-            importlib.reload(quiz_data_module)
-            pygame.event.post(pygame.event.Event(pygame.USEREVENT, {'force_redraw': True}))
+        if event.type == config.EVENT_FORCE_REDRAW and hasattr(event, 'force_redraw'):
+            renderer.invalidate()
+        file_watcher.dispatch(event)
+        if event.type == config.EVENT_QUIZ_RELOAD:
+            quiz_repository.invalidate()
+            pygame.event.post(pygame.event.Event(config.EVENT_FORCE_REDRAW, {'force_redraw': True}))
             
         if game_state.current_screen == config.SCREEN_SETTING:
-            if hasattr(game_state, 'temp_screen') and game_state.temp_screen == "avatar_selection":
-                active_buttons = screens.setting_screen.draw_avatar_selection(
-                    screen=SCREEN,
-                    game_state=game_state,
-                    click_sound=click_sound
-                ) or []
-            elif hasattr(game_state, 'temp_screen') and game_state.temp_screen == "music_selection":
-                active_buttons = screens.setting_screen.draw_music_selection(
-                    screen=SCREEN,
-                    game_state=game_state,
-                    click_sound=click_sound
-                ) or []
-            else:
-                active_buttons = screens.setting_screen.draw_setting(
-                    screen=SCREEN,
-                    game_state=game_state,
-                    click_sound=click_sound
-                ) or []
+            active_buttons = get_setting_screen_buttons(game_state)
         else:
             active_buttons = get_current_screen_buttons(
                 game_state.current_screen, 
@@ -359,9 +482,10 @@ while running:
         for button in active_buttons:
             button.handle_event(event)
         setting_button.handle_event(event)
+        renderer.handle_event(event, get_hover_rects())
 
         if game_state.current_screen == config.SCREEN_EXERCISE_QUIZ:
-            active_buttons = screens.exercise_screen.draw_exercise_quiz(SCREEN, game_state, switch_screen) or []
+            active_buttons = get_exercise_quiz_buttons(game_state)
             for button in active_buttons:
                 button.handle_event(event)
 
@@ -374,35 +498,51 @@ while running:
             if game_state.just_closed_detail:
                 game_state.just_closed_detail = False
 
+    # Snapshot nhất quán cho frame này (các luồng nền có thể đang cộng điểm)
+    state_view = game_state.snapshot()
+
+    # Vùng bẩn: HUD, thông báo và hiệu ứng động (chỉ dùng khi bật dirty rect)
+    if renderer.is_active(game_state.current_screen):
+        renderer.watch("hud", (state_view.point, state_view.energy), HUD_RECT)
+        message_visible = bool(game_state.purchase_message) and time.time() - game_state.message_timer < 3
+        renderer.watch("message", (message_visible, game_state.purchase_message), MESSAGE_RECT)
+        if game_state.current_screen == config.SCREEN_ACCOUNT:
+            for rect in screens.account_screen.get_animated_rects(game_state):
+                renderer.mark_dirty(rect)
+
+    if renderer.begin_frame(SCREEN, game_state.current_screen) == SKIP:
+        renderer.present(SCREEN)
+        governor.tick()
+        continue
+
     # Vẽ màn hình
     SCREEN.fill(config.COLORS["bg"])
-    background = os.path.join(config.ASSETS_DIR, "setting", "background.png")
-    back_bg = pygame.image.load(background)
-    back_bg = pygame.transform.scale(back_bg, (960, 640))  
-    SCREEN.blit(back_bg, (0, 0))
+    back_bg = assets.get(BACKGROUND_PATH, (config.WIDTH, config.HEIGHT), alpha=False)
+    if back_bg:
+        SCREEN.blit(back_bg, (0, 0))
 
     if game_state.current_screen != config.SCREEN_EXERCISE and game_state.current_screen != config.SCREEN_EXERCISE_QUIZ and game_state.current_screen != config.SCREEN_KNOWLEDGE_PAGE:
         setting_button.draw(SCREEN)
-        setting_icon = pygame.image.load(os.path.join(config.ASSETS_DIR, "setting", "setting_icon.png"))
-        setting_icon = pygame.transform.scale(setting_icon, (40, 40))
-        SCREEN.blit(setting_icon, (810,50))
+        setting_icon = assets.get(SETTING_ICON_PATH, (40, 40))
+        if setting_icon:
+            SCREEN.blit(setting_icon, (810,50))
         if game_state.current_screen not in (config.SCREEN_ACCOUNT, config.SCREEN_SETTING, config.SCREEN_EXERCISE, config.SCREEN_EXERCISE_QUIZ):
-            try:
-                avatar_img = pygame.image.load(game_state.avatar_path)
-                avatar_img = pygame.transform.scale(avatar_img, (100, 100))
+            avatar_img = assets.get(game_state.avatar_path, (100, 100))
+            if avatar_img:
                 SCREEN.blit(avatar_img, (320, 470))
-            except:
+            else:
                 pygame.draw.circle(SCREEN, config.COLORS["accent"], (65, 60), 50)
             
-            main_1 = f"Điểm: {game_state.point}"
-            main_2 = f"Năng lượng: {game_state.energy}"
-            main_text_1 = config.FONT.render(main_1, True, config.COLORS["text"])
-            main_text_2 = config.FONT.render(main_2, True, config.COLORS["text"])
+            main_1 = f"Điểm: {state_view.point}"
+            main_2 = f"Năng lượng: {state_view.energy}"
+            main_text_1 = ui_elements.render_text(main_1, config.FONT, config.COLORS["text"])
+            main_text_2 = ui_elements.render_text(main_2, config.FONT, config.COLORS["text"])
             SCREEN.blit(main_text_1, (80, config.HEIGHT - 110))
             SCREEN.blit(main_text_2, (80, config.HEIGHT - 150))
 
-    for button in active_buttons:
-        button.draw(SCREEN)
+    if game_state.current_screen != config.SCREEN_EXERCISE_QUIZ:
+        for button in active_buttons:
+            button.draw(SCREEN)
 
     # Vẽ nội dung màn hình hiện tại
     if game_state.current_screen == config.SCREEN_HOME:
@@ -449,7 +589,7 @@ while running:
             config.COLORS,
             game_state,
             handle_button_click,
-            quiz_data_module.quiz_data
+            quiz_repository.get_quiz_data()
         )
     elif game_state.current_screen == config.SCREEN_LOAD:
         result = load_screen.run(SCREEN, switch_screen, click_sound)
@@ -459,13 +599,18 @@ while running:
         if not hasattr(game_state, 'exercise_state') or game_state.exercise_state is None:
             switch_screen(config.SCREEN_EXERCISE)
         else:
-            active_buttons = screens.exercise_screen.draw_exercise_quiz(SCREEN, game_state, switch_screen) or []
+            # Nút đáp án lấy từ WidgetRegistry, vẽ cùng nội dung để chữ nằm trên nút
+            active_buttons = get_exercise_quiz_buttons(game_state)
+            screens.exercise_screen.draw_exercise_quiz(SCREEN, game_state, switch_screen, active_buttons)
     
     if game_state.purchase_message and time.time() - game_state.message_timer < 3:
         ui_elements.draw_message(SCREEN, game_state.purchase_message, config.FONT, config.COLORS, config.WIDTH, config.HEIGHT)
 
-    pygame.display.flip()
+    renderer.present(SCREEN)
+    governor.tick()
 
-game_state.write_data()
+scheduler.stop()
+file_watcher.stop()
+game_state.close()
 pygame.quit()
 sys.exit()
\ No newline at end of file
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Phân trang bài học cho màn hình kiến thức (sách 2 mặt).
+
+Trước đây draw_knowledge_page đọc lại lessons.json mỗi frame và chia dòng/chia
+trang lười trên game_state, không bao giờ xóa khi nạp tài liệu mới (nên hiện
+trang cũ). Ở đây toàn bộ bài học được chia dòng và gom thành các spread một
+lần, lưu cạnh lessons.json với khóa (hash nội dung, font, kích thước trang);
+khóa khác thì tính lại. Mở bài và lật trang chỉ còn là tra cứu.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import config
+import textlayout
+from persistence import atomic_write_json
+
+PAGES_FORMAT = 1
+
+# Bố cục trang (dùng chung với knowledge_page_screen khi vẽ)
+MARGIN_X = 100   # lề trái/phải
+MARGIN_Y = 80    # lề trên
+GUTTER = 150     # khoảng cách giữa 2 mặt giấy
+LINE_SPACING = 5
+FOOTER_HEIGHT = 80
+CONTENT_WIDTH = (config.WIDTH - MARGIN_X * 2 - GUTTER) // 2  # chiều rộng mỗi mặt
+
+
+def _title_text(lesson):
+    return f"{lesson.get('name', '')}: {lesson.get('title', '')}"
+
+
+class LessonPagination:
+    """
+    Args:
+        lessons_path : lessons.json
+        pages_path   : file lưu kết quả phân trang
+    """
+
+    def __init__(self, lessons_path, pages_path):
+        self.lessons_path = lessons_path
+        self.pages_path = pages_path
+        self._lock = threading.RLock()
+        self._stale = True
+        self._lessons = []
+        self._lessons_hash = None
+        self._key = None
+        self._pages = {}
+        self.computed = 0
+        self.loaded = 0
+
+    # -------------------------
+    # Dữ liệu bài học
+    # -------------------------
+    def _refresh_lessons(self):
+        """Đọc lại lessons.json nếu được báo đổi; đổi nội dung thì bỏ phân trang cũ"""
+        if not self._stale:
+            return
+        self._stale = False
+        lessons, digest = [], None
+        if os.path.exists(self.lessons_path):
+            try:
+                with open(self.lessons_path, 'rb') as f:
+                    raw = f.read()
+                lessons = json.loads(raw.decode('utf-8')).get("lessons", [])
+                digest = hashlib.sha256(raw).hexdigest()
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"⚠️ Không đọc được dữ liệu bài học: {e}")
+                lessons, digest = [], None
+        self._lessons = lessons
+        if digest != self._lessons_hash:
+            self._lessons_hash = digest
+            self._key = None
+            self._pages = {}
+
+    def get_lessons(self):
+        """Danh sách bài học (dùng chung, không được sửa)"""
+        with self._lock:
+            self._refresh_lessons()
+            return self._lessons
+
+    def invalidate(self):
+        """Đọc lại lessons.json ở lần truy cập tới (gọi khi file_watcher báo file đổi)"""
+        with self._lock:
+            self._stale = True
+
+    # -------------------------
+    # Phân trang
+    # -------------------------
+    def _make_key(self, font_title, font):
+        line_height = font.get_linesize() + LINE_SPACING
+        usable_height = config.HEIGHT - MARGIN_Y * 2 - FOOTER_HEIGHT
+        return {
+            "lessons_hash": self._lessons_hash,
+            "font": config.describe_font(font),
+            "title_font": config.describe_font(font_title),
+            "content_width": CONTENT_WIDTH,
+            "lines_per_face": max(1, usable_height // line_height),
+        }
+
+    def _paginate(self, lesson, font_title, font, lines_per_face):
+        all_lines = []
+        for paragraph in lesson.get("content", "").split("\n"):
+            if paragraph.strip():
+                all_lines.extend(textlayout.wrap_text(paragraph, font, CONTENT_WIDTH))
+                all_lines.append("")  # dòng trống
+
+        title_lines = list(textlayout.wrap_text(_title_text(lesson), font_title, CONTENT_WIDTH))
+        faces = []
+        idx = 0
+        while idx < len(all_lines):
+            if not faces:
+                # mặt trái đầu tiên có tiêu đề (+1 dòng trống)
+                capacity = max(1, lines_per_face - (len(title_lines) + 1))
+            else:
+                # các mặt sau dùng thêm 1 dòng
+                capacity = lines_per_face + 1
+            faces.append(all_lines[idx:idx + capacity])
+            idx += capacity
+
+        # Gom 2 mặt thành 1 spread
+        spreads = [[faces[i], faces[i + 1] if i + 1 < len(faces) else []]
+                   for i in range(0, len(faces), 2)]
+        return {"title_lines": title_lines, "spreads": spreads or [[[], []]]}
+
+    def _load_persisted(self, key):
+        try:
+            with open(self.pages_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("format") != PAGES_FORMAT or data.get("key") != key:
+            return None
+        pages = data.get("lessons")
+        if not isinstance(pages, dict) or len(pages) != len(self._lessons):
+            return None
+        return pages
+
+    def _ensure_pages(self, font_title, font):
+        self._refresh_lessons()
+        key = self._make_key(font_title, font)
+        if key == self._key:
+            return
+
+        pages = self._load_persisted(key)
+        if pages is not None:
+            self.loaded += 1
+        else:
+            lines_per_face = key["lines_per_face"]
+            pages = {str(i + 1): self._paginate(lesson, font_title, font, lines_per_face)
+                     for i, lesson in enumerate(self._lessons)}
+            self.computed += 1
+            if self._lessons_hash:
+                try:
+                    atomic_write_json(self.pages_path,
+                                      {"format": PAGES_FORMAT, "key": key, "lessons": pages},
+                                      indent=None)
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"⚠️ Không thể lưu phân trang bài học: {e}")
+        self._key = key
+        self._pages = pages
+
+    def precompute(self, font_title=None, font=None):
+        """Phân trang toàn bộ bài học ngay (vd. sau khi nạp tài liệu mới)"""
+        with self._lock:
+            self._ensure_pages(font_title or config.FONT_TITLE, font or config.FONT)
+
+    def get_lesson_pages(self, lesson_id, font_title, font):
+        """
+        Returns:
+            {"title_lines": [...], "spreads": [[mặt trái, mặt phải], ...]}
+            hoặc None nếu bài không tồn tại
+        """
+        with self._lock:
+            self._ensure_pages(font_title, font)
+            return self._pages.get(str(lesson_id))
+
+    def get_stats(self):
+        """Thông tin để debug"""
+        return {
+            "lessons": len(self._lessons),
+            "paginated": len(self._pages),
+            "computed": self.computed,
+            "loaded_from_disk": self.loaded,
+            "key": self._key,
+        }
+
+
+# Instance dùng chung
+lesson_pages = LessonPagination(config.LESSON_DATA_FILE_PATH, config.LESSON_PAGES_FILE_PATH)
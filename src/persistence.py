@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Ghi dữ liệu kiểu write-behind cho GameState.
+
+Thay vì ghi nguyên file JSON mỗi khi có thay đổi (có lúc mỗi giây, có lúc ngay
+trên luồng vẽ), các thay đổi chỉ đánh dấu "dirty". Một luồng ghi duy nhất gộp
+chúng lại và ghi tối đa một lần mỗi `interval` giây, theo kiểu an toàn:
+ghi file tạm -> fsync -> os.replace.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+
+# Mọi writer đang chạy, để flush lần cuối khi thoát process
+_writers = weakref.WeakSet()
+
+
+def atomic_write_json(path, data, indent=4):
+    """Ghi JSON nguyên tử: không bao giờ để lại file ghi dở nếu bị tắt ngang"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehindWriter:
+    """
+    Luồng ghi nền gộp nhiều lần mark_dirty() thành một lần ghi.
+
+    Args:
+        path      : file đích
+        serialize : hàm không tham số trả về dict cần ghi (gọi ngay lúc ghi
+                    nên luôn lấy trạng thái mới nhất)
+        interval  : khoảng cách tối thiểu giữa 2 lần ghi (giây)
+    """
+
+    def __init__(self, path, serialize, interval=5.0):
+        self.path = path
+        self.serialize = serialize
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._stopped = False
+        self._last_write = 0.0
+        self._thread = None
+        self.requests = 0
+        self.writes = 0
+        _writers.add(self)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+            self._thread.start()
+
+    def mark_dirty(self):
+        """Đánh dấu có thay đổi cần ghi (không đụng tới ổ đĩa, gọi được từ mọi luồng)"""
+        with self._cond:
+            self._dirty = True
+            self.requests += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Chờ cho đủ interval kể từ lần ghi trước để gộp các thay đổi
+                while not self._stopped:
+                    remaining = self._last_write + self.interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+            self._write_if_dirty()
+
+    def _write_if_dirty(self):
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                self._dirty = False
+            try:
+                atomic_write_json(self.path, self.serialize())
+                self.writes += 1
+            except Exception as e:
+                print(f"Lỗi khi ghi dữ liệu: {e}")
+                # Giữ cờ để lần ghi sau (hết interval / flush lúc thoát) thử lại
+                with self._cond:
+                    self._dirty = True
+            self._last_write = time.monotonic()
+
+    def flush(self):
+        """Ghi ngay (đồng bộ) nếu còn thay đổi chưa lưu"""
+        self._write_if_dirty()
+
+    def stop(self):
+        """Dừng luồng ghi và đảm bảo lần ghi cuối cùng đã xong"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self):
+        return {"requests": self.requests, "writes": self.writes, "pending": self._dirty}
+
+
+@atexit.register
+def _flush_all_writers():
+    for writer in list(_writers):
+        try:
+            writer.stop()
+        except Exception as e:
+            print(f"⚠️ Không thể lưu dữ liệu khi thoát: {e}")
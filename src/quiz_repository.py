@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Kho dữ liệu câu hỏi dùng chung: bài học, câu trắc nghiệm theo bài (lessons.json)
+và ngân hàng bài tập chia theo độ khó (quiz.json).
+
+Trước đây quiz_data.py parse lessons.json lúc import và được làm mới bằng
+importlib.reload, còn exercise_screen giữ quiz.json trong biến toàn cục riêng,
+không bao giờ đọc lại sau khi nạp tài liệu mới. Ở đây dữ liệu được parse lười
+ở lần truy cập đầu tiên (hoặc đầu tiên sau invalidate), dựng thành một snapshot
+mới rồi thay vào một lần kèm số phiên bản tăng dần. Màn hình chỉ đọc snapshot
+hiện tại (tra dict O(1)), không phải reload module.
+"""
+
+import json
+import threading
+
+import config
+
+DIFFICULTIES = ("easy", "medium", "hard")
+DEFAULT_POINTS = {"easy": 10, "medium": 15, "hard": 20}
+
+# Bộ câu hỏi mẫu khi chưa có quiz.json (giữ như exercise_screen cũ)
+_SAMPLE_EXERCISES = {
+    "easy": [{"id": 1, "question": "Câu hỏi mẫu (dễ)?", "choices": ["A", "B", "C", "D"],
+              "correct_answer": 0, "points": 10}],
+    "medium": [{"id": 1, "question": "Câu hỏi mẫu (trung bình)?", "choices": ["A", "B", "C", "D"],
+                "correct_answer": 1, "points": 15}],
+    "hard": [{"id": 1, "question": "Câu hỏi mẫu (khó)?", "choices": ["A", "B", "C", "D"],
+              "correct_answer": 2, "points": 20}],
+}
+
+
+def build_quiz_data(data):
+    """Câu trắc nghiệm theo bài: {id bài (từ 1): [câu hỏi, ...]}"""
+    if not isinstance(data, dict) or "lessons" not in data:
+        return {}
+    return {
+        index + 1: [  # Sử dụng index + 1 làm ID bài học
+            {
+                "id": q_index,  # Sử dụng chỉ số câu hỏi làm id
+                "question": q["question"],
+                "choices": q["choices"],
+                "answer": q["correct_answer"],
+                "explanation": "",
+                "difficulty": q.get("difficulty", "medium")
+            }
+            for q_index, q in enumerate(lesson.get("questions", []))
+            if "choices" in q  # Chỉ lấy câu hỏi MCQ
+        ]
+        for index, lesson in enumerate(data["lessons"])
+    }
+
+
+def build_exercise_bank(data):
+    """Ngân hàng bài tập {độ khó: [câu hỏi, ...]}, câu thiếu điểm lấy điểm mặc định"""
+    bank = {}
+    for difficulty in DIFFICULTIES:
+        questions = data.get(difficulty, []) if isinstance(data, dict) else []
+        bank[difficulty] = [
+            question if "points" in question else dict(question, points=DEFAULT_POINTS[difficulty])
+            for question in questions
+        ]
+    return bank
+
+
+class _Snapshot:
+    """Dữ liệu tại một phiên bản (dùng chung, không được sửa)"""
+    __slots__ = ("version", "lessons", "quiz_data", "exercise_bank")
+
+    def __init__(self, version, lessons, quiz_data, exercise_bank):
+        self.version = version
+        self.lessons = lessons
+        self.quiz_data = quiz_data
+        self.exercise_bank = exercise_bank
+
+
+class QuizRepository:
+    """
+    Args:
+        lessons_path : lessons.json (bài học + câu trắc nghiệm)
+        quiz_path    : quiz.json (bài tập theo độ khó)
+    """
+
+    def __init__(self, lessons_path, quiz_path):
+        self.lessons_path = lessons_path
+        self.quiz_path = quiz_path
+        self._lock = threading.Lock()
+        self._stale_lessons = True
+        self._stale_quiz = True
+        self._snapshot = _Snapshot(0, [], {}, {d: [] for d in DIFFICULTIES})
+        self.loads = 0
+
+    @staticmethod
+    def _read_json(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_lessons(self, current):
+        try:
+            data = self._read_json(self.lessons_path)
+        except FileNotFoundError:
+            return [], {}
+        except (OSError, ValueError) as e:
+            # File đang ghi dở / hỏng: giữ dữ liệu cũ, lần ghi xong sẽ báo lại
+            print(f"⚠️ Không đọc được dữ liệu bài học {self.lessons_path}: {e}")
+            return current.lessons, current.quiz_data
+        try:
+            lessons = data.get("lessons", []) if isinstance(data, dict) else []
+            return lessons, build_quiz_data(data)
+        except (KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ Dữ liệu câu hỏi bài học không hợp lệ: {e}")
+            return current.lessons, current.quiz_data
+
+    def _load_exercises(self, current):
+        try:
+            data = self._read_json(self.quiz_path)
+        except FileNotFoundError:
+            return _SAMPLE_EXERCISES
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Không đọc được dữ liệu bài tập {self.quiz_path}: {e}")
+            return current.exercise_bank
+        try:
+            return build_exercise_bank(data)
+        except (TypeError, AttributeError) as e:
+            print(f"⚠️ Dữ liệu bài tập không hợp lệ: {e}")
+            return current.exercise_bank
+
+    def _current(self):
+        """Snapshot hiện tại, parse lại phần bị đánh dấu đổi trước khi trả về"""
+        snapshot = self._snapshot
+        if not (self._stale_lessons or self._stale_quiz):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            stale_lessons, stale_quiz = self._stale_lessons, self._stale_quiz
+            if not (stale_lessons or stale_quiz):
+                return snapshot
+            # Xóa cờ trước khi đọc: invalidate() trong lúc đọc sẽ đặt lại cờ
+            self._stale_lessons = self._stale_quiz = False
+            lessons, quiz_data = (self._load_lessons(snapshot) if stale_lessons
+                                  else (snapshot.lessons, snapshot.quiz_data))
+            exercise_bank = self._load_exercises(snapshot) if stale_quiz else snapshot.exercise_bank
+            # Dựng xong mới thay một lần: người đọc không bao giờ thấy dữ liệu nửa cũ nửa mới
+            self._snapshot = snapshot = _Snapshot(snapshot.version + 1, lessons, quiz_data, exercise_bank)
+            self.loads += 1
+            return snapshot
+
+    def invalidate(self, lessons=True, quiz=True):
+        """Đánh dấu dữ liệu cần đọc lại ở lần truy cập tới (gọi khi file_watcher báo file đổi)"""
+        with self._lock:
+            self._stale_lessons = self._stale_lessons or lessons
+            self._stale_quiz = self._stale_quiz or quiz
+
+    @property
+    def version(self):
+        """Số phiên bản dữ liệu, tăng mỗi lần thay snapshot (dùng làm khóa cache)"""
+        return self._current().version
+
+    def get_lessons(self):
+        return self._current().lessons
+
+    def get_quiz_data(self):
+        """{id bài: [câu trắc nghiệm, ...]}"""
+        return self._current().quiz_data
+
+    def get_lesson_questions(self, lesson_id):
+        """Câu trắc nghiệm của một bài, () nếu bài không có"""
+        return self._current().quiz_data.get(lesson_id, ())
+
+    def get_exercise_bank(self):
+        """{"easy"/"medium"/"hard": [câu hỏi, ...]}"""
+        return self._current().exercise_bank
+
+    def get_exercises(self, difficulty):
+        return self._current().exercise_bank.get(difficulty, [])
+
+    def get_stats(self):
+        """Thông tin để debug"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "loads": self.loads,
+            "lessons": len(snapshot.lessons),
+            "mcq": sum(len(q) for q in snapshot.quiz_data.values()),
+            "exercises": {d: len(q) for d, q in snapshot.exercise_bank.items()},
+            "stale": self._stale_lessons or self._stale_quiz,
+        }
+
+
+# Instance dùng chung
+quiz_repository = QuizRepository(config.LESSON_DATA_FILE_PATH, config.QUIZ_DATA_FILE_PATH)
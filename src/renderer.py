@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Chế độ vẽ theo vùng bẩn (dirty rect) cho vòng lặp chính.
+
+Thay vì fill + vẽ lại mọi thứ + flip() ở mỗi vòng lặp, renderer ghi nhận những
+vùng thực sự thay đổi (nút đổi trạng thái hover, HUD điểm/năng lượng, thông báo,
+vùng có hiệu ứng động) rồi chỉ vẽ lại trong các vùng đó và gọi
+pygame.display.update(rects).
+
+Chỉ bật khi config.DIRTY_RECT_RENDERING = True và màn hình hiện tại nằm trong
+config.DIRTY_RECT_SCREENS. Mọi event không phải di chuột đều buộc vẽ lại toàn bộ
+nên hành vi các màn hình không bị thay đổi.
+"""
+
+import pygame
+
+import config
+
+FULL = "full"
+PARTIAL = "partial"
+SKIP = "skip"
+
+_MISSING = object()
+
+
+class DirtyRenderer:
+    def __init__(self, size, enabled=False, screens=()):
+        self.enabled = enabled
+        self.screens = set(screens)
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self._full = True
+        self._dirty = []
+        self._watched = {}
+        self._last_screen = None
+        self._last_mouse = None
+        self._mode = FULL
+        self.stats = {FULL: 0, PARTIAL: 0, SKIP: 0}
+
+    def is_active(self, screen_name):
+        return self.enabled and screen_name in self.screens
+
+    def invalidate(self):
+        """Buộc vẽ lại toàn bộ màn hình ở frame kế tiếp"""
+        self._full = True
+
+    def mark_dirty(self, rect):
+        rect = pygame.Rect(rect).clip(self.screen_rect)
+        if rect.width and rect.height:
+            self._dirty.append(rect)
+
+    def watch(self, name, value, rect=None):
+        """
+        Theo dõi một giá trị hiển thị (vd: điểm, năng lượng). Khi giá trị đổi thì
+        đánh dấu rect là vùng bẩn (rect=None -> vẽ lại toàn bộ).
+        """
+        if self._watched.get(name, _MISSING) == value:
+            return
+        self._watched[name] = value
+        if rect is None:
+            self.invalidate()
+        else:
+            self.mark_dirty(rect)
+
+    def handle_event(self, event, hover_rects=()):
+        """
+        Di chuột chỉ làm bẩn các vùng tương tác mà trạng thái hover thay đổi,
+        các event còn lại (click, phím, timer...) vẽ lại toàn bộ.
+        """
+        if event.type == pygame.MOUSEMOTION:
+            new_pos = event.pos
+            old_pos = self._last_mouse if self._last_mouse is not None else new_pos
+            for rect in hover_rects:
+                if rect.collidepoint(old_pos) != rect.collidepoint(new_pos):
+                    self.mark_dirty(rect.inflate(8, 8))
+            self._last_mouse = new_pos
+        else:
+            self.invalidate()
+
+    def begin_frame(self, surface, screen_name):
+        """
+        Quyết định cách vẽ frame hiện tại.
+
+        Returns:
+            FULL    : vẽ lại cả màn hình rồi flip
+            PARTIAL : vẽ như bình thường nhưng đã set_clip vào các vùng bẩn
+            SKIP    : không có gì thay đổi, bỏ qua việc vẽ
+        """
+        if not self.is_active(screen_name) or self._full or screen_name != self._last_screen:
+            self._mode = FULL
+        elif self._dirty:
+            self._mode = PARTIAL
+            surface.set_clip(self._dirty[0].unionall(self._dirty[1:]))
+        else:
+            self._mode = SKIP
+        self._last_screen = screen_name
+        self.stats[self._mode] += 1
+        return self._mode
+
+    def present(self, surface):
+        """Đưa frame lên màn hình theo chế độ đã chọn ở begin_frame()"""
+        if self._mode == FULL:
+            pygame.display.flip()
+        elif self._mode == PARTIAL:
+            surface.set_clip(None)
+            pygame.display.update(self._dirty)
+        self._dirty = []
+        self._full = False
+
+
+def circle_rect(button):
+    """Rect bao quanh một CircleButton (dùng cho vùng hover)"""
+    return pygame.Rect(button.x - button.radius, button.y - button.radius,
+                       button.radius * 2, button.radius * 2)
+
+
+renderer = DirtyRenderer((config.WIDTH, config.HEIGHT),
+                         enabled=config.DIRTY_RECT_RENDERING,
+                         screens=config.DIRTY_RECT_SCREENS)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Bộ hẹn giờ dùng chung cho game (một luồng duy nhất).
+
+Thay cho nhiều luồng nền mỗi luồng tự sleep() theo chu kỳ riêng: mỗi job tự
+tính thời điểm chạy kế tiếp (vd: lần hồi năng lượng tới, nửa đêm kế tiếp) và
+luồng hẹn giờ chỉ thức dậy đúng lúc có việc cần làm.
+
+Các timer kiểu pygame USEREVENT (vd: chuyển câu trong bài tập) cũng đi qua đây
+để có thể xem toàn bộ timer đang chờ bằng pending().
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pygame
+
+# Chờ tối đa chừng này giây mỗi lần khi có job theo giờ thực: đồng hồ monotonic
+# dừng khi máy ngủ (suspend) nên hạn theo giờ thực phải được kiểm tra lại khi thức
+WALL_CLOCK_MAX_WAIT = 60.0
+
+
+def seconds_until_next_midnight(now=None):
+    """Số giây tới 00:00 (giờ địa phương) của ngày kế tiếp"""
+    now = now or datetime.now()
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+class _Job:
+    __slots__ = ("name", "callback", "next_delay", "deadline", "wall_clock", "wall_deadline",
+                 "generation", "runs")
+
+    def __init__(self, name, callback, next_delay, wall_clock=False):
+        self.name = name
+        self.callback = callback
+        self.next_delay = next_delay  # None -> chạy một lần
+        self.deadline = 0.0
+        self.wall_clock = wall_clock  # True -> hạn tính theo giờ thực (time.time())
+        self.wall_deadline = None
+        self.generation = 0
+        self.runs = 0
+
+
+class Scheduler:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._jobs = {}
+        self._event_timers = {}
+        self._seq = itertools.count()
+        self._thread = None
+        self._stopped = False
+
+    # --- Job chạy trên luồng hẹn giờ ---
+    def _push(self, job, delay):
+        job.generation += 1
+        job.deadline = time.monotonic() + max(0.0, delay)
+        if job.wall_clock:
+            job.wall_deadline = time.time() + max(0.0, delay)
+        heapq.heappush(self._heap, (job.deadline, next(self._seq), job.name, job.generation))
+        self._cond.notify()
+
+    def every(self, name, next_delay, callback, first_delay=None, wall_clock=False):
+        """
+        Chạy callback lặp lại. next_delay() trả về số giây tới lần chạy kế tiếp,
+        được gọi lại sau mỗi lần chạy nên có thể thay đổi theo trạng thái game.
+
+        wall_clock=True cho job gắn với giờ thực (vd. qua nửa đêm): job vẫn chạy
+        đúng lúc sau khi máy ngủ qua hạn, trễ tối đa WALL_CLOCK_MAX_WAIT giây.
+        """
+        with self._cond:
+            job = _Job(name, callback, next_delay, wall_clock)
+            self._jobs[name] = job
+            self._push(job, next_delay() if first_delay is None else first_delay)
+
+    def call_later(self, name, delay, callback):
+        """Chạy callback một lần sau delay giây"""
+        with self._cond:
+            job = _Job(name, callback, None)
+            self._jobs[name] = job
+            self._push(job, delay)
+
+    def reschedule(self, name, delay=None):
+        """Tính lại hạn chạy của job (vd: vừa mua bùa tăng tốc điểm)"""
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return
+            if delay is None:
+                delay = job.next_delay() if job.next_delay else 0.0
+            self._push(job, delay)
+
+    def cancel(self, name):
+        with self._cond:
+            self._jobs.pop(name, None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _wake_wall_clock_jobs(self):
+        """Đưa job theo giờ thực đã quá hạn (vd. máy vừa thức dậy) lên chạy ngay"""
+        now_wall = time.time()
+        has_wall_jobs = False
+        for job in self._jobs.values():
+            if job.wall_deadline is None:
+                continue
+            has_wall_jobs = True
+            if job.wall_deadline <= now_wall and job.deadline > time.monotonic():
+                job.generation += 1
+                job.deadline = time.monotonic()
+                heapq.heappush(self._heap, (job.deadline, next(self._seq), job.name, job.generation))
+        return has_wall_jobs
+
+    def _next_due(self):
+        """Lấy job tới hạn (gọi khi đang giữ lock), None nếu phải chờ tiếp"""
+        has_wall_jobs = self._wake_wall_clock_jobs()
+        while self._heap:
+            deadline, _, name, generation = self._heap[0]
+            job = self._jobs.get(name)
+            if job is None or job.generation != generation:
+                heapq.heappop(self._heap)  # bản ghi cũ (đã hủy / đã hẹn lại)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                if has_wall_jobs:
+                    remaining = min(remaining, WALL_CLOCK_MAX_WAIT)
+                self._cond.wait(remaining)
+                return None
+            heapq.heappop(self._heap)
+            if job.next_delay is None:
+                del self._jobs[name]
+            return job
+        self._cond.wait()
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                job = self._next_due()
+            if job is None:
+                continue
+            try:
+                job.callback()
+            except Exception as e:
+                print(f"⚠️ Lỗi trong timer '{job.name}': {e}")
+            job.runs += 1
+            if job.next_delay is not None:
+                with self._cond:
+                    if self._jobs.get(job.name) is job:
+                        self._push(job, job.next_delay())
+
+    # --- Timer dạng pygame event (chạy trên luồng chính qua hàng đợi event) ---
+    def set_event_timer(self, event_type, millis, loops=0):
+        """Bọc pygame.time.set_timer để timer được ghi nhận trong pending()"""
+        pygame.time.set_timer(event_type, millis, loops)
+        with self._cond:
+            self._event_timers[event_type] = (millis, loops, time.monotonic())
+
+    def clear_event_timer(self, event_type):
+        pygame.time.set_timer(event_type, 0)
+        with self._cond:
+            self._event_timers.pop(event_type, None)
+
+    def pending(self):
+        """Danh sách timer đang chờ: [(tên, số giây còn lại), ...] sắp theo thời gian"""
+        now = time.monotonic()
+        now_wall = time.time()
+        with self._cond:
+            result = [(job.name, max(0.0, (job.wall_deadline - now_wall) if job.wall_deadline is not None
+                                     else (job.deadline - now)))
+                      for job in self._jobs.values()]
+            for event_type, (millis, loops, started) in self._event_timers.items():
+                elapsed = now - started
+                period = millis / 1000.0
+                remaining = period - (elapsed % period) if period else 0.0
+                result.append((f"event:{event_type}", remaining))
+        return sorted(result, key=lambda item: item[1])
+
+
+# Instance dùng chung cho toàn bộ game
+scheduler = Scheduler()
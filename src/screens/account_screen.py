@@ -1,6 +1,9 @@
 import pygame
 import config
 import ui_elements
+from assets import assets
+from framerate import governor
+from effects import effects, wave_frame, cycle_frame, PULSE_FRAMES, SPARKLE_FRAMES
 import os
 import math  
 from pygame import gfxdraw
@@ -13,18 +16,56 @@ def set_click_sound(sound):
     global click_sound
     click_sound = sound
 
-def draw_account(screen, font_title, font, colors, game_state):
+# Kích thước khung thành tựu (góc dưới bên phải)
+ACHIEVEMENT_BOX_SIZE = (310, 160)
+ACHIEVEMENT_BOX_MARGIN = 30
+
+
+def _card_geometry():
+    """Trả về (card_x, card_width) của card tài khoản"""
     menu_width = 190
-    # Tính toán vị trí và kích thước mới cho card
     available_width = config.WIDTH - menu_width
     card_width = 600
     card_x = menu_width + (available_width - card_width) // 2
+    return card_x, card_width
+
+
+def _achievement_box_pos():
+    box_width, box_height = ACHIEVEMENT_BOX_SIZE
+    box_x = config.WIDTH - box_width - ACHIEVEMENT_BOX_MARGIN - 80
+    box_y = config.HEIGHT - box_height - ACHIEVEMENT_BOX_MARGIN - 90
+    return box_x, box_y
+
+
+def get_animated_rects(game_state):
+    """
+    Các vùng có hiệu ứng động (huy chương, khung thành tựu + hạt bay quanh),
+    dùng cho chế độ dirty rect để vẽ lại mỗi frame.
+    """
+    rects = []
+    card_x, card_width = _card_geometry()
+    if game_state.streak >= 2:
+        medal_x = card_x + card_width - 100
+        # huy chương (bán kính 55 + bóng + đung đưa) và dải ruy băng phía dưới
+        rects.append(pygame.Rect(medal_x - 80, 90, 160, 240))
+    if len({g["id"] for g in game_state.collected_gems}) >= 3:
+        box_x, box_y = _achievement_box_pos()
+        box_width, box_height = ACHIEVEMENT_BOX_SIZE
+        center = (box_x + box_width // 2, box_y + box_height // 2)
+        # hạt lấp lánh bay tối đa ~175px quanh tâm khung
+        rects.append(pygame.Rect(0, 0, 360, 360).move(center[0] - 180, center[1] - 180))
+    return rects
+
+
+def draw_account(screen, font_title, font, colors, game_state):
+    # Tính toán vị trí và kích thước mới cho card
+    card_x, card_width = _card_geometry()
     card_rect = pygame.Rect(card_x, 50, card_width, 500)
     
     
     # Vẽ tiêu đề với hiệu ứng bóng đổ
-    title_text = font_title.render("TÀI KHOẢN", True, (255, 255, 255))
-    title_shadow = font_title.render("TÀI KHOẢN", True, (0, 0, 0, 100))
+    title_text = ui_elements.render_text("TÀI KHOẢN", font_title, (255, 255, 255))
+    title_shadow = ui_elements.render_text("TÀI KHOẢN", font_title, (0, 0, 0, 100))
     
     # Tính toán vị trí tiêu đề (căn giữa card)
     title_x = 140
@@ -39,22 +80,21 @@ def draw_account(screen, font_title, font, colors, game_state):
     
     # Vẽ avatar (căn giữa card)
     avatar_x = card_x + (card_width // 2) - 5
-    try:
-        avatar_image = pygame.image.load(game_state.avatar_path)
-        avatar_image = pygame.transform.scale(avatar_image, (120, 120))
+    avatar_image = assets.get(game_state.avatar_path, (120, 120))
+    if avatar_image:
         avatar_rect = avatar_image.get_rect(center=(avatar_x + 60, 180))
         screen.blit(avatar_image, avatar_rect)
-    except Exception as e:
-        print(f"Không thể tải avatar: {e}")
+    else:
         pygame.draw.circle(screen, colors["accent"], (avatar_x + 60, 180), 100)
     
-    # Danh sách thông tin tài khoản
+    # Danh sách thông tin tài khoản (đọc từ snapshot để các giá trị nhất quán)
+    state = game_state.snapshot()
     account_info = [
-        {"label": "Streak:", "value": str(game_state.streak), "color": (255, 100, 0)},
-        {"label": "Ngày hôm nay:", "value": game_state.last_day.strftime('%d/%m/%Y'), "color": colors["text"]},
-        {"label": "Điểm:", "value": str(game_state.point), "color": (210, 150, 0)},
-        {"label": "Năng lượng:", "value": f"{game_state.energy}/10", "color": (0, 200, 255)},
-        {"label": "Thẻ bảo vệ:", "value": str(game_state.the_streak), "color": (100, 200, 100)},
+        {"label": "Streak:", "value": str(state.streak), "color": (255, 100, 0)},
+        {"label": "Ngày hôm nay:", "value": state.last_day.strftime('%d/%m/%Y'), "color": colors["text"]},
+        {"label": "Điểm:", "value": str(state.point), "color": (210, 150, 0)},
+        {"label": "Năng lượng:", "value": f"{state.energy}/10", "color": (0, 200, 255)},
+        {"label": "Thẻ bảo vệ:", "value": str(state.the_streak), "color": (100, 200, 100)},
     ]
     
     # Vẽ các thông tin tài khoản
@@ -62,11 +102,11 @@ def draw_account(screen, font_title, font, colors, game_state):
         y_position = 200 + index * 60
         
         # Vẽ nhãn (căn trái với lề 100px từ card)
-        label_surface = font.render(info["label"], True, colors["text"])
+        label_surface = ui_elements.render_text(info["label"], font, colors["text"])
         screen.blit(label_surface, (100, y_position))
         
         # Vẽ giá trị (căn trái với lề 300px từ card)
-        value_surface = font.render(info["value"], True, info["color"])
+        value_surface = ui_elements.render_text(info["value"], font, info["color"])
         screen.blit(value_surface, (300, y_position))
         
     # Vẽ huy chương (truyền game_state vào)
@@ -78,9 +118,6 @@ def draw_account(screen, font_title, font, colors, game_state):
     
 def draw_medal(screen, center_x, center_y, game_state, font):
     """Vẽ huy chương đẹp với hiệu ứng đung đưa như trong gió"""
-    import pygame.gfxdraw as gfxdraw
-    import math
-
     streak = game_state.streak
     
     # Xác định cấp độ và màu sắc theo streak
@@ -105,8 +142,10 @@ def draw_medal(screen, center_x, center_y, game_state, font):
         shine_color = (255, 250, 205)
         medal_type = "gold"
         
+    # Huy chương luôn đung đưa -> cần chạy đủ FPS khi đang hiển thị
+    governor.request_full_rate()
+
     radius = 55
-    shadow_offset = 6
 
     # Hiệu ứng đung đưa như trong gió
     time = pygame.time.get_ticks() / 1000.0
@@ -118,51 +157,14 @@ def draw_medal(screen, center_x, center_y, game_state, font):
     # Xoay nhẹ như đang lắc lư
     rotation_angle = 4 * math.sin(time * 1.8)
     
-    # Hiệu ứng nhấp nháy nhẹ
-    pulse_scale = 1.0 + 0.03 * math.sin(time * 2.5)
-    
     # Áp dụng offset đung đưa
     medal_x = center_x + swing_x
     medal_y = center_y + swing_y
 
-    # Vẽ bóng đổ mềm mại hơn
-    for i in range(5):
-        shadow_alpha = 20 - i * 3
-        gfxdraw.filled_circle(screen, 
-                             int(medal_x + shadow_offset), 
-                             int(medal_y + shadow_offset + i), 
-                             int(radius + 6 - i), 
-                             (0, 0, 0, shadow_alpha))
-
-    # Vẽ vòng ngoài với gradient đẹp hơn
-    for r in range(radius, int(radius * 0.7), -1):
-        progress = (radius - r) / (radius * 0.3)
-        # Tạo gradient từ tối đến sáng
-        color_r = int(outer_color[0] + (inner_color[0] - outer_color[0]) * progress)
-        color_g = int(outer_color[1] + (inner_color[1] - outer_color[1]) * progress)
-        color_b = int(outer_color[2] + (inner_color[2] - outer_color[2]) * progress)
-        gfxdraw.filled_circle(screen, int(medal_x), int(medal_y), 
-                             int(r * pulse_scale), (color_r, color_g, color_b))
-
-    # Vẽ vòng trong sáng bóng
-    inner_radius = int((radius - 10) * pulse_scale)
-    gfxdraw.filled_circle(screen, int(medal_x), int(medal_y), inner_radius, inner_color)
-
-    # Vẽ ánh sáng phản chiếu (highlight)
-    highlight_offset_x = -radius // 4
-    highlight_offset_y = -radius // 3
-    for i in range(15, 0, -3):
-        alpha = int(80 * (i / 15))
-        gfxdraw.filled_circle(screen, 
-                             int(medal_x + highlight_offset_x), 
-                             int(medal_y + highlight_offset_y), 
-                             i, (*shine_color, alpha))
-
-    # Viền nổi 3D
-    pygame.draw.circle(screen, accent_color, (int(medal_x), int(medal_y)), 
-                      inner_radius, 4)
-    pygame.draw.circle(screen, shine_color, (int(medal_x), int(medal_y)), 
-                      inner_radius - 2, 2)
+    # Thân huy chương (bóng, gradient, viền) dựng sẵn theo từng mức nhịp
+    medal_sprite = effects.medal_body(outer_color, inner_color, accent_color, shine_color,
+                                      wave_frame(math.sin(time * 2.5), PULSE_FRAMES), radius=radius)
+    effects.blit_centered(screen, medal_sprite, (medal_x, medal_y))
 
     # Ruy băng đẹp hơn với hiệu ứng gió
     ribbon_width = 24
@@ -281,14 +283,13 @@ def draw_medal(screen, center_x, center_y, game_state, font):
     streak_glow = int(255 * (0.8 + 0.2 * math.sin(time * 4)))
     
     # Bóng đổ cho text
-    streak_shadow = font.render(str(streak), True, (0, 0, 0))
+    streak_shadow = ui_elements.render_text(str(streak), font, (0, 0, 0))
     shadow_rect = streak_shadow.get_rect(center=(int(medal_x + 1), int(medal_y + 1)))
     screen.blit(streak_shadow, shadow_rect)
     
     # Text chính
-    streak_text = font.render(str(streak), True, (255, 255, 255, streak_glow))
-    text_rect = streak_text.get_rect(center=(int(medal_x), int(medal_y)))
-    screen.blit(streak_text, text_rect)
+    effects.blit_centered(screen, effects.text(str(streak), font, (255, 255, 255)),
+                          (medal_x, medal_y), streak_glow)
 
 
 def draw_achievement_box(screen, game_state, font, font_title):
@@ -331,17 +332,15 @@ def draw_achievement_box(screen, game_state, font, font_title):
     else:
         return  # Không vẽ nếu chưa đạt thành tựu
 
+    governor.request_full_rate()
+
     # Hiệu ứng động
     time = pygame.time.get_ticks() / 1000.0
-    pulse_scale = 1.0 + 0.015 * math.sin(time * 2.5)
     glow_intensity = int(50 + 30 * math.sin(time * 3))
     
     # Vị trí góc dưới bên phải
-    box_width = 310
-    box_height = 160
-    margin = 30
-    box_x = config.WIDTH - box_width - margin - 80
-    box_y = config.HEIGHT - box_height - margin - 90
+    box_width, box_height = ACHIEVEMENT_BOX_SIZE
+    box_x, box_y = _achievement_box_pos()
     
     # Vẽ particles bay xung quanh
     for i in range(8):
@@ -355,115 +354,51 @@ def draw_achievement_box(screen, game_state, font, font_title):
         draw_sparkle(screen, int(particle_x), int(particle_y), 
                     (*particles_color, particle_alpha), int(particle_size))
     
-    # Vẽ hiệu ứng phát sáng nhiều lớp
-    for i in range(5):
-        glow_offset = 10 - i * 2
-        glow_rect = pygame.Rect(box_x - glow_offset, box_y - glow_offset, 
-                                box_width + glow_offset * 2, box_height + glow_offset * 2)
-        glow_surface = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-        current_alpha = max(10, glow_intensity - i * 10)
-        current_glow = (*glow_color[:3], current_alpha)
-        pygame.draw.rect(glow_surface, current_glow, glow_surface.get_rect(), border_radius=20)
-        screen.blit(glow_surface, glow_rect)
-    
-    # Vẽ nền chính với gradient
-    main_rect = pygame.Rect(box_x, box_y, box_width, box_height)
-    
-    # Gradient effect đẹp hơn
-    for i in range(box_height):
-        progress = i / box_height
-        # Gradient từ sáng xuống tối nhẹ
-        gradient_factor = int(15 * progress)
-        color_layer = (max(0, bg_color[0] - gradient_factor), 
-                      max(0, bg_color[1] - gradient_factor), 
-                      max(0, bg_color[2] - gradient_factor))
-        pygame.draw.line(screen, color_layer, 
-                        (box_x + 15, box_y + i), 
-                        (box_x + box_width - 15, box_y + i))
-    
-    pygame.draw.rect(screen, bg_color, main_rect, border_radius=18)
-    
-    # Viền vàng/bạc/đỏ với hiệu ứng sáng động
-    border_alpha = int(255 * (0.9 + 0.1 * math.sin(time * 5)))
-    pygame.draw.rect(screen, (*border_color[:3], border_alpha), main_rect, width=5, border_radius=18)
-    
-    # Viền sáng bên trong
-    inner_border = pygame.Rect(box_x + 6, box_y + 6, box_width - 12, box_height - 12)
+    # Hiệu ứng phát sáng nhiều lớp (dựng sẵn ở cường độ cao nhất, nhấp nháy bằng alpha)
+    glow_sprite = effects.achievement_glow(ACHIEVEMENT_BOX_SIZE, glow_color)
+    effects.blit_at(screen, glow_sprite, (box_x - 10, box_y - 10), 255 * glow_intensity / 80)
+    
+    # Nền, viền, glow của icon và đường kẻ trang trí
+    effects.blit_at(screen, effects.achievement_panel(ACHIEVEMENT_BOX_SIZE, bg_color, border_color, icon_color),
+                    (box_x, box_y))
     lighter_border = tuple(min(255, c + 50) for c in border_color[:3])
-    pygame.draw.rect(screen, lighter_border, inner_border, width=2, border_radius=15)
     
-    # Hiệu ứng icon xoay và phóng to
-    icon_rotation = 5 * math.sin(time * 2)
-    icon_scale = 1.0 + 0.1 * math.sin(time * 3)
+    # Hiệu ứng icon phóng to và nhấp nháy
+    icon_frame = wave_frame(math.sin(time * 3), PULSE_FRAMES)
     icon_alpha = int(220 + 35 * math.sin(time * 4))
     
-    # Vẽ glow cho icon
-    for glow_r in range(35, 15, -5):
-        glow_alpha = int(30 * (glow_r - 15) / 20)
-        gfxdraw.filled_circle(screen, box_x + 40, int(box_y + 35), 
-                             glow_r, (*icon_color, glow_alpha))
-    
-    # Vẽ icon với hiệu ứng
-    icon_surface = pygame.Surface((80, 80), pygame.SRCALPHA)
-    icon_text = font_title.render(icon, True, (*icon_color, icon_alpha))
-    icon_text = pygame.transform.scale(icon_text, 
-                                      (int(icon_text.get_width() * icon_scale),
-                                       int(icon_text.get_height() * icon_scale)))
-    icon_rect = icon_text.get_rect(center=(40, 40))
-    icon_surface.blit(icon_text, icon_rect)
-    
     # Bóng cho icon
-    shadow_text = font_title.render(icon, True, (0, 0, 0, 100))
-    shadow_rect = shadow_text.get_rect(center=(box_x + 42, int(box_y + 37)))
-    screen.blit(shadow_text, shadow_rect)
+    effects.blit_centered(screen, effects.text(icon, font_title, (0, 0, 0)), (box_x + 42, box_y + 37), 100)
     
-    screen.blit(icon_surface, (box_x, int(box_y)))
+    # Vẽ icon với hiệu ứng
+    icon_text = effects.scaled_text(icon, font_title, icon_color, icon_frame, 0.9, 1.1)
+    effects.blit_centered(screen, icon_text, (box_x + 40, box_y + 40), icon_alpha)
     
-    # Vẽ tiêu đề với hiệu ứng gradient color
+    # Vẽ tiêu đề (bóng trước)
     title_alpha = int(255 * (0.95 + 0.05 * math.sin(time * 4)))
-    title_surface = font_title.render(title, True, (*text_color, title_alpha))
-    title_rect = title_surface.get_rect(midleft=(box_x + 85, int(box_y + 40)))
-    
-    # Bóng cho text
-    title_shadow = font_title.render(title, True, (0, 0, 0, 80))
-    shadow_rect = title_shadow.get_rect(midleft=(box_x + 86, int(box_y + 42)))
-    screen.blit(title_shadow, shadow_rect)
-    screen.blit(title_surface, title_rect)
+    title_shadow = effects.text(title, font_title, (0, 0, 0))
+    effects.blit_at(screen, title_shadow, title_shadow.get_rect(midleft=(box_x + 86, box_y + 42)), 80)
+    title_surface = effects.text(title, font_title, text_color)
+    effects.blit_at(screen, title_surface, title_surface.get_rect(midleft=(box_x + 85, box_y + 40)), title_alpha)
     
     # Vẽ subtitle với hiệu ứng
     subtitle_alpha = int(200 + 55 * math.sin(time * 3.5))
-    subtitle_surface = font.render(subtitle, True, (*text_color, subtitle_alpha))
-    subtitle_rect = subtitle_surface.get_rect(midleft=(box_x + 85, int(box_y + 80)))
-    screen.blit(subtitle_surface, subtitle_rect)
-    
-    # Đường kẻ trang trí với hiệu ứng chảy
-    line_y = int(box_y + 95)
-    line_progress = (time * 0.5) % 1.0
-    
-    # Vẽ đường kẻ cơ bản
-    line_alpha = int(200 + 55 * math.sin(time * 3))
-    pygame.draw.line(screen, (*border_color, line_alpha), 
-                    (box_x + 20, line_y + 5), 
-                    (box_x + box_width - 20, line_y + 5), 3)
+    subtitle_surface = effects.text(subtitle, font, text_color)
+    effects.blit_at(screen, subtitle_surface, subtitle_surface.get_rect(midleft=(box_x + 85, box_y + 80)),
+                    subtitle_alpha)
     
     # Vẽ điểm sáng chạy trên đường kẻ
+    line_progress = (time * 0.5) % 1.0
     shine_x = box_x + 20 + int((box_width - 40) * line_progress)
-    for r in range(8, 0, -2):
-        shine_alpha = int(150 * (r / 8))
-        gfxdraw.filled_circle(screen, shine_x, line_y+5, r, 
-                             (*lighter_border, shine_alpha))
+    effects.blit_centered(screen, effects.shine_dot(lighter_border), (shine_x, box_y + 100))
     
     # Vẽ thông tin số lượng gems với hiệu ứng
     info_text = f"Đã sưu tầm: {count} viên ngọc"
     info_alpha = int(255 * (0.9 + 0.1 * math.sin(time * 2.5)))
-    info_surface = font.render(info_text, True, (*text_color, info_alpha))
-    info_rect = info_surface.get_rect(center=(box_x + box_width // 2, int(box_y + 125)))
-    
-    # Bóng cho info text
-    info_shadow = font.render(info_text, True, (0, 0, 0, 60))
-    shadow_rect = info_shadow.get_rect(center=(box_x + box_width // 2 + 1, int(box_y + 127)))
-    screen.blit(info_shadow, shadow_rect)
-    screen.blit(info_surface, info_rect)
+    effects.blit_centered(screen, effects.text(info_text, font, (0, 0, 0)),
+                          (box_x + box_width // 2 + 1, box_y + 127), 60)
+    effects.blit_centered(screen, effects.text(info_text, font, text_color),
+                          (box_x + box_width // 2, box_y + 125), info_alpha)
     
     # Vẽ các ngôi sao trang trí với hiệu ứng bay
     star_positions = [
@@ -485,49 +420,15 @@ def draw_achievement_box(screen, game_state, font, font_title):
 
 
 def draw_sparkle(screen, x, y, color, size):
-    """Vẽ ngôi sao lấp lánh với hiệu ứng xoay"""
+    """Vẽ ngôi sao lấp lánh với hiệu ứng xoay (khung xoay dựng sẵn)"""
+    if size < 1:
+        return
     time = pygame.time.get_ticks() / 1000.0
-    rotation = time * 5  # Hiệu ứng xoay mượt hơn
-    
-    # Vẽ hình sao 4 cánh
-    points = []
-    inner_points = []
-    for i in range(4):
-        angle = math.pi / 2 * i + rotation
-        # Điểm ngoài
-        points.append((x + size * math.cos(angle), y + size * math.sin(angle)))
-        # Điểm trong (tạo hình sao thực sự)
-        inner_angle = angle + math.pi / 4
-        inner_points.append((x + size * 0.4 * math.cos(inner_angle), 
-                           y + size * 0.4 * math.sin(inner_angle)))
-    
-    # Tạo danh sách điểm xen kẽ để vẽ ngôi sao
-    star_points = []
-    for i in range(4):
-        star_points.append(points[i])
-        star_points.append(inner_points[i])
-    
-    # Vẽ ngôi sao
-    if len(star_points) >= 3:
-        pygame.draw.polygon(screen, color, star_points)
-        
-        # Vẽ viền sáng
-        bright_color = tuple(min(255, c + 50) if isinstance(c, int) else c for c in color[:3])
-        if len(bright_color) == 3:
-            pygame.draw.polygon(screen, bright_color, star_points, 1)
-        
-    # Thêm chấm sáng ở giữa với hiệu ứng nhấp nháy
+    # Xoay 5 rad/s, sao 4 cánh lặp lại sau mỗi 90°
+    frame = cycle_frame(time * 5 / (math.pi / 2), SPARKLE_FRAMES)
+    effects.blit_centered(screen, effects.sparkle_star(color, size, frame), (x, y))
+
+    # Chấm sáng ở giữa với hiệu ứng nhấp nháy
     center_alpha = int(255 * (0.7 + 0.3 * math.sin(time * 10)))
-    center_surface = pygame.Surface((int(size), int(size)), pygame.SRCALPHA)
-    center_radius = max(2, int(size * 0.3))
-    
-    # Vẽ glow cho tâm
-    for r in range(center_radius * 2, center_radius, -1):
-        glow_alpha = int(center_alpha * (r - center_radius) / center_radius * 0.5)
-        gfxdraw.filled_circle(center_surface, int(size // 2), int(size // 2), 
-                             r, (255, 255, 255, glow_alpha))
-    
-    # Vẽ tâm sáng
-    gfxdraw.filled_circle(center_surface, int(size // 2), int(size // 2), 
-                         center_radius, (255, 255, 255, center_alpha))
-    screen.blit(center_surface, (int(x - size // 2), int(y - size // 2)))
\ No newline at end of file
+    center_sprite = effects.sparkle_center(size)
+    effects.blit_at(screen, center_sprite, (int(x - size // 2), int(y - size // 2)), center_alpha)
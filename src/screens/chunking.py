@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Chia nội dung theo ranh giới do chính nội dung quyết định (content-defined chunking).
+
+Cách chia cũ gom đều số đoạn văn cho mỗi bài, nên chỉ cần thêm/bớt một đoạn ở
+đầu file là mọi chunk phía sau đều bị dịch đi và cache theo chunk mất tác dụng.
+Ở đây một đoạn văn được chọn làm điểm cắt khi hash của nó thỏa điều kiện, nên
+sửa một đoạn chỉ ảnh hưởng tới chunk chứa nó (và tối đa chunk liền kề).
+"""
+
+import hashlib
+import re
+from typing import Iterable, List
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+
+def _unit_hash(unit: str) -> int:
+    """Hash ổn định (không phụ thuộc PYTHONHASHSEED) của một đoạn"""
+    return int.from_bytes(hashlib.blake2b(unit.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _power_of_two_at_least(value: float) -> int:
+    n = 1
+    while n < value:
+        n *= 2
+    return n
+
+
+class ContentDefinedChunker:
+    """
+    Chia nội dung thành khoảng target_chunks phần với ranh giới ổn định.
+
+    Args:
+        min_ratio : chunk không được nhỏ hơn min_ratio * kích thước lý tưởng
+        max_ratio : chunk bắt buộc bị cắt khi vượt max_ratio * kích thước lý tưởng
+        quantum   : kích thước lý tưởng được làm tròn theo bội số này để một
+                    chỉnh sửa nhỏ không làm thay đổi ngưỡng min/max
+    """
+
+    def __init__(self, min_ratio: float = 0.5, max_ratio: float = 2.0, quantum: int = 256):
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self.quantum = quantum
+
+    def _split_units(self, content: str, target_chunks: int):
+        """Tách thành đơn vị: đoạn văn, hoặc câu nếu có quá ít đoạn văn"""
+        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
+        if len(paragraphs) >= target_chunks * 2:
+            return paragraphs, '\n\n'
+        sentences = [s.strip() for s in _SENTENCE_END.split(content) if s.strip()]
+        if len(sentences) >= target_chunks * 2:
+            return sentences, ' '
+        return None, None
+
+    def _parameters(self, total: int, unit_count: int, target_chunks: int):
+        """(min_size, max_size, divisor) cho một tài liệu"""
+        ideal = max(self.quantum, round(total / target_chunks / self.quantum) * self.quantum)
+        # Trung bình mỗi chunk có ~divisor đơn vị là điểm cắt tiềm năng
+        divisor = _power_of_two_at_least(unit_count / target_chunks)
+        return ideal * self.min_ratio, ideal * self.max_ratio, divisor
+
+    def chunk(self, content: str, target_chunks: int) -> List[str]:
+        """
+        Returns:
+            danh sách chunk, hoặc [] nếu nội dung quá ít đơn vị để chia theo
+            ranh giới nội dung (khi đó gọi hàm chia cũ)
+        """
+        target_chunks = max(1, target_chunks)
+        units, joiner = self._split_units(content, target_chunks)
+        if not units:
+            return []
+
+        total = sum(len(u) for u in units)
+        min_size, max_size, divisor = self._parameters(total, len(units), target_chunks)
+
+        groups = []
+        current, size = [], 0
+        for unit in units:
+            current.append(unit)
+            size += len(unit)
+            is_anchor = _unit_hash(unit) % divisor == 0
+            if (is_anchor and size >= min_size) or size >= max_size:
+                groups.append(current)
+                current, size = [], 0
+        if current:
+            groups.append(current)
+
+        groups = self._fit_count(groups, target_chunks)
+        return [joiner.join(g) for g in groups]
+
+    def _fit_count(self, groups, target_chunks):
+        """Gộp/tách cục bộ để số chunk đúng bằng target_chunks"""
+        def group_size(g):
+            return sum(len(u) for u in g)
+
+        # Quá nhiều: gộp cặp liền kề có tổng nhỏ nhất
+        while len(groups) > target_chunks:
+            best = min(range(len(groups) - 1),
+                       key=lambda i: group_size(groups[i]) + group_size(groups[i + 1]))
+            groups[best:best + 2] = [groups[best] + groups[best + 1]]
+
+        # Quá ít: tách chunk lớn nhất tại đơn vị giữa
+        while len(groups) < target_chunks:
+            idx = max(range(len(groups)), key=lambda i: group_size(groups[i]))
+            g = groups[idx]
+            if len(g) < 2:
+                break
+            half, acc = group_size(g) / 2, 0
+            cut = 1
+            for i, unit in enumerate(g[:-1]):
+                acc += len(unit)
+                cut = i + 1
+                if acc >= half:
+                    break
+            groups[idx:idx + 1] = [g[:cut], g[cut:]]
+        return groups
+
+    def chunk_stream(self, units: Iterable[str], total_chars: int, unit_count: int,
+                     target_chunks: int, retain_chars: int) -> List[str]:
+        """
+        Chia chunk khi các đoạn văn đến dần (đã biết trước tổng độ dài/số đoạn).
+
+        Mỗi chunk chỉ giữ tối đa retain_chars ký tự đầu (prompt chỉ dùng phần
+        đầu chunk), phần còn lại chỉ được tính vào kích thước, nên bộ nhớ không
+        phụ thuộc độ dài tài liệu.
+        """
+        target_chunks = max(1, target_chunks)
+        min_size, max_size, divisor = self._parameters(total_chars, unit_count, target_chunks)
+        # Điểm cắt dự kiến: chunk thứ k phải kết thúc khi vị trí đọc đạt k * step.
+        # Phần giữ lại chỉ là đầu mỗi chunk nên không thể tách chunk sau khi đã
+        # đọc xong; thiếu điểm neo thì cắt ngay tại đơn vị chạm mốc, nhờ vậy mọi
+        # phần của tài liệu đều có mặt ở đầu một chunk nào đó
+        step = total_chars / target_chunks
+
+        # Mỗi nhóm: [các đoạn giữ lại, số ký tự giữ lại, kích thước thật]
+        groups = []
+        current = [[], 0, 0]
+        offset = 0
+        for unit in units:
+            if current[1] < retain_chars:
+                kept = unit[:retain_chars - current[1]]
+                current[0].append(kept)
+                current[1] += len(kept)
+            current[2] += len(unit)
+            offset += len(unit)
+            behind_plan = offset >= (len(groups) + 1) * step and len(groups) < target_chunks - 1
+            if ((_unit_hash(unit) % divisor == 0 and current[2] >= min_size)
+                    or current[2] >= max_size or behind_plan):
+                groups.append(current)
+                current = [[], 0, 0]
+        if current[0]:
+            groups.append(current)
+
+        # Gộp cặp liền kề nhỏ nhất nếu thừa chunk
+        while len(groups) > target_chunks:
+            best = min(range(len(groups) - 1), key=lambda i: groups[i][2] + groups[i + 1][2])
+            first, second = groups[best], groups[best + 1]
+            room = max(0, retain_chars - first[1])
+            extra = []
+            for unit in second[0]:
+                if room <= 0:
+                    break
+                extra.append(unit[:room])
+                room -= len(extra[-1])
+            merged = [first[0] + extra, first[1] + sum(len(u) for u in extra), first[2] + second[2]]
+            groups[best:best + 2] = [merged]
+
+        # Vẫn thiếu (một đơn vị vượt qua nhiều mốc) thì trả về ít chunk hơn
+        return ['\n\n'.join(g[0]) for g in groups]
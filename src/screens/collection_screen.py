@@ -2,6 +2,10 @@ import pygame
 import math
 import time
 import config
+import ui_elements
+from assets import assets
+from framerate import governor
+from effects import effects, cycle_frame, RAY_FRAMES
 import datetime
 import os
 
@@ -9,9 +13,9 @@ import os
 
 def draw_shadow_text(screen, text, font, color, pos, shadow_offset=(2,2), shadow_color=(0,0,0,100)):
     """Vẽ text có bóng đổ"""
-    surface = font.render(text, True, shadow_color)
+    surface = ui_elements.render_text(text, font, shadow_color)
     screen.blit(surface, (pos[0] + shadow_offset[0], pos[1] + shadow_offset[1]))
-    surface = font.render(text, True, color)
+    surface = ui_elements.render_text(text, font, color)
     screen.blit(surface, pos)
 
 def draw_polygon_pattern(screen, rect, color, lighten=30, thickness=1):
@@ -30,52 +34,23 @@ def draw_rect_with_border(screen, rect, bg_color, border_color=None, border_thic
     if border_color:
         pygame.draw.rect(screen, border_color, rect, border_thickness, border_radius=radius)
 
-def load_gem_image(gem_index):
-    """Load ảnh gem thật từ thư mục assets/setting"""
-    try:
-        img_path = os.path.join(config.ASSETS_DIR, "setting", f"gem{gem_index}.png")
-        if os.path.exists(img_path):
-            return pygame.image.load(img_path)
-    except:
-        pass
-    return None
+def load_gem_image(gem_index, size=None):
+    """Load ảnh gem thật từ thư mục assets/setting (đã scale sẵn nếu truyền size)"""
+    img_path = os.path.join(config.ASSETS_DIR, "setting", f"gem{gem_index}.png")
+    if not os.path.exists(img_path):
+        return None
+    return assets.get(img_path, size)
 
 def draw_gem_glow_effect(screen, center, size, color, now):
-    """Vẽ hiệu ứng phát sáng đặc biệt cho viên đá"""
-    # Hiệu ứng nhiều vòng tròn gradient từ trong ra ngoài
-    num_circles = 6
+    """Vẽ hiệu ứng phát sáng đặc biệt cho viên đá (sprite dựng sẵn, nhấp nháy bằng alpha)"""
+    # Các vòng tròn gradient từ trong ra ngoài (alpha gốc dao động 30..70)
     base_alpha = int(abs(math.sin(now * 2)) * 40 + 30)
-    
-    for i in range(num_circles):
-        radius = size // 3 + i * 8
-        alpha = max(0, base_alpha - i * 10)
-        glow_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-        glow_color = (*color, alpha)
-        pygame.draw.circle(glow_surface, glow_color, (radius, radius), radius)
-        glow_rect = glow_surface.get_rect(center=center)
-        screen.blit(glow_surface, glow_rect)
-    
-    # Thêm các tia sáng xung quanh
-    num_rays = 8
+    effects.blit_centered(screen, effects.gem_glow(size, color), center, 255 * base_alpha / 70)
+
+    # Các tia sáng xoay 50°/s, vòng 8 tia lặp lại sau mỗi 45°
     ray_alpha = int(abs(math.sin(now * 3)) * 30 + 20)
-    for i in range(num_rays):
-        angle = (now * 50 + i * 360 / num_rays) % 360
-        rad = math.radians(angle)
-        ray_length = size // 2 + 15
-        end_x = center[0] + math.cos(rad) * ray_length
-        end_y = center[1] + math.sin(rad) * ray_length
-        
-        ray_surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-        points = [
-            center,
-            (center[0] + math.cos(rad - 0.1) * ray_length * 0.3, center[1] + math.sin(rad - 0.1) * ray_length * 0.3),
-            (end_x, end_y),
-            (center[0] + math.cos(rad + 0.1) * ray_length * 0.3, center[1] + math.sin(rad + 0.1) * ray_length * 0.3)
-        ]
-        ray_color = (*color, ray_alpha)
-        pygame.draw.polygon(ray_surface, ray_color, [(p[0] - center[0] + size, p[1] - center[1] + size) for p in points])
-        ray_rect = ray_surface.get_rect(center=center)
-        screen.blit(ray_surface, ray_rect)
+    frame = cycle_frame(now * 50 / 45, RAY_FRAMES)
+    effects.blit_centered(screen, effects.gem_rays(size, color, frame), center, ray_alpha)
 
 # ==== Collection Screen ====
 
@@ -90,7 +65,7 @@ def draw_collection(screen, font_title, font, font_small, colors, gem_types, gam
 
 def draw_book_header(screen, font_title, colors):
     title = "BỘ SƯU TẬP GEM"
-    rect = font_title.render(title, True, colors["accent"]).get_rect(center=(260, 80))
+    rect = ui_elements.render_text(title, font_title, colors["accent"]).get_rect(center=(260, 80))
     draw_shadow_text(screen, title, font_title, colors["accent"], rect.topleft)
 
 def draw_collection_stats_right_page(screen, font, font_small, colors, gem_types, game_state):
@@ -102,7 +77,7 @@ def draw_collection_stats_right_page(screen, font, font_small, colors, gem_types
     cy = 250
 
     # Title
-    title = font.render("TIẾN TRÌNH SƯU TẬP", True, colors["text"])
+    title = ui_elements.render_text("TIẾN TRÌNH SƯU TẬP", font, colors["text"])
     screen.blit(title, title.get_rect(centerx=cx, y=cy))
 
     # Circle progress
@@ -112,11 +87,11 @@ def draw_collection_stats_right_page(screen, font, font_small, colors, gem_types
         draw_progress_arc(screen, (cx, cy+80), r, -90, -90 + percent*3.6, colors["difficulty_easy"], 6)
 
     # Percent text
-    pct = font.render(f"{percent:.0f}%", True, colors["accent"])
+    pct = ui_elements.render_text(f"{percent:.0f}%", font, colors["accent"])
     screen.blit(pct, pct.get_rect(center=(cx, cy+80)))
 
     # Stats
-    stats = font_small.render(f"{count}/{total} viên đã thu thập", True, colors["text"])
+    stats = ui_elements.render_text(f"{count}/{total} viên đã thu thập", font_small, colors["text"])
     screen.blit(stats, stats.get_rect(centerx=cx, y=cy+80+r+20))
 
 def draw_gems_book_layout(screen, gem_types, game_state, font_small, colors):
@@ -129,6 +104,9 @@ def draw_gems_book_layout(screen, gem_types, game_state, font_small, colors):
         row, col = divmod(i, 3)
         x, y = margin_x + col*(size+spacing), margin_y + row*(size+spacing)
         owned = any(g["id"] == gem["id"] for g in game_state.collected_gems)
+        if owned:
+            # gem đã sở hữu nhấp nhô liên tục -> giữ đủ FPS
+            governor.request_full_rate()
         draw_gem_card(screen, gem, (x,y), size, owned, now, i, font_small, colors)
 
 def draw_gem_card(screen, gem, pos, size, owned, now, index, font_small, colors):
@@ -142,24 +120,23 @@ def draw_gem_card(screen, gem, pos, size, owned, now, index, font_small, colors)
         draw_rect_with_border(screen, rect, bg, gem["color"])
         
         # Vẽ ảnh gem thật (index + 1 vì gem1.png, gem2.png,...)
-        gem_img = load_gem_image(index + 1)
-        if gem_img:
-            img_size = int(size * 0.9)
-            gem_img_scaled = pygame.transform.scale(gem_img, (img_size, img_size))
+        img_size = int(size * 0.9)
+        gem_img_scaled = load_gem_image(index + 1, (img_size, img_size))
+        if gem_img_scaled:
             img_rect = gem_img_scaled.get_rect(center=rect.center)
             screen.blit(gem_img_scaled, img_rect)
         else:
             draw_polygon_pattern(screen, rect, gem["color"])
         
         if size >= 60:
-            name = font_small.render(gem["name"][:8], True, colors["text"])
+            name = ui_elements.render_text(gem["name"][:8], font_small, colors["text"])
             nb = name.get_rect(centerx=rect.centerx, bottom=rect.bottom-5)
             pygame.draw.rect(screen, (255,255,255,180), nb.inflate(6,4), border_radius=3)
             screen.blit(name, nb)
     else:
         draw_rect_with_border(screen, rect, (60,50,40), (40,35,30))
-        qf = pygame.font.Font(None, size//2)
-        q = qf.render("?", True, (200,180,150))
+        qf = config.get_font(None, size//2)
+        q = ui_elements.render_text("?", qf, (200,180,150))
         screen.blit(q, q.get_rect(center=rect.center))
 
 def draw_progress_arc(screen, center, radius, start_angle, end_angle, color, thickness):
@@ -184,6 +161,7 @@ def draw_gem_detail_right_page(screen, font_title, font, font_small, colors, gem
     gem_center_y = panel.y + 20 + size // 2
     
     # Hiệu ứng lên xuống nhẹ nhàng
+    governor.request_full_rate()
     now = time.time()
     float_offset = math.sin(now * 1.5) * 8
     
@@ -197,12 +175,11 @@ def draw_gem_detail_right_page(screen, font_title, font, font_small, colors, gem
     draw_gem_glow_effect(screen, (gem_center_x, animated_center_y), size, gem["color"], now)
     
     # Vẽ ảnh gem thật (index + 1 vì gem1.png, gem2.png,...)
-    gem_img = load_gem_image(gem_index + 1)
-    if gem_img:
-        img_size = int(size * 1.5)  # Tăng kích thước ảnh
-        gem_img_scaled = pygame.transform.scale(gem_img, (img_size, img_size))
+    img_size = int(size * 1.5)  # Tăng kích thước ảnh
+    gem_img_scaled = load_gem_image(gem_index + 1, (img_size, img_size))
+    if gem_img_scaled:
         # Xoay ảnh nhẹ
-        gem_img_rotated = pygame.transform.rotate(gem_img_scaled, rotation_angle)
+        gem_img_rotated = effects.rotated(gem_img_scaled, rotation_angle)
         img_rect = gem_img_rotated.get_rect(center=(gem_center_x, animated_center_y))
         screen.blit(gem_img_rotated, img_rect)
         # Tính vị trí tĩnh cho phần thông tin bên dưới (không bị ảnh hưởng animation)
@@ -215,7 +192,7 @@ def draw_gem_detail_right_page(screen, font_title, font, font_small, colors, gem
         name_y = gem_center_y + size//2 + 40
 
     # Tên
-    name = font_title.render(gem["name"], True, gem["color"])
+    name = ui_elements.render_text(gem["name"], font_title, gem["color"])
     name_rect = name.get_rect(centerx=panel.centerx-5, y=name_y-  40)
     screen.blit(name, name_rect)
 
@@ -229,7 +206,7 @@ def draw_gem_detail_right_page(screen, font_title, font, font_small, colors, gem
             date_str = data["collected_date"]
         date_rect = pygame.Rect(panel.x, name_rect.bottom + 1, panel.width-40, 35)
         draw_rect_with_border(screen, date_rect, gem["color"], None, 0, 8)
-        txt = font_small.render(f"Thu thập ngày: {date_str}", True, colors["white"])
+        txt = ui_elements.render_text(f"Thu thập ngày: {date_str}", font_small, colors["white"])
         screen.blit(txt, txt.get_rect(center=date_rect.center))
         desc_y = date_rect.bottom + 5
     else:
@@ -261,7 +238,7 @@ def draw_gem_detail_right_page(screen, font_title, font, font_small, colors, gem
 
     # Vẽ từng dòng, canh giữa theo chiều ngang
     for i, line in enumerate(lines):
-        text_surface = font.render(line, True, colors["text"])
+        text_surface = ui_elements.render_text(line, font, colors["text"])
         text_rect = text_surface.get_rect(centerx=desc.centerx, y=start_y + i * line_height)
         screen.blit(text_surface, text_rect)
 
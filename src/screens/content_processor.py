@@ -1,8 +1,8 @@
 import os
 import json
 import re
-import time
 import hashlib
+import time
 import signal
 import requests
 import chardet
@@ -10,6 +10,16 @@ from typing import List, Dict, Optional, Tuple, Set
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 import config
 import random
+import asyncio
+from .generation_cache import GenerationCache
+from .chunking import ContentDefinedChunker
+from .gemini_async import AsyncGeminiClient
+from .rate_limiter import GeminiAPIError, gemini_limiter, backoff_delay, estimate_tokens
+from . import lesson_schema
+from .question_bank import QuestionBank, question_hash
+from .similarity import NearDuplicateSet
+from . import ingest
+from .pdf_extract import ParallelPdfExtractor, ExtractionCancelled
 
 
 class TimeoutException(Exception):
@@ -23,6 +33,8 @@ def timeout_handler(signum, frame):
 
 
 class GeminiClient:
+
+    MODEL = "gemini-2.0-flash"
     
     def __init__(self):
         base_dir = os.path.dirname(__file__)
@@ -43,7 +55,8 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("API key không hợp lệ hoặc không tìm thấy trong API_AI.json!")
 
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.model = self.MODEL
+        self.base_url = f"{config.GEMINI_API_BASE.rstrip('/')}/models/{self.model}:generateContent"
         self.session = requests.Session()
         
     def chat_completions_create(self, messages, temperature=0.7, **kwargs):
@@ -59,22 +72,15 @@ class GeminiClient:
             "X-goog-api-key": self.api_key
         }
         
-        data = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": temperature,
-                "maxOutputTokens": 4096,
-                "topP": 0.8,
-                "topK": 10
-            }
-        }
+        # response_schema (tùy chọn): bật structured output, model trả về JSON đúng schema
+        data = lesson_schema.build_generation_body(
+            prompt,
+            temperature=temperature,
+            max_output_tokens=kwargs.get("max_output_tokens", 4096),
+            response_schema=kwargs.get("response_schema"),
+        )
         
+        gemini_limiter.acquire(estimate_tokens(prompt))
         try:
             response = self.session.post(
                 self.base_url, 
@@ -82,6 +88,7 @@ class GeminiClient:
                 json=data, 
                 timeout=60
             )
+            gemini_limiter.update_from_headers(response.headers)
             
             if response.status_code == 200:
                 result = response.json()
@@ -92,12 +99,12 @@ class GeminiClient:
                 except (KeyError, IndexError):
                     raise Exception("Không nhận được phản hồi từ Gemini API")
             else:
-                raise Exception(f"Gemini API error {response.status_code}: {response.text}")
+                raise GeminiAPIError.from_response(response.status_code, response.headers, response.text)
                 
         except requests.exceptions.Timeout:
-            raise Exception("Gemini API timeout")
+            raise GeminiAPIError(None, "timeout")
         except requests.exceptions.RequestException as e:
-            raise Exception(f"Gemini API request error: {e}")
+            raise GeminiAPIError(None, f"request error: {e}")
 
 
 class GeminiResponse:
@@ -143,6 +150,13 @@ class GeminiChat:
 
 
 class ContentProcessor:
+    # Tăng khi thay đổi prompt / định dạng phản hồi (responseSchema) để cache đĩa cũ
+    # (cả cache từng bài lẫn cache cả tài liệu) không còn được dùng
+    PROMPT_VERSION = 2
+    # Tăng khi thay đổi hậu xử lý cả tài liệu (lọc trùng câu hỏi, cách dựng quiz
+    # từ QuestionBank): chỉ làm mất cache cả tài liệu, bài học từng chunk vẫn dùng lại
+    POSTPROCESS_VERSION = 2
+
     def __init__(self, lessons_count: int = 5, questions_per_lesson: int = 6, quiz_questions: int = 10):
         """
         Khởi tạo ContentProcessor với cấu hình linh hoạt
@@ -165,6 +179,10 @@ class ContentProcessor:
         self.max_retries = 3
         self.timeout = 45  # Giảm timeout xuống 45s cho mỗi request
         self.total_timeout = 300  # Timeout tổng cho toàn bộ quá trình: 5 phút
+        self.max_concurrency = config.GEMINI_MAX_CONCURRENCY
+
+        # Hàm nhận thông báo tiến độ (vd. cập nhật dòng trạng thái của load_screen)
+        self.progress_callback = None
 
         # Cấu hình linh hoạt
         self.lessons_count = max(1, min(lessons_count, 20))
@@ -173,6 +191,17 @@ class ContentProcessor:
 
         # Cache đơn giản
         self.content_cache = {}
+        # Cache trên đĩa, dùng chung giữa các lần tải file
+        # (chung ngân sách GENERATION_CACHE_MAX_BYTES với chunk_cache)
+        self.generation_cache = GenerationCache(
+            config.GENERATION_CACHE_DIR,
+            config.GENERATION_CACHE_MAX_BYTES - config.GENERATION_CHUNK_CACHE_MAX_BYTES)
+        # Cache từng bài theo chunk: sửa một đoạn chỉ sinh lại bài chứa đoạn đó
+        self.chunk_cache = GenerationCache(os.path.join(config.GENERATION_CACHE_DIR, "chunks"),
+                                           config.GENERATION_CHUNK_CACHE_MAX_BYTES)
+        self.chunker = ContentDefinedChunker()
+        # Trích xuất PDF song song theo trang (dừng được qua stop_processing)
+        self.pdf_extractor = ParallelPdfExtractor(max_workers=config.PDF_EXTRACT_MAX_WORKERS)
 
         # Đảm bảo thư mục tồn tại
         os.makedirs(config.ASSETS_DIR, exist_ok=True)
@@ -180,9 +209,18 @@ class ContentProcessor:
         # Flags for graceful shutdown
         self.should_stop = False
 
+        # Structured output (responseSchema); parser "cứu" JSON chỉ còn là dự phòng
+        self.structured_output = config.GEMINI_STRUCTURED_OUTPUT
+        self.parse_stats = {"structured": 0, "salvaged": 0, "failed": 0}
+
+        # Lỗi không thể khắc phục bằng thử lại (vd. API key sai) -> dừng cả quá trình
+        self.fatal_error = None
+        self._deadline = None
+
         # Tracking để tránh câu hỏi lặp
-        self.used_questions = set()
-        self.used_quiz_questions = set()
+        # Kèm chỉ mục MinHash/LSH để loại cả câu gần trùng, không chỉ câu giống hệt
+        self.used_questions = NearDuplicateSet(threshold=config.QUESTION_SIMILARITY_THRESHOLD)
+        self.used_quiz_questions = NearDuplicateSet(threshold=config.QUESTION_SIMILARITY_THRESHOLD)
 
     # =========================
     # Helpers
@@ -199,6 +237,9 @@ class ContentProcessor:
         # Reset tracking sets cho mỗi file mới
         self.used_questions.clear()
         self.used_quiz_questions.clear()
+        self.fatal_error = None
+        self._deadline = start_time + self.total_timeout
+        self.pdf_extractor.reset()
         
         # Set up timeout cho toàn bộ quá trình
         if hasattr(signal, 'SIGALRM'):  # Unix systems
@@ -214,30 +255,45 @@ class ContentProcessor:
             if not os.path.exists(file_path):
                 return False, f"File không tồn tại: {file_path}"
 
-            # Đọc và validate file
-            try:
-                content = self.read_file_content(file_path)
-            except Exception as e:
-                return False, f"Không thể đọc file: {e}"
-            if not content or not content.strip():
-                return False, "Không thể đọc nội dung từ file (file rỗng hoặc định dạng không đúng)."
-
-            if len(content.strip()) < 200:
-                return False, "Nội dung file quá ngắn để xử lý (cần ít nhất 200 ký tự)."
-
-            # Tiền xử lý nội dung
-            content = self._preprocess_content(content)
-
-            # Kiểm tra cache
-            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-            if content_hash in self.content_cache:
-                lessons, quiz_questions = self.content_cache[content_hash]
+            chunks = None
+            if ingest.should_stream(file_path, config.STREAM_INGEST_MIN_BYTES):
+                # File lớn: đọc theo stream, chia chunk ngay khi đọc
+                ok, result = self._ingest_streaming(file_path)
+                if not ok:
+                    return False, result
+                content_hash, chunks = result
+            else:
+                # Đọc và validate file
+                try:
+                    content = self.read_file_content(file_path)
+                except Exception as e:
+                    return False, f"Không thể đọc file: {e}"
+                if self.should_stop:
+                    return False, "Đã dừng xử lý."
+                if not content or not content.strip():
+                    return False, "Không thể đọc nội dung từ file (file rỗng hoặc định dạng không đúng)."
+
+                if len(content.strip()) < 200:
+                    return False, "Nội dung file quá ngắn để xử lý (cần ít nhất 200 ký tự)."
+
+                # Tiền xử lý nội dung
+                content = self._preprocess_content(content)
+                content_hash = self._generation_cache_key(content)
+
+            # Kiểm tra cache (bộ nhớ trước, rồi tới đĩa)
+            cached = self.content_cache.get(content_hash) or self._load_cached_generation(content_hash)
+            if cached:
+                lessons, quiz_questions = cached
+                self.content_cache[content_hash] = cached
             else:
                 # Chia nội dung thành các phần
-                chunks = self._intelligent_chunking(content, target_chunks=self.lessons_count)
+                if chunks is None:
+                    chunks = self._intelligent_chunking(content, target_chunks=self.lessons_count)
 
                 # Tạo bài học với timeout
                 lessons = self.generate_lessons_with_timeout(chunks)
+                if self.fatal_error:
+                    return False, f"Gemini API từ chối yêu cầu: {self.fatal_error}"
                 
                 if not lessons:
                     return False, "Không thể tạo bài học từ nội dung này."
@@ -252,6 +308,7 @@ class ContentProcessor:
 
                 # Cache kết quả
                 self.content_cache[content_hash] = (lessons, quiz_questions)
+                self.generation_cache.put(content_hash, {"lessons": lessons, "quiz": quiz_questions})
 
             # Lưu file với error handling
             success = self._safe_save_data_files(lessons, quiz_questions)
@@ -281,6 +338,66 @@ class ContentProcessor:
             if hasattr(signal, 'SIGALRM'):
                 signal.alarm(0)
 
+    def _generation_cache_key(self, content: Optional[str] = None, content_digest: Optional[str] = None) -> str:
+        """Khóa cache: nội dung (hoặc sha256 của nó) + mọi thông số ảnh hưởng tới kết quả sinh"""
+        if content_digest is None:
+            content_digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return self.generation_cache.make_key_from_digest(
+            content_digest,
+            lessons_count=self.lessons_count,
+            questions_per_lesson=self.questions_per_lesson,
+            quiz_questions=self.quiz_questions,
+            model=self.gemini_client.model,
+            prompt_version=self.PROMPT_VERSION,
+            postprocess_version=self.POSTPROCESS_VERSION,
+        )
+
+    def _ingest_streaming(self, file_path: str):
+        """
+        Đọc file lớn theo stream: làm sạch từng khối, ghi tạm ra đĩa, rồi chia chunk.
+
+        Returns:
+            (True, (khóa cache, chunks)) hoặc (False, thông báo lỗi)
+        """
+        encodings = [self._detect_encoding(file_path), 'utf-8', 'utf-16', 'cp1252', 'latin-1']
+        try:
+            doc = ingest.spool_document(file_path, encodings, pdf_extractor=self.pdf_extractor)
+        except ExtractionCancelled:
+            return False, "Đã dừng xử lý."
+        except ImportError as e:
+            return False, f"Thiếu thư viện để đọc file này: {e}"
+        except Exception as e:
+            return False, f"Không thể đọc file: {e}"
+
+        with doc:
+            if doc.total_chars < 200:
+                return False, "Nội dung file quá ngắn để xử lý (cần ít nhất 200 ký tự)."
+            if self._is_binary_garbage(doc.sample):
+                return False, "Nội dung file chứa dữ liệu binary không hợp lệ"
+
+            key = self._generation_cache_key(content_digest=doc.content_digest())
+            chunks = self.chunker.chunk_stream(doc, doc.total_chars, doc.units,
+                                               self.lessons_count, config.STREAM_CHUNK_RETAIN_CHARS)
+        return True, (key, chunks)
+
+    def _load_cached_generation(self, key: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """Đọc kết quả từ cache đĩa và khôi phục tracking câu hỏi đã dùng"""
+        payload = self.generation_cache.get(key)
+        if not payload:
+            return None
+        lessons = payload.get("lessons")
+        quiz = payload.get("quiz")
+        if not isinstance(lessons, list) or not lessons or not isinstance(quiz, dict):
+            return None
+
+        for lesson in lessons:
+            for q in lesson.get("questions", []):
+                self._add_question_to_used(q.get("question", ""), q.get("choices", []), self.used_questions)
+        for questions in quiz.values():
+            for q in questions:
+                self._add_question_to_used(q.get("question", ""), q.get("choices", []), self.used_quiz_questions)
+        return lessons, quiz
+
     # =========================
     # Đọc & Tiền xử lý nội dung với encoding detection
     # =========================
@@ -313,18 +430,7 @@ class ContentProcessor:
 
     def _preprocess_content(self, content: str) -> str:
         """Tiền xử lý nội dung nhưng giữ ký tự đặc biệt cần thiết"""
-        # Gom khoảng trắng: giữ lại xuống dòng 2 dấu cách tối thiểu giữa đoạn
-        content = re.sub(r'\n\s*\n', '\n\n', content)
-        content = re.sub(r'[ \t]+', ' ', content)
-
-        # Loại bỏ control characters nhưng giữ \n, \t
-        cleaned_chars = []
-        for ch in content:
-            if ch == '\n' or ch == '\t' or ch.isprintable():
-                cleaned_chars.append(ch)
-        content = ''.join(cleaned_chars)
-
-        return content.strip()
+        return ingest.clean_text(content)
 
     def read_file_content(self, file_path: str) -> Optional[str]:
         """Đọc nội dung từ file với xử lý lỗi tốt hơn và encoding detection"""
@@ -455,21 +561,10 @@ class ContentProcessor:
 
             elif file_path.lower().endswith('.pdf'):
                 try:
-                    import PyPDF2
-                    with open(file_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        pages_text = []
-                        for page in reader.pages:
-                            try:
-                                text = page.extract_text()
-                                if text and text.strip():
-                                    pages_text.append(text)
-                            except Exception:
-                                continue
-                        content = "\n".join(pages_text)
-                        if not content.strip():
-                            raise ValueError("Không thể trích xuất text từ PDF")
-                        return content
+                    content = self.pdf_extractor.extract(file_path)
+                    if not content.strip():
+                        raise ValueError("Không thể trích xuất text từ PDF")
+                    return content
                 except ImportError:
                     raise ValueError("Cần cài đặt PyPDF2 để đọc file .pdf: pip install PyPDF2")
 
@@ -478,20 +573,8 @@ class ContentProcessor:
             return None
 
     def _is_binary_garbage(self, content: str) -> bool:
-        """Kiểm tra xem content có phải binary garbage không"""
-        if not content:
-            return True
-        
-        # Đếm ký tự không thể in được
-        printable_chars = sum(1 for c in content if c.isprintable() or c.isspace())
-        total_chars = len(content)
-        
-        # Nếu ít hơn 80% là ký tự có thể in được thì có thể là binary
-        if total_chars > 0:
-            printable_ratio = printable_chars / total_chars
-            return printable_ratio < 0.8
-        
-        return True
+        """Kiểm tra xem content có phải binary garbage không (lấy mẫu vài đoạn)"""
+        return ingest.is_binary_garbage(content)
 
     # =========================
     # Chunking
@@ -499,6 +582,11 @@ class ContentProcessor:
 
     def _intelligent_chunking(self, content: str, target_chunks: int = 5) -> List[str]:
         """Chia content thành các phần thông minh hơn, ưu tiên theo đoạn văn"""
+        # Ranh giới theo nội dung để cache theo chunk vẫn trúng sau khi sửa cục bộ
+        chunks = self.chunker.chunk(content, target_chunks)
+        if chunks:
+            return chunks
+
         paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
 
         if len(paragraphs) <= target_chunks:
@@ -533,8 +621,157 @@ class ContentProcessor:
     # Sinh bài học với timeout và tránh lặp
     # =========================
 
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Số giây chờ trước lần thử tiếp theo, hoặc None nếu không nên thử lại.
+
+        - 4xx (trừ 408/429) không thử lại; 401/403 dừng toàn bộ quá trình.
+        - 429/503 có Retry-After thì chặn limiter chung để mọi worker cùng chờ.
+        - Không thử lại nếu lần chờ vượt quá total_timeout còn lại.
+        """
+        if attempt >= self.max_retries - 1 or self.should_stop:
+            return None
+
+        delay = backoff_delay(attempt)
+        if isinstance(error, GeminiAPIError):
+            if not error.retryable:
+                if error.is_auth_error:
+                    self.fatal_error = str(error)
+                    self.should_stop = True
+                return None
+            if error.retry_after is not None:
+                delay = error.retry_after + backoff_delay(0)
+                gemini_limiter.penalize(error.retry_after)
+
+        if self._deadline is not None and time.time() + delay > self._deadline:
+            return None
+        return delay
+
+    def _report_progress(self, message: str):
+        if self.progress_callback:
+            try:
+                self.progress_callback(message)
+            except Exception:
+                pass
+
     def generate_lessons_with_timeout(self, chunks: List[str]) -> List[Dict]:
         """Tạo bài học với timeout và error handling toàn diện"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Luồng này chưa có event loop -> dùng client async
+            return asyncio.run(self._generate_lessons_async(chunks))
+        # Đã có event loop chạy trong luồng này (asyncio.run không dùng được) -> dùng thread pool.
+        # Chỉ kiểm tra trước khi chạy: lỗi phát sinh bên trong quá trình sinh không được
+        # chuyển sang sinh lại toàn bộ tài liệu (tốn gấp đôi lượt gọi API)
+        print("⚠️ Đã có event loop đang chạy, chuyển sang thread pool")
+        return self._generate_lessons_threaded(chunks)
+
+    async def _generate_lessons_async(self, chunks: List[str]) -> List[Dict]:
+        """Sinh các bài song song trên một pool kết nối keep-alive, báo tiến độ khi từng bài xong"""
+        results = [None] * len(chunks)
+        client = AsyncGeminiClient(
+            self.gemini_client.api_key,
+            self.gemini_client.model,
+            base_url=config.GEMINI_API_BASE,
+            max_concurrency=self.max_concurrency,
+            timeout=self.timeout,
+            limiter=gemini_limiter,
+        )
+        done_count = 0
+
+        def _finish(index, lesson):
+            nonlocal done_count
+            results[index] = lesson
+            done_count += 1
+            self._report_progress(
+                f"Đã tạo {done_count}/{len(chunks)} bài học: {lesson.get('title', '')}")
+
+        # Chunk đã có trong cache không cần gọi AI
+        pending = []
+        for i, chunk in enumerate(chunks):
+            cached_lesson = self.chunk_cache.get(self._chunk_cache_key(chunk, i + 1))
+            if cached_lesson:
+                _finish(i, self._validate_lesson(cached_lesson, i + 1, chunk))
+            else:
+                pending.append(i)
+
+        async def _run_single(index):
+            _finish(index, await self._generate_single_lesson_async(client, chunks[index], index + 1))
+
+        async def _run_batch(indices):
+            lessons = await self._generate_batch_async(client, [(i + 1, chunks[i]) for i in indices])
+            missing = []
+            for i in indices:
+                if i + 1 in lessons:
+                    _finish(i, lessons[i + 1])
+                else:
+                    missing.append(i)
+            # Bài thiếu trong response gộp -> gọi riêng từng bài
+            await asyncio.gather(*[_run_single(i) for i in missing])
+
+        tasks = [
+            asyncio.ensure_future(_run_batch(batch) if len(batch) > 1 else _run_single(batch[0]))
+            for batch in self._plan_batches(pending, chunks)
+        ]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout * max(1, len(chunks))
+        try:
+            running = set(tasks)
+            while running and not self.should_stop:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                _, running = await asyncio.wait(running, timeout=min(remaining, 0.5),
+                                                return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await client.close()
+
+        # Bài không kịp xong vẫn có nội dung dự phòng, giống nhánh thread
+        if not self.should_stop:
+            for i, chunk in enumerate(chunks):
+                if results[i] is None:
+                    results[i] = self._create_fallback_lesson(i + 1, chunk)
+        return [r for r in results if r is not None]
+
+    async def _generate_single_lesson_async(self, client: AsyncGeminiClient, chunk: str, lesson_number: int) -> Dict:
+        """Bản async của _generate_single_lesson_safe, nhận response dạng stream"""
+        cache_key = self._chunk_cache_key(chunk, lesson_number)
+        cached_lesson = self.chunk_cache.get(cache_key)
+        if cached_lesson:
+            return self._validate_lesson(cached_lesson, lesson_number, chunk)
+
+        prompt = self._build_lesson_prompt(chunk, lesson_number)
+        for attempt in range(self.max_retries):
+            if self.should_stop:
+                break
+            try:
+                response_text = (await asyncio.wait_for(
+                    client.stream_text(prompt, temperature=0.6, response_schema=self._schema(lesson_schema.LESSON_SCHEMA)),
+                    timeout=self.timeout)).strip()
+                if not response_text:
+                    raise ValueError("Response rỗng từ AI")
+
+                lesson = self._parse_lesson_response(response_text)
+                if not lesson:
+                    raise ValueError("Không parse được JSON từ response")
+
+                self.chunk_cache.put(cache_key, lesson)
+                return self._validate_lesson(lesson, lesson_number, chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        return self._create_fallback_lesson(lesson_number, chunk)
+
+    def _generate_lessons_threaded(self, chunks: List[str]) -> List[Dict]:
+        """Tạo bài học bằng thread pool (dự phòng khi không dùng được asyncio)"""
         results = [None] * len(chunks)
         completed_count = 0
 
@@ -572,40 +809,41 @@ class ContentProcessor:
 
     def _generate_unique_question_hash(self, question: str, choices: List[str]) -> str:
         """Tạo hash để identify câu hỏi duy nhất"""
-        # Chuẩn hóa câu hỏi và đáp án
-        normalized_question = re.sub(r'\s+', ' ', question.strip().lower())
-        normalized_choices = [re.sub(r'\s+', ' ', choice.strip().lower()) for choice in choices]
-        
-        # Tạo hash từ câu hỏi và đáp án
-        combined = normalized_question + '|' + '|'.join(normalized_choices)
-        return hashlib.md5(combined.encode('utf-8')).hexdigest()
+        return question_hash(question, choices)
 
     def _is_question_unique(self, question: str, choices: List[str], used_set: Set[str]) -> bool:
         """Kiểm tra câu hỏi có trùng lặp không"""
         question_hash = self._generate_unique_question_hash(question, choices)
-        return question_hash not in used_set
+        if question_hash in used_set:
+            return False
+        if isinstance(used_set, NearDuplicateSet):
+            match = used_set.find_similar(question, choices)
+            if match:
+                used_set.index.record_duplicate(match[0], question)
+                return False
+        return True
 
     def _add_question_to_used(self, question: str, choices: List[str], used_set: Set[str]):
         """Thêm câu hỏi vào danh sách đã dùng"""
         question_hash = self._generate_unique_question_hash(question, choices)
-        used_set.add(question_hash)
-
-    def _generate_single_lesson_safe(self, chunk: str, lesson_number: int) -> Dict:
-        """Tạo một bài học với timeout và error handling an toàn"""
-        for attempt in range(self.max_retries):
-            try:
-                if self.should_stop:
-                    break
-
-                # Giới hạn độ dài chunk để tránh vượt quá token limit
-                max_chunk_length = 1200  # Giảm xuống để tăng tốc độ
-                chunk_for_prompt = (chunk[:max_chunk_length] + "...") if len(chunk) > max_chunk_length else chunk
-
-                prompt = f"""
-Tạo bài học số {lesson_number} từ nội dung sau:
-{chunk_for_prompt}
+        if isinstance(used_set, NearDuplicateSet):
+            used_set.add_question(question_hash, question, choices)
+        else:
+            used_set.add(question_hash)
+
+    def _chunk_cache_key(self, chunk: str, lesson_number: int) -> str:
+        """Khóa cache của một bài: nội dung chunk + số bài + thông số prompt"""
+        return self.chunk_cache.make_key(
+            chunk,
+            lesson_number=lesson_number,
+            questions_per_lesson=self.questions_per_lesson,
+            model=self.gemini_client.model,
+            prompt_version=self.PROMPT_VERSION,
+        )
 
-Yêu cầu:
+    def _lesson_requirements(self) -> str:
+        """Phần yêu cầu chung cho mỗi bài, dùng cho cả prompt đơn lẫn prompt gộp"""
+        return f"""Yêu cầu:
 0. Không bị lỗi charmap
 1. Tạo bài học theo thứ tự hợp lý (từ cơ bản đến nâng cao, từ mở bài đến kết thúc) 
 2. Tiêu đề ngắn gọn, phản ánh nội dung chính
@@ -621,7 +859,22 @@ Yêu cầu:
    - KHÔNG tạo câu hỏi mẫu hay placeholder
    - Câu hỏi phải ĐA DẠNG và KHÔNG TRÙNG LẶP
    - Tránh các câu hỏi chung chung như "Nội dung chính là gì?"
+"""
+
+    def _chunk_for_prompt(self, chunk: str) -> str:
+        # Giới hạn độ dài chunk để tránh vượt quá token limit
+        max_chunk_length = 1200  # Giảm xuống để tăng tốc độ
+        return (chunk[:max_chunk_length] + "...") if len(chunk) > max_chunk_length else chunk
 
+    def _build_lesson_prompt(self, chunk: str, lesson_number: int) -> str:
+        """Prompt sinh một bài học (đổi nội dung thì tăng PROMPT_VERSION)"""
+        chunk_for_prompt = self._chunk_for_prompt(chunk)
+
+        return f"""
+Tạo bài học số {lesson_number} từ nội dung sau:
+{chunk_for_prompt}
+
+{self._lesson_requirements()}
 Trả về **chỉ JSON** hợp lệ theo mẫu:
 {{
   "name": "Bài {lesson_number}",
@@ -638,10 +891,141 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
 }}
 """
 
+    def _build_batch_prompt(self, items: List[Tuple[int, str]]) -> str:
+        """Prompt gộp nhiều chunk: phần yêu cầu chỉ xuất hiện một lần"""
+        sections = "\n\n".join(
+            f"=== Bài {number} ===\n{self._chunk_for_prompt(chunk)}" for number, chunk in items
+        )
+        first = items[0][0]
+        return f"""
+Tạo {len(items)} bài học, mỗi đoạn nội dung dưới đây là MỘT bài (giữ đúng số bài):
+
+{sections}
+
+Yêu cầu cho MỖI bài - {self._lesson_requirements()}
+Trả về **chỉ một JSON array** hợp lệ gồm {len(items)} phần tử theo đúng thứ tự, mỗi phần tử theo mẫu:
+[
+  {{
+    "lesson_number": {first},
+    "name": "Bài {first}",
+    "title": "[Tiêu đề cụ thể về nội dung]",
+    "content": "[Nội dung tóm tắt chi tiết]",
+    "questions": [
+      {{
+        "question": "[Câu hỏi chi tiết về nội dung]",
+        "choices": ["A. ...", "B. ...", "C. ...", "D. ..."],
+        "correct_answer": 0,
+        "difficulty": "easy"
+      }}
+    ]
+  }}
+]
+"""
+
+    def _plan_batches(self, indices: List[int], chunks: List[str]) -> List[List[int]]:
+        """Gom các chunk liên tiếp thành batch theo ngân sách token và số bài tối đa"""
+        max_lessons = max(1, config.GEMINI_BATCH_MAX_LESSONS)
+        budget = config.GEMINI_BATCH_TOKEN_BUDGET
+        batches, current, used = [], [], 0
+        for index in indices:
+            tokens = estimate_tokens(self._chunk_for_prompt(chunks[index]), expected_output=0)
+            if current and (len(current) >= max_lessons or used + tokens > budget):
+                batches.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _parse_lesson_batch(self, text: str, numbers: List[int]) -> Dict[int, Dict]:
+        """
+        Tách response dạng JSON array thành {số bài: bài học thô}.
+
+        Ưu tiên trường lesson_number, rồi "Bài N" trong name, cuối cùng theo thứ tự.
+        """
+        parsed = self._parse_structured(text, lesson_schema.LESSON_BATCH_SCHEMA)
+        if parsed is None:
+            parsed = []
+            for candidate in self._extract_json_objects(text):
+                lesson = self._safe_parse_json(candidate)
+                if isinstance(lesson, dict) and self._is_valid_lesson_structure(lesson):
+                    parsed.append(lesson)
+            self.parse_stats["salvaged" if parsed else "failed"] += 1
+
+        lessons, unassigned = {}, []
+        for lesson in parsed:
+            number = lesson.pop("lesson_number", None)
+            if not isinstance(number, int):
+                match = re.search(r'(\d+)', str(lesson.get("name", "")))
+                number = int(match.group(1)) if match else None
+            if number in numbers and number not in lessons:
+                lessons[number] = lesson
+            else:
+                unassigned.append(lesson)
+
+        for number in numbers:
+            if number not in lessons and unassigned:
+                lessons[number] = unassigned.pop(0)
+        return lessons
+
+    async def _generate_batch_async(self, client: AsyncGeminiClient, items: List[Tuple[int, str]]) -> Dict[int, Dict]:
+        """
+        Sinh nhiều bài trong một request.
+
+        Returns:
+            {số bài: bài đã validate}; bài nào thiếu thì người gọi tự sinh riêng
+        """
+        prompt = self._build_batch_prompt(items)
+        numbers = [number for number, _ in items]
+        for attempt in range(self.max_retries):
+            if self.should_stop:
+                break
+            try:
+                response_text = (await asyncio.wait_for(
+                    client.stream_text(prompt, temperature=0.6,
+                                       max_output_tokens=min(8192, 2048 * len(items)),
+                                       response_schema=self._schema(lesson_schema.LESSON_BATCH_SCHEMA)),
+                    timeout=self.timeout * len(items))).strip()
+                lessons = self._parse_lesson_batch(response_text, numbers)
+                if not lessons:
+                    raise ValueError("Không parse được JSON array từ response")
+
+                validated = {}
+                for number, chunk in items:
+                    if number in lessons:
+                        self.chunk_cache.put(self._chunk_cache_key(chunk, number), lessons[number])
+                        validated[number] = self._validate_lesson(lessons[number], number, chunk)
+                return validated
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        return {}
+
+    def _generate_single_lesson_safe(self, chunk: str, lesson_number: int) -> Dict:
+        """Tạo một bài học với timeout và error handling an toàn"""
+        # Chunk không đổi so với lần tải trước -> dùng lại kết quả AI đã parse
+        cache_key = self._chunk_cache_key(chunk, lesson_number)
+        cached_lesson = self.chunk_cache.get(cache_key)
+        if cached_lesson:
+            return self._validate_lesson(cached_lesson, lesson_number, chunk)
+
+        for attempt in range(self.max_retries):
+            try:
+                if self.should_stop:
+                    break
+
+                prompt = self._build_lesson_prompt(chunk, lesson_number)
+
                 # Gọi Gemini API với timeout
                 response = self.client.chat.completions.create(
                     messages=[{"role": "user", "content": prompt}],
                     temperature=0.6,  # Giảm temperature để tăng độ ổn định
+                    response_schema=self._schema(lesson_schema.LESSON_SCHEMA),
                 )
 
                 response_text = (response.choices[0].message.content or "").strip()
@@ -650,16 +1034,72 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
                     raise ValueError("Response rỗng từ AI")
 
                 # Parse JSON an toàn
-                lesson = self._safe_parse_json(response_text)
+                lesson = self._parse_lesson_response(response_text)
                 if not lesson:
                     raise ValueError("Không parse được JSON từ response")
 
+                # Lưu bản thô (trước khi lọc trùng) vì việc lọc phụ thuộc các bài khác
+                self.chunk_cache.put(cache_key, lesson)
                 return self._validate_lesson(lesson, lesson_number, chunk)
 
             except Exception as e:
-                if attempt == self.max_retries - 1:
-                    return self._create_fallback_lesson(lesson_number, chunk)
-                time.sleep(min(2 ** attempt, 5))  # Exponential backoff với max 5s
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    break
+                time.sleep(delay)  # Backoff có jitter / theo Retry-After
+
+        return self._create_fallback_lesson(lesson_number, chunk)
+
+    def _schema(self, schema: Dict) -> Optional[Dict]:
+        """Schema gửi kèm request, hoặc None nếu tắt structured output"""
+        return schema if self.structured_output else None
+
+    def _parse_structured(self, text: str, schema: Dict):
+        """
+        Parse response của structured output và kiểm tra theo schema.
+
+        Câu hỏi sai schema bị bỏ (sẽ được _validate_lesson bù lại); lỗi ở cấp bài
+        học trả về None để dùng parser dự phòng.
+        """
+        try:
+            data = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+        # Ép hình dạng cấp cao nhất theo schema: OBJECT nhận dict (hoặc list một
+        # phần tử), ARRAY nhận list (bọc dict lẻ); hình dạng khác dùng parser dự phòng
+        if schema.get("type") == "ARRAY":
+            if isinstance(data, dict):
+                data = [data]
+            if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+                return None
+            lessons, item_schema = data, schema["items"]
+        else:
+            if isinstance(data, list) and len(data) == 1:
+                data = data[0]
+            if not isinstance(data, dict):
+                return None
+            lessons, item_schema = [data], schema
+        for lesson in lessons:
+            errors = lesson_schema.validate(lesson, item_schema)
+            if any(not err.startswith("$.questions[") for err in errors):
+                return None
+            if errors:
+                lesson["questions"] = [
+                    q for q in lesson["questions"]
+                    if not lesson_schema.validate(q, lesson_schema.QUESTION_SCHEMA)
+                ]
+        self.parse_stats["structured"] += 1
+        return data
+
+    def _parse_lesson_response(self, text: str) -> Optional[Dict]:
+        """Parse response một bài: structured output trước, parser cứu JSON sau"""
+        lesson = self._parse_structured(text, lesson_schema.LESSON_SCHEMA)
+        if lesson is not None:
+            return lesson
+        lesson = self._safe_parse_json(text)
+        self.parse_stats["salvaged" if lesson else "failed"] += 1
+        return lesson
 
     def _safe_parse_json(self, text: str) -> Optional[Dict]:
         # Thử parse trực tiếp
@@ -971,27 +1411,23 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
         medium_count = max(min_questions_per_difficulty, int(total_questions * 0.4))
         hard_count = max(min_questions_per_difficulty, total_questions - easy_count - medium_count)
 
-        question_id = 1
+        counts = {"easy": easy_count, "medium": medium_count, "hard": hard_count}
 
-        # Tạo câu hỏi dễ
-        for _ in range(easy_count):
-            question = self._generate_unique_quiz_question(question_id, "easy", lessons)
-            if question:
-                quiz["easy"].append(question)
-                question_id += 1
+        # Lấy mẫu phân tầng từ câu hỏi thật của các bài học
+        bank = QuestionBank.from_lessons(lessons)
+        sampled = bank.sample(counts, exclude=self.used_quiz_questions)
 
-        # Tạo câu hỏi trung bình
-        for _ in range(medium_count):
-            question = self._generate_unique_quiz_question(question_id, "medium", lessons)
-            if question:
-                quiz["medium"].append(question)
+        question_id = 1
+        for difficulty in ("easy", "medium", "hard"):
+            for source in sampled[difficulty]:
+                question = dict(source, id=question_id, difficulty=difficulty)
+                self._add_question_to_used(question["question"], question["choices"], self.used_quiz_questions)
+                quiz[difficulty].append(question)
                 question_id += 1
 
-        # Tạo câu hỏi khó
-        for _ in range(hard_count):
-            question = self._generate_unique_quiz_question(question_id, "hard", lessons)
-            if question:
-                quiz["hard"].append(question)
+            # Chỉ dùng câu hỏi mẫu khi ngân hàng đã cạn
+            while len(quiz[difficulty]) < counts[difficulty]:
+                quiz[difficulty].append(self._generate_unique_quiz_question(question_id, difficulty, lessons))
                 question_id += 1
 
         return quiz
@@ -1303,6 +1739,7 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
     def stop_processing(self):
         """Dừng quá trình xử lý"""
         self.should_stop = True
+        self.pdf_extractor.cancel()
 
     def get_progress_info(self) -> Dict:
         """Lấy thông tin tiến trình"""
@@ -1313,7 +1750,8 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
             "timeout": self.timeout,
             "total_timeout": self.total_timeout,
             "unique_lesson_questions": len(self.used_questions),
-            "unique_quiz_questions": len(self.used_quiz_questions)
+            "unique_quiz_questions": len(self.used_quiz_questions),
+            "pdf_extraction": dict(self.pdf_extractor.last_stats)
         }
 
     def validate_config(self) -> Tuple[bool, str]:
@@ -1377,6 +1815,10 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
         return {
             "content_cache_size": len(self.content_cache),
             "content_cache_keys": list(self.content_cache.keys())[:5],  # Show first 5 keys only
+            "generation_cache": self.generation_cache.get_stats(),
+            "rate_limiter": gemini_limiter.get_stats(),
+            "parse_stats": dict(self.parse_stats),
+            "chunk_cache": self.chunk_cache.get_stats(),
             "unique_lesson_questions": len(self.used_questions),
             "unique_quiz_questions": len(self.used_quiz_questions)
         }
@@ -1406,7 +1848,7 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
         """Lấy thông tin AI đang sử dụng"""
         return {
             "ai_provider": "Google Gemini",
-            "model": "gemini-2.0-flash",
+            "model": self.gemini_client.model,
             "api_key_prefix": self.gemini_client.api_key[:10] + "..." if self.gemini_client.api_key else "None",
             "base_url": self.gemini_client.base_url,
             "timeout": self.timeout,
@@ -1439,6 +1881,19 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
         except Exception as e:
             return False, f"Lỗi test encoding detection: {e}"
 
+    def benchmark_preprocessing(self, content: Optional[str] = None, repeat: int = 3) -> Dict:
+        """
+        Đo thông lượng tiền xử lý (MB/s) so với cách làm sạch cũ.
+
+        Args:
+            content: nội dung mẫu, mặc định là văn bản tiếng Việt tổng hợp ~5MB
+        """
+        if content is None:
+            paragraph = ("Trong hệ sinh thái, các loài sinh vật tương tác với nhau qua chuỗi thức ăn.  "
+                         "Năng lượng\tđược truyền từ bậc dinh dưỡng này sang bậc khác.\x00\n \n\n")
+            content = paragraph * 40000
+        return ingest.benchmark_clean_text(content, repeat=repeat)
+
     def get_supported_encodings(self) -> List[str]:
         """Lấy danh sách encoding được hỗ trợ"""
         return [
@@ -1507,6 +1962,10 @@ Trả về **chỉ JSON** hợp lệ theo mẫu:
             "total_lesson_questions_generated": len(self.used_questions),
             "total_quiz_questions_generated": len(self.used_quiz_questions),
             "deduplication_enabled": True,
-            "hash_algorithm": "MD5",
-            "tracking_fields": ["question_text", "answer_choices"]
+            "hash_algorithm": "MD5 + MinHash/LSH",
+            "similarity_threshold": config.QUESTION_SIMILARITY_THRESHOLD,
+            "tracking_fields": ["question_text", "answer_choices"],
+            "lesson_similarity": self.used_questions.index.get_stats(),
+            "quiz_similarity": self.used_quiz_questions.index.get_stats(),
+            "duplicate_clusters": self.used_questions.index.clusters() + self.used_quiz_questions.index.clusters()
         }
\ No newline at end of file
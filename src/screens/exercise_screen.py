@@ -1,14 +1,13 @@
 import pygame
 import ui_elements
 import config
-import json
-import os
+from scheduler import scheduler
+from quiz_repository import quiz_repository
 import time
 import random
 import math
 
 # Khai báo biến toàn cục
-exercise_data = None
 correct_sound = None
 wrong_sound = None
 click_sound = None
@@ -24,7 +23,7 @@ def draw_mode_description(screen, start_y=400, max_width=600):
         # Dùng wrap_text có sẵn
         wrapped = _wrap_text(line, config.FONT_SMALL, max_width)
         for w in wrapped:
-            txt = config.FONT_SMALL.render(w, True, (60, 60, 60))
+            txt = ui_elements.render_text(w, config.FONT_SMALL, (60, 60, 60))
             screen.blit(txt, (540, y))
             y += config.FONT_SMALL.get_linesize()
         y += 20  # khoảng cách giữa các gạch đầu dòng
@@ -40,53 +39,8 @@ def set_click_sound(sound):
     click_sound = sound
 
 def load_exercise_data():
-    global exercise_data
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.abspath(os.path.join(script_dir, "..", ".."))
-    data_path = config.QUIZ_DATA_FILE_PATH
-
-    try:
-        with open(data_path, 'r', encoding='utf-8') as file:
-            exercise_data = json.load(file)
-            # Ensure all questions have points
-            for difficulty in ["easy", "medium", "hard"]:
-                if difficulty in exercise_data:
-                    for question in exercise_data[difficulty]:
-                        if "points" not in question:
-                            # Set default points based on difficulty
-                            if difficulty == "easy":
-                                question["points"] = 10
-                            elif difficulty == "medium":
-                                question["points"] = 15
-                            else:  # hard
-                                question["points"] = 20
-    except FileNotFoundError:
-        exercise_data = {
-            "easy": [{
-                "id": 1,
-                "question": "Câu hỏi mẫu (dễ)?",
-                "choices": ["A", "B", "C", "D"],
-                "correct_answer": 0,
-                "points": 10
-            }],
-            "medium": [{
-                "id": 1,
-                "question": "Câu hỏi mẫu (trung bình)?",
-                "choices": ["A", "B", "C", "D"],
-                "correct_answer": 1,
-                "points": 15
-            }],
-            "hard": [{
-                "id": 1,
-                "question": "Câu hỏi mẫu (khó)?",
-                "choices": ["A", "B", "C", "D"],
-                "correct_answer": 2,
-                "points": 20
-            }]
-        }
-    except Exception as e:
-        print(f"Error loading exercise data: {e}")
-        exercise_data = {"easy": [], "medium": [], "hard": []}
+    """Ngân hàng bài tập hiện tại theo độ khó (quiz_repository tự đọc lại khi quiz.json đổi)"""
+    return quiz_repository.get_exercise_bank()
 
 def create_difficulty_callback(difficulty, game_state, switch_screen_callback):
     def callback():
@@ -122,10 +76,6 @@ def draw_icon(surface, icon_type, x, y, size=30):
         ])
 
 def draw_exercise(screen, game_state, switch_screen_callback):
-    global exercise_data
-    if exercise_data is None:
-        load_exercise_data()
-
     buttons = []
     draw_mode_description(screen,150, config.WIDTH - 620)
 
@@ -160,13 +110,13 @@ def draw_exercise(screen, game_state, switch_screen_callback):
         )
         buttons.append(btn)
 
-        desc = config.FONT_SMALL.render(level["desc"], True, (100, 100, 100))
+        desc = ui_elements.render_text(level["desc"], config.FONT_SMALL, (100, 100, 100))
         screen.blit(desc, (100, card_y + 90))
 
         card_y += 150
 
     # Hiển thị năng lượng
-    energy_text = config.FONT_SMALL.render(f"Năng lượng: {game_state.energy}", True, (0, 0, 0))
+    energy_text = ui_elements.render_text(f"Năng lượng: {game_state.energy}", config.FONT_SMALL, (0, 0, 0))
     screen.blit(energy_text, (config.WIDTH - energy_text.get_width() - 110, 40))
 
     # Vẽ tất cả nút
@@ -176,69 +126,105 @@ def draw_exercise(screen, game_state, switch_screen_callback):
     return buttons
 
 
-def _get_wrap_func():
-    """Trả về hàm wrap từ ui_elements nếu có, còn không trả về fallback."""
-    if hasattr(ui_elements, "wrap_text") and callable(getattr(ui_elements, "wrap_text")):
-        return ui_elements.wrap_text
-    return _wrap_text
-
 def _wrap_text(text: str, font: pygame.font.Font, max_width: int):
     """
     Trả về danh sách các dòng đã được wrap để vừa max_width.
     Xử lý newline trong text, và tách từ nếu một từ dài hơn max_width.
     """
-    if text is None:
-        return [""]
-    lines = []
-    paragraphs = text.split("\n")
-    for para in paragraphs:
-        words = para.split(" ")
-        if not words:
-            lines.append("")
-            continue
-        cur_line = ""
-        for w in words:
-            test = (cur_line + " " + w) if cur_line else w
-            if font.size(test)[0] <= max_width:
-                cur_line = test
+    return ui_elements.wrap_text(text, font, max_width) or ("",)
+
+# Bố cục màn hình làm bài: chia màn hình làm hai cột giống quiz_screen
+QUIZ_MARGIN = 40
+QUIZ_PAGE_WIDTH = (config.WIDTH - QUIZ_MARGIN * 3) // 2
+QUIZ_LEFT_X = QUIZ_MARGIN + 50
+QUIZ_RIGHT_X = QUIZ_LEFT_X + QUIZ_PAGE_WIDTH + QUIZ_MARGIN - 25
+QUIZ_TOP_Y = 150
+QUIZ_CONTENT_WIDTH = QUIZ_PAGE_WIDTH - 70
+
+
+def _choice_layout(current_question):
+    """
+    Vị trí các ô đáp án: ([(y, chiều cao, các dòng đã wrap), ...], y ngay dưới ô cuối).
+    Dùng chung cho lúc dựng nút và lúc vẽ chữ nên hai bên luôn khớp nhau.
+    """
+    choice_spacing = 20
+    choice_height_min = 45
+    line_height = config.FONT.get_linesize()
+
+    choices = current_question.get("choices", [])
+    wrappeds = [_wrap_text(choice, config.FONT, QUIZ_CONTENT_WIDTH - 20) for choice in choices]
+    heights = [max(choice_height_min, max(1, len(w)) * line_height + 10) for w in wrappeds]
+
+    # Nếu tổng chiều cao vượt quá vùng có thể, giảm khoảng cách xuống mức tối thiểu
+    available_height = config.HEIGHT - QUIZ_TOP_Y - 140  # dành chỗ cho feedback & nút bấm dưới
+    if sum(heights) + (len(choices) - 1) * choice_spacing > available_height:
+        choice_spacing = 8
+
+    layout = []
+    y = QUIZ_TOP_Y
+    for wrapped, height in zip(wrappeds, heights):
+        layout.append((y, height, wrapped))
+        y += height + choice_spacing
+    return layout, y
+
+
+def build_exercise_quiz_buttons(game_state, switch_screen_callback):
+    """Nút đáp án của câu hiện tại (main giữ lại qua WidgetRegistry, không dựng mỗi frame)"""
+    exercise_state = game_state.exercise_state
+    if not exercise_state or exercise_state["completed"]:
+        return []
+
+    current_question = exercise_state["questions"][exercise_state["current_question"]]
+    layout, _ = _choice_layout(current_question)
+    buttons = []
+    for idx, (y, choice_height, _) in enumerate(layout):
+        # Xác định màu button tùy trạng thái
+        if exercise_state.get("answered", False):
+            if idx == current_question["correct_answer"]:
+                color = (100, 200, 100)  # Xanh cho đúng
+            elif idx == exercise_state.get("user_answer"):
+                color = (255, 120, 120)  # Đỏ cho sai
             else:
-                if cur_line:
-                    lines.append(cur_line)
-                # nếu từ w vẫn quá dài, tách theo ký tự
-                if font.size(w)[0] > max_width:
-                    part = ""
-                    for ch in w:
-                        if font.size(part + ch)[0] <= max_width:
-                            part += ch
-                        else:
-                            if part:
-                                lines.append(part)
-                            part = ch
-                    if part:
-                        cur_line = part
-                    else:
-                        cur_line = ""
-                else:
-                    cur_line = w
-        if cur_line:
-            lines.append(cur_line)
-    return lines or [""]
-
-def draw_exercise_quiz(screen, game_state, switch_screen_callback):
+                color = (250, 235, 215)  # Xám cho các lựa chọn khác
+        else:
+            color = (255, 228, 196)  # Màu xanh lá nhạt mặc định
+
+        # Tạo button (truyền text rỗng, vẽ text thủ công) để tránh giới hạn ký tự trong Button
+        # IMPORTANT: freeze current values into default args to avoid late-binding issues
+        buttons.append(ui_elements.Button(
+            QUIZ_RIGHT_X,
+            y,
+            QUIZ_CONTENT_WIDTH,
+            choice_height,
+            "",
+            lambda i=idx: handle_answer_selection(game_state, i, switch_screen_callback),
+            color,
+            8,
+            click_sound
+        ))
+    return buttons
+
+
+def draw_exercise_quiz(screen, game_state, switch_screen_callback, buttons=None):
+    """
+    Vẽ màn hình làm bài. `buttons` là nút đáp án đã dựng sẵn (từ
+    build_exercise_quiz_buttons); None thì dựng tạm cho lần vẽ này.
+    """
     global transition_timer
     
-    buttons = []
     exercise_state = game_state.exercise_state
 
     if not exercise_state or exercise_state["completed"]:
         if transition_timer:
-            pygame.time.set_timer(transition_timer, 0)
+            scheduler.clear_event_timer(transition_timer)
             transition_timer = None
         switch_screen_callback(config.SCREEN_EXERCISE)
-        return buttons
+        return []
+
+    if buttons is None:
+        buttons = build_exercise_quiz_buttons(game_state, switch_screen_callback)
 
     current_question = exercise_state["questions"][exercise_state["current_question"]]
-    wrap_func = _get_wrap_func()
 
     for i in range(30):
         x = random.randint(0, config.WIDTH)
@@ -249,22 +235,19 @@ def draw_exercise_quiz(screen, game_state, switch_screen_callback):
         pygame.draw.circle(dot_surf, (200, 230, 200, alpha), (size, size), size)
         screen.blit(dot_surf, (x, y))
     
-    # Layout: chia màn hình làm hai cột giống quiz_screen
-    margin = 40
-    page_width = (config.WIDTH - margin * 3) // 2
-    left_x = margin + 50
-    right_x = left_x + page_width + margin - 25
-    top_y = 150
-    content_width = page_width - 70
+    left_x = QUIZ_LEFT_X
+    right_x = QUIZ_RIGHT_X
+    top_y = QUIZ_TOP_Y
+    content_width = QUIZ_CONTENT_WIDTH
 
     # Đếm câu hỏi ở góc trên phải
-    counter = config.FONT_SMALL.render(f"Câu {exercise_state['current_question']+1}/{len(exercise_state['questions'])}", True, (80, 120, 80))
+    counter = ui_elements.render_text(f"Câu {exercise_state['current_question']+1}/{len(exercise_state['questions'])}", config.FONT_SMALL, (80, 120, 80))
     screen.blit(counter, (config.WIDTH - counter.get_width() - 100, 550))
 
     # --- Vẽ tiêu đề "Câu thứ n" phía trên câu hỏi ---
     try:
         title_text = f"Câu {exercise_state['current_question'] + 1}"
-        title_surf = config.FONT_TITLE.render(title_text, True, (80, 120, 80))
+        title_surf = ui_elements.render_text(title_text, config.FONT_TITLE, (80, 120, 80))
         screen.blit(title_surf, (left_x, top_y - title_surf.get_height() - 20))
     except Exception:
         pass
@@ -283,88 +266,31 @@ def draw_exercise_quiz(screen, game_state, switch_screen_callback):
     except Exception:
         try:
             txt = current_question.get("question", "")[:200]
-            t_surf = config.FONT.render(txt, True, (70, 70, 70))
+            t_surf = ui_elements.render_text(txt, config.FONT, (70, 70, 70))
             screen.blit(t_surf, (left_x, top_y))
         except Exception:
             pass
 
-    # Vẽ đáp án bên phải, đảm bảo wrap nội dung trong box
-    choice_top_y = top_y
-    choice_spacing = 20
-    choice_height_min = 45
-
-    choices = current_question.get("choices", [])
-    # Precompute wrapped lines & heights
-    wrappeds = [wrap_func(choice, config.FONT, content_width - 20) for choice in choices]
-
-    # Tính tổng chiều cao cần thiết; nếu vượt quá vùng có thể, giảm khoảng cách
-    total_req_height = 0
-    for w in wrappeds:
-        text_height = max(1, len(w)) * config.FONT.get_linesize()
-        total_req_height += max(choice_height_min, text_height + 10)
-    total_req_height += (len(choices) - 1) * choice_spacing
-
-    available_height = config.HEIGHT - top_y - 140  # dành chỗ cho feedback & nút bấm dưới
-    if total_req_height > available_height:
-        # giảm spacing xuống mức tối thiểu
-        choice_spacing = 8
-        total_req_height = 0
-        for w in wrappeds:
-            text_height = max(1, len(w)) * config.FONT.get_linesize()
-            total_req_height += max(choice_height_min, text_height + 10)
-        total_req_height += (len(choices) - 1) * choice_spacing
-
-    # Vẽ từng button
-    y = choice_top_y
-    for idx, wrapped in enumerate(wrappeds):
-        text_height = max(1, len(wrapped)) * config.FONT.get_linesize()
-        choice_height = max(choice_height_min, text_height + 10)
-
-        # Xác định màu button tùy trạng thái
-        if exercise_state.get("answered", False):
-            if idx == current_question["correct_answer"]:
-                color = (100, 200, 100)  # Xanh cho đúng
-            elif idx == exercise_state.get("user_answer"):
-                color = (255, 120, 120)  # Đỏ cho sai
-            else:
-                color = (250, 235, 215)  # Xám cho các lựa chọn khác
-        else:
-            color = (255, 228, 196)  # Màu xanh lá nhạt mặc định
-
-        # Tạo button (truyền text rỗng, vẽ text thủ công) để tránh giới hạn ký tự trong Button
-        # IMPORTANT: freeze current values into default args to avoid late-binding issues
-        btn = ui_elements.Button(
-            right_x,
-            y,
-            content_width,
-            choice_height,
-            "",
-            lambda i=idx: handle_answer_selection(game_state, i, switch_screen_callback),
-            color,
-            8,
-            click_sound
-        )
+    # Vẽ đáp án bên phải: nút đã dựng sẵn + chữ wrap căn giữa trong nút
+    layout, y = _choice_layout(current_question)
+    for btn, (choice_y, _, wrapped) in zip(buttons, layout):
         try:
             btn.draw(screen)
         except Exception:
             pass
 
-        # Vẽ text wrapped trong button, căn giữa
-        line_y = y + 5
+        line_y = choice_y + 5
         for line in wrapped:
             try:
-                text_surface = config.FONT.render(line, True, (70, 70, 70))
+                text_surface = ui_elements.render_text(line, config.FONT, (70, 70, 70))
             except Exception:
-                text_surface = config.FONT.render(line, True, (0, 0, 0))
+                text_surface = ui_elements.render_text(line, config.FONT, (0, 0, 0))
             screen.blit(
                 text_surface,
                 (right_x + (content_width - text_surface.get_width()) // 2, line_y)
             )
             line_y += config.FONT.get_linesize()
 
-        buttons.append(btn)
-        y += choice_height + choice_spacing
-
     # Hiển thị feedback nếu đã trả lời
     if exercise_state.get("answered", False):
         is_correct = exercise_state.get("user_answer") == current_question["correct_answer"]
@@ -382,7 +308,7 @@ def draw_exercise_quiz(screen, game_state, switch_screen_callback):
             )
         except Exception:
             try:
-                t = config.FONT.render(feedback, True, feedback_color)
+                t = ui_elements.render_text(feedback, config.FONT, feedback_color)
                 screen.blit(t, (right_x + (content_width - t.get_width()) // 2, y + 10))
             except Exception:
                 pass
@@ -414,16 +340,16 @@ def handle_answer_selection(game_state, answer_index, switch_screen_callback):
     
     # Thiết lập timer để tự động chuyển câu
     if transition_timer:
-        pygame.time.set_timer(transition_timer, 0)  # Hủy timer cũ nếu có
+        scheduler.clear_event_timer(transition_timer)  # Hủy timer cũ nếu có
     
-    transition_timer = pygame.USEREVENT + 1  # Sử dụng event ID cao hơn để tránh xung đột
-    pygame.time.set_timer(transition_timer, 1500)  # 1.5 giây
+    transition_timer = config.EVENT_EXERCISE_TRANSITION
+    scheduler.set_event_timer(transition_timer, 1500)  # 1.5 giây
 
 def check_timer_event(game_state, switch_screen_callback, event):
     global transition_timer
     
     if event.type == transition_timer:
-        pygame.time.set_timer(transition_timer, 0)  # Tắt timer
+        scheduler.clear_event_timer(transition_timer)  # Tắt timer
         transition_timer = None
         
         state = game_state.exercise_state
@@ -436,28 +362,23 @@ def check_timer_event(game_state, switch_screen_callback, event):
             show_result(game_state, switch_screen_callback)
 
 def start_exercise_session(game_state, difficulty, switch_screen_callback):
-    global exercise_data, transition_timer
+    global transition_timer
     
     if transition_timer:
-        pygame.time.set_timer(transition_timer, 0)
+        scheduler.clear_event_timer(transition_timer)
         transition_timer = None
 
-    if game_state.energy < 1:
-        game_state.purchase_message = "Không đủ năng lượng!"
-        game_state.message_timer = time.time()
-        return
-
-    if exercise_data is None:
-        load_exercise_data()
-
-    questions = exercise_data.get(difficulty, [])
+    questions = quiz_repository.get_exercises(difficulty)
     if not questions:
         game_state.purchase_message = f"Không có câu hỏi {difficulty}!"
         game_state.message_timer = time.time()
         return
 
-    game_state.energy -= 1
-    game_state.write_data()
+    # Kiểm tra + trừ năng lượng trong một bước
+    if not game_state.consume_energy(1):
+        game_state.purchase_message = "Không đủ năng lượng!"
+        game_state.message_timer = time.time()
+        return
 
     # Chọn ngẫu nhiên 10 câu hỏi
     selected = random.sample(questions, min(10, len(questions)))
@@ -474,7 +395,7 @@ def start_exercise_session(game_state, difficulty, switch_screen_callback):
 
 def show_result(game_state, switch_screen_callback):
     state = game_state.exercise_state
-    game_state.point += state["score"]
+    game_state.add_points(state["score"])
     
     result = f"Hoàn thành! Điểm: {state['score']}"
     game_state.purchase_message = result
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Client Gemini bất đồng bộ, chỉ dùng thư viện chuẩn (asyncio).
+
+- Giữ kết nối keep-alive trong một pool dùng chung, không bắt tay TLS lại cho
+  mỗi bài học.
+- Giới hạn số request song song bằng Semaphore (cấu hình được), thay cho
+  ThreadPoolExecutor cố định 3 luồng.
+- Hỗ trợ streamGenerateContent (SSE) để nhận nội dung dần dần.
+- base_url cấu hình được (kể cả http://) nên có thể chạy với một server giả
+  lập trả về response dựng sẵn.
+"""
+
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+
+from .rate_limiter import GeminiAPIError, estimate_tokens
+from .lesson_schema import build_generation_body
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+class _Response:
+    """Response HTTP/1.1 đang đọc dở trên một kết nối"""
+
+    def __init__(self, status, headers, reader):
+        self.status = status
+        self.headers = headers
+        self._reader = reader
+        self.complete = False
+
+    @property
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+    async def iter_chunks(self):
+        """Đọc body theo Content-Length, chunked hoặc tới khi đóng kết nối"""
+        reader = self._reader
+        if "chunked" in self.headers.get("transfer-encoding", "").lower():
+            while True:
+                size_line = await reader.readline()
+                if not size_line:
+                    raise ConnectionError("Kết nối bị đóng giữa chừng")
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Bỏ qua trailer tới dòng trống
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                data = await reader.readexactly(size)
+                await reader.readexactly(2)
+                yield data
+        elif "content-length" in self.headers:
+            remaining = int(self.headers["content-length"])
+            while remaining > 0:
+                data = await reader.read(min(remaining, 65536))
+                if not data:
+                    raise ConnectionError("Kết nối bị đóng giữa chừng")
+                remaining -= len(data)
+                yield data
+        else:
+            self.headers["connection"] = "close"
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                yield data
+        self.complete = True
+
+    async def read(self):
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+
+class AsyncGeminiClient:
+    """
+    Args:
+        api_key         : khóa API Gemini
+        model           : tên model, ví dụ "gemini-2.0-flash"
+        base_url        : gốc API (đổi sang http://127.0.0.1:port để test)
+        max_concurrency : số request chạy song song tối đa
+        timeout         : timeout (giây) cho kết nối và từng lần đọc
+        limiter         : RateLimiter dùng chung (None = không giới hạn)
+    """
+
+    def __init__(self, api_key, model, base_url=DEFAULT_BASE_URL, max_concurrency=6, timeout=60,
+                 limiter=None):
+        parts = urlsplit(base_url)
+        self.api_key = api_key
+        self.model = model
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.path_prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limiter = limiter
+
+        self._semaphore = None
+        self._idle = []          # [(reader, writer)] kết nối keep-alive đang rảnh
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    # =========================
+    # Pool kết nối
+    # =========================
+
+    def _get_semaphore(self):
+        # Tạo lười để gắn với event loop đang chạy
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _open_connection(self):
+        ssl_context = ssl.create_default_context() if self.scheme == "https" else None
+        conn = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=ssl_context),
+            timeout=self.timeout,
+        )
+        self.connections_opened += 1
+        return conn
+
+    def _release(self, conn, response):
+        reader, writer = conn
+        if response.complete and response.keep_alive and len(self._idle) < self.max_concurrency:
+            self._idle.append(conn)
+        else:
+            writer.close()
+
+    async def close(self):
+        """Đóng mọi kết nối đang giữ trong pool"""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    # =========================
+    # HTTP
+    # =========================
+
+    async def _send(self, conn, path, body):
+        reader, writer = conn
+        payload = json.dumps(body).encode("utf-8")
+        head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"X-goog-api-key: {self.api_key}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + payload)
+        await writer.drain()
+
+        status_line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+        if not status_line:
+            raise ConnectionResetError("Kết nối keep-alive đã bị server đóng")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if status_line.startswith(b"HTTP/1.0") and "keep-alive" not in headers.get("connection", "").lower():
+            headers["connection"] = "close"
+        return _Response(status, headers, reader)
+
+    async def _request(self, path, body):
+        """
+        Gửi request trên một kết nối của pool.
+
+        Returns:
+            (conn, response): người gọi phải đọc hết body rồi gọi _release
+        """
+        # Kết nối lấy từ pool có thể đã bị server đóng -> thử lại bằng kết nối mới
+        while self._idle:
+            conn = self._idle.pop()
+            try:
+                return conn, await self._send(conn, path, body)
+            except (ConnectionError, OSError, ValueError, IndexError):
+                conn[1].close()
+        conn = await self._open_connection()
+        try:
+            return conn, await self._send(conn, path, body)
+        except Exception:
+            conn[1].close()
+            raise
+
+    def build_body(self, prompt, temperature=0.7, max_output_tokens=4096, response_schema=None):
+        return build_generation_body(prompt, temperature, max_output_tokens, response_schema)
+
+    @staticmethod
+    def _extract_text(result):
+        try:
+            parts = result["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            return ""
+        return "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+
+    async def _raise_for_status(self, conn, response):
+        if self.limiter:
+            self.limiter.update_from_headers(response.headers)
+        if response.status == 200:
+            return
+        text = (await response.read()).decode("utf-8", "replace")
+        self._release(conn, response)
+        raise GeminiAPIError.from_response(response.status, response.headers, text)
+
+    async def _wait_for_quota(self, prompt, kwargs):
+        if self.limiter:
+            await self.limiter.acquire_async(
+                estimate_tokens(prompt, kwargs.get("max_output_tokens", 1500)))
+
+    # =========================
+    # API
+    # =========================
+
+    async def generate(self, prompt, temperature=0.7, **kwargs):
+        """Gọi generateContent, trả về toàn bộ text"""
+        path = f"{self.path_prefix}/models/{self.model}:generateContent"
+        async with self._get_semaphore():
+            await self._wait_for_quota(prompt, kwargs)
+            conn, response = await self._request(path, self.build_body(prompt, temperature, **kwargs))
+            self.requests_sent += 1
+            await self._raise_for_status(conn, response)
+            raw = await asyncio.wait_for(response.read(), timeout=self.timeout)
+            self._release(conn, response)
+        text = self._extract_text(json.loads(raw.decode("utf-8")))
+        if not text:
+            raise Exception("Không nhận được phản hồi từ Gemini API")
+        return text
+
+    async def stream_generate(self, prompt, temperature=0.7, **kwargs):
+        """
+        Gọi streamGenerateContent (SSE), yield từng đoạn text ngay khi nhận được.
+        """
+        path = f"{self.path_prefix}/models/{self.model}:streamGenerateContent?alt=sse"
+        async with self._get_semaphore():
+            await self._wait_for_quota(prompt, kwargs)
+            conn, response = await self._request(path, self.build_body(prompt, temperature, **kwargs))
+            self.requests_sent += 1
+            await self._raise_for_status(conn, response)
+
+            buffer = b""
+            data_lines = []
+            chunks = response.iter_chunks()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    buffer += chunk
+                    while b"\n" in buffer:
+                        line, buffer = buffer.split(b"\n", 1)
+                        line = line.rstrip(b"\r")
+                        if line.startswith(b"data:"):
+                            data_lines.append(line[5:].strip())
+                        elif not line and data_lines:
+                            # Dòng trống kết thúc một event SSE
+                            event = b"\n".join(data_lines)
+                            data_lines = []
+                            text = self._extract_text(json.loads(event.decode("utf-8")))
+                            if text:
+                                yield text
+                if data_lines:
+                    text = self._extract_text(json.loads(b"\n".join(data_lines).decode("utf-8")))
+                    if text:
+                        yield text
+            finally:
+                self._release(conn, response)
+
+    async def stream_text(self, prompt, temperature=0.7, on_delta=None, **kwargs):
+        """Stream và ghép lại thành text hoàn chỉnh; on_delta(text_so_far) được gọi sau mỗi đoạn"""
+        pieces = []
+        async for delta in self.stream_generate(prompt, temperature, **kwargs):
+            pieces.append(delta)
+            if on_delta:
+                on_delta("".join(pieces))
+        text = "".join(pieces)
+        if not text:
+            raise Exception("Không nhận được phản hồi từ Gemini API")
+        return text
+
+    def get_stats(self):
+        return {
+            "connections_opened": self.connections_opened,
+            "requests_sent": self.requests_sent,
+            "idle_connections": len(self._idle),
+            "max_concurrency": self.max_concurrency,
+        }
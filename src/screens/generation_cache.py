@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Cache trên đĩa cho kết quả sinh bài học/quiz của ContentProcessor.
+
+Mỗi lần tải lên một file, load_screen tạo ContentProcessor mới nên cache trong
+bộ nhớ không bao giờ trúng. Cache này lưu kết quả theo địa chỉ nội dung:
+khóa = sha256(nội dung đã tiền xử lý + cấu hình sinh + model + phiên bản prompt),
+mỗi mục là một file JSON có checksum để phát hiện file hỏng.
+Tổng dung lượng được giới hạn, mục ít dùng nhất (theo mtime) bị xóa trước.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from persistence import atomic_write_json
+
+ENTRY_FORMAT = 1
+
+
+def _payload_checksum(payload):
+    """Checksum ổn định của payload (không phụ thuộc thứ tự khóa)"""
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Cache kết quả sinh nội dung, lưu mỗi mục thành <key>.json trong cache_dir.
+
+    Args:
+        cache_dir : thư mục chứa cache
+        max_bytes : tổng dung lượng tối đa, vượt quá thì xóa mục cũ nhất
+    """
+
+    def __init__(self, cache_dir, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.corrupted = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content, **settings):
+        """
+        Tạo khóa từ nội dung và các thông số sinh.
+
+        Mọi thông số ảnh hưởng tới kết quả (số bài, số câu hỏi, model,
+        phiên bản prompt...) phải được truyền vào settings.
+        """
+        return GenerationCache.make_key_from_digest(
+            hashlib.sha256(content.encode("utf-8")).hexdigest(), **settings)
+
+    @staticmethod
+    def make_key_from_digest(content_digest, **settings):
+        """Như make_key nhưng nhận sẵn sha256 của nội dung (tính dần khi đọc stream)"""
+        h = hashlib.sha256()
+        h.update(content_digest.encode("ascii"))
+        h.update(b"\0")
+        h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, key):
+        """
+        Lấy payload đã lưu.
+
+        Returns:
+            dict payload, hoặc None nếu không có / file hỏng (file hỏng bị xóa)
+        """
+        path = self._entry_path(key)
+        with self._lock:
+            if not os.path.exists(path):
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                payload = entry["payload"]
+                if (entry.get("format") != ENTRY_FORMAT or entry.get("key") != key
+                        or entry.get("checksum") != _payload_checksum(payload)):
+                    raise ValueError("checksum không khớp")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Bỏ mục cache hỏng {os.path.basename(path)}: {e}")
+                self._discard(path)
+                self.corrupted += 1
+                self.misses += 1
+                return None
+
+            # Cập nhật mtime để đánh dấu vừa dùng (phục vụ LRU)
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        """Lưu payload (phải serialize được JSON) rồi dọn cache nếu quá dung lượng"""
+        entry = {
+            "format": ENTRY_FORMAT,
+            "key": key,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "checksum": _payload_checksum(payload),
+            "payload": payload,
+        }
+        with self._lock:
+            try:
+                atomic_write_json(self._entry_path(key), entry, indent=None)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ Không thể ghi cache sinh nội dung: {e}")
+                return False
+            self._evict()
+            return True
+
+    def _list_entries(self):
+        """Danh sách (mtime, size, path) của các mục cache"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Xóa mục ít dùng nhất cho tới khi tổng dung lượng <= max_bytes"""
+        entries = sorted(self._list_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._discard(path)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Xóa toàn bộ cache trên đĩa"""
+        with self._lock:
+            for _, _, path in self._list_entries():
+                self._discard(path)
+
+    def get_stats(self):
+        """Thông tin cache để debug"""
+        entries = self._list_entries()
+        return {
+            "entries": len(entries),
+            "total_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "corrupted": self.corrupted,
+            "evictions": self.evictions,
+        }
@@ -1,6 +1,7 @@
 import pygame
 import ui_elements
 import config
+from assets import assets
 import os
 import json
 import tkinter as tk
@@ -83,28 +84,21 @@ def open_api_window():
 
 def draw_home(screen, game_state, switch_screen_callback):
     # Vẽ nền
-    try:
-        image_bg = pygame.image.load(os.path.join(config.ASSETS_DIR, "setting", "back.png"))
-        image_bg = pygame.transform.scale(image_bg, (960, 640))
+    image_bg = assets.get_setting("back.png", (960, 640))
+    if image_bg:
         screen.blit(image_bg, (0, 0))
-    except Exception:
+    else:
         screen.fill((200, 200, 200))
 
     # Vẽ tiêu đề
-    try:
-        image = pygame.image.load(os.path.join(config.ASSETS_DIR, "setting", "home_logo.png"))
-        image = pygame.transform.scale(image, (850, 370))
+    image = assets.get_setting("home_logo.png", (850, 370))
+    if image:
         screen.blit(image, (70, 50))
-    except Exception:
-        pass
 
     # Resource button
-    try:
-        button_img = pygame.image.load(os.path.join(config.ASSETS_DIR, "setting", "button.png"))
-        button_img = pygame.transform.scale(button_img, (196, 94))
-        button_hover_img = pygame.image.load(os.path.join(config.ASSETS_DIR, "setting", "hover_button.png"))
-        button_hover_img = pygame.transform.scale(button_hover_img, (196, 94))
-    except Exception:
+    button_img = assets.get_setting("button.png", (196, 94))
+    button_hover_img = assets.get_setting("hover_button.png", (196, 94))
+    if not button_img or not button_hover_img:
         return
 
     button_x, button_y = 390, 450
@@ -134,5 +128,3 @@ def draw_home(screen, game_state, switch_screen_callback):
                     game_state.show_message("Vui lòng nhập API hợp lệ!")
     else:
         screen.blit(button_img, button_rect)
-
-    pygame.display.flip()
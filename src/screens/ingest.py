@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Đọc tài liệu lớn theo dạng stream với bộ nhớ giới hạn.
+
+Thay vì ghép cả file thành một chuỗi rồi tiền xử lý (tạo thêm vài bản sao),
+mỗi định dạng có một generator trả về từng khối (đoạn văn / trang). Khối được
+làm sạch ngay rồi ghi tạm ra đĩa (spool), đồng thời tính hash nội dung và thống
+kê cần cho việc chia chunk. Sau đó chunker đọc lại spool và gán từng khối vào
+bài học, mỗi chunk chỉ giữ lại một phần đầu có giới hạn.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List
+
+_BLANK_RUN = re.compile(r'\n\s*\n')
+_SPACES = re.compile(r'[ \t]+')
+
+# Markdown: bỏ cú pháp cơ bản nhưng giữ text
+_MD_RULES = [
+    (re.compile(r'(^|\n)#{1,6}\s*'), r'\1'),          # Headers
+    (re.compile(r'\*\*(.*?)\*\*'), r'\1'),            # Bold
+    (re.compile(r'\*(.*?)\*'), r'\1'),                # Italic
+    (re.compile(r'`{1,3}([^`]+)`{1,3}'), r'\1'),      # Inline code
+]
+
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+# Một lượt regex cho cả hai bước gom khoảng trắng cũ. Chỉ khớp chỗ thật sự
+# cần đổi: dòng trống có thêm khoảng trắng (riêng "\n\n" giữ nguyên), tab,
+# từ 2 dấu cách trở lên. Nhờ vậy dấu cách đơn và "\n\n" không gọi callback.
+_WHITESPACE = re.compile(r'(\n\s+\n)|\t[ \t]*| [ \t]+')
+
+# Ký tự ASCII bị xóa: điều khiển C0 (trừ \n, \t) và DEL
+_ASCII_DELETE = dict.fromkeys([c for c in range(32) if c not in (9, 10)] + [127])
+
+
+def _char_class(codepoints) -> str:
+    """Lớp ký tự regex gọn (theo dải liên tiếp) từ danh sách mã đã sắp xếp"""
+    parts = []
+    start = prev = None
+    for cp in codepoints:
+        if prev is not None and cp == prev + 1:
+            prev = cp
+            continue
+        if start is not None:
+            parts.append((start, prev))
+        start = prev = cp
+    if start is not None:
+        parts.append((start, prev))
+    return '[' + ''.join(
+        re.escape(chr(a)) + ('-' + re.escape(chr(b)) if b > a else '') for a, b in parts
+    ) + ']'
+
+
+@lru_cache(maxsize=None)
+def _unprintable_tables():
+    """
+    (regex ký tự cần xóa, regex ký tự rác), dựng một lần từ str.isprintable().
+
+    Ký tự cần xóa: mọi ký tự không in được trừ \\n, \\t (như vòng lặp cũ).
+    Ký tự rác: không in được và cũng không phải khoảng trắng.
+    Chỉ liệt kê trong BMP để re biên dịch thành bảng tra trực tiếp (lớp ký tự
+    trải cả Unicode bị so tuần tự từng dải, rất chậm); ký tự ngoài BMP (emoji,
+    chữ hiếm) được bắt chung cả khối rồi mới kiểm tra từng ký tự.
+    """
+    unprintable = [cp for cp in range(0x10000)
+                   if cp not in (9, 10) and not chr(cp).isprintable()]
+    garbage = [cp for cp in unprintable if not chr(cp).isspace()]
+    astral = '\U00010000-\U0010FFFF]'
+    return (re.compile(_char_class(unprintable)[:-1] + astral + '+'),
+            re.compile(_char_class(garbage)[:-1] + astral))
+
+
+def _keep_printable(match) -> str:
+    return ''.join(ch for ch in match.group() if ch.isprintable())
+
+
+def _collapse_whitespace(match) -> str:
+    return '\n\n' if match.lastindex else ' '
+
+
+def clean_text(content: str) -> str:
+    """Gom khoảng trắng, bỏ ký tự điều khiển (giữ \\n, \\t)"""
+    # Gom khoảng trắng: giữ lại xuống dòng 2 dấu cách tối thiểu giữa đoạn
+    content = _WHITESPACE.sub(_collapse_whitespace, content)
+
+    # Loại bỏ ký tự không in được nhưng giữ \n, \t. Text ASCII đi qua bảng
+    # translate (nhánh nhanh của CPython); với text Unicode, tra dict từng ký tự
+    # của str.translate chậm hơn lớp ký tự đã biên dịch của re, nên dùng regex.
+    if content.isascii():
+        content = content.translate(_ASCII_DELETE)
+    else:
+        content = _unprintable_tables()[0].sub(_keep_printable, content)
+    return content.strip()
+
+
+def garbage_ratio(content: str, windows: int = 8, window_chars: int = 2048) -> float:
+    """
+    Tỉ lệ ký tự rác (không in được, không phải khoảng trắng), ước lượng trên
+    vài cửa sổ rải đều thay vì duyệt toàn bộ nội dung.
+    """
+    if not content:
+        return 1.0
+    if len(content) <= windows * window_chars:
+        sample = content
+    else:
+        step = (len(content) - window_chars) // (windows - 1)
+        sample = ''.join(content[i * step:i * step + window_chars] for i in range(windows))
+    bad = sum(1 for ch in _unprintable_tables()[1].findall(sample) if not ch.isprintable())
+    return bad / len(sample)
+
+
+def is_binary_garbage(content: str, max_ratio: float = 0.2) -> bool:
+    """Nội dung có vẻ là dữ liệu nhị phân (hơn 20% ký tự rác)"""
+    return garbage_ratio(content) > max_ratio
+
+
+# =========================
+# Benchmark
+# =========================
+
+def _clean_text_reference(content: str) -> str:
+    """Cách làm sạch cũ (2 lượt regex + vòng lặp từng ký tự), giữ để so sánh"""
+    content = _BLANK_RUN.sub('\n\n', content)
+    content = _SPACES.sub(' ', content)
+    cleaned_chars = []
+    for ch in content:
+        if ch == '\n' or ch == '\t' or ch.isprintable():
+            cleaned_chars.append(ch)
+    return ''.join(cleaned_chars).strip()
+
+
+def benchmark_clean_text(content: str, repeat: int = 3) -> Dict:
+    """
+    Đo thông lượng (MB/s, theo UTF-8) của clean_text so với cách cũ.
+
+    Returns:
+        dict gồm MB/s trước/sau, hệ số tăng tốc và kết quả có giống nhau không
+    """
+    megabytes = len(content.encode('utf-8')) / (1024 * 1024)
+    _unprintable_tables()  # không tính thời gian dựng bảng lần đầu
+
+    def best_of(fn):
+        best = float('inf')
+        result = None
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            result = fn(content)
+            best = min(best, time.perf_counter() - t0)
+        return result, best
+
+    old_result, old_seconds = best_of(_clean_text_reference)
+    new_result, new_seconds = best_of(clean_text)
+    return {
+        "megabytes": round(megabytes, 2),
+        "reference_mb_s": round(megabytes / old_seconds, 1) if old_seconds else None,
+        "clean_text_mb_s": round(megabytes / new_seconds, 1) if new_seconds else None,
+        "speedup": round(old_seconds / new_seconds, 1) if new_seconds else None,
+        "identical": old_result == new_result,
+    }
+
+
+def strip_markdown(text: str) -> str:
+    for pattern, repl in _MD_RULES:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def _split_paragraphs(text: str) -> Iterator[str]:
+    for part in _BLANK_RUN.split(text):
+        if part.strip():
+            yield part
+
+
+# =========================
+# Generator theo định dạng
+# =========================
+
+def iter_text_blocks(file_path: str, encoding: str, markdown: bool = False) -> Iterator[str]:
+    """Đọc từng dòng, trả về từng đoạn văn (ngăn bởi dòng trống)"""
+    lines = []
+    with open(file_path, 'r', encoding=encoding) as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+                continue
+            if lines:
+                block = ''.join(lines)
+                lines = []
+                yield strip_markdown(block) if markdown else block
+    if lines:
+        block = ''.join(lines)
+        yield strip_markdown(block) if markdown else block
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[str]:
+    """
+    Từng đoạn văn rồi từng dòng bảng của file DOCX.
+
+    python-docx vẫn parse toàn bộ XML của tài liệu, nhưng text không bị ghép
+    thành danh sách/chuỗi lớn nữa.
+    """
+    import docx
+    doc = docx.Document(file_path)
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if text:
+            yield text
+    for table in doc.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells]
+            row_text = " | ".join(c for c in cells if c)
+            if row_text:
+                yield row_text
+
+
+def iter_pdf_blocks(file_path: str, extractor) -> Iterator[str]:
+    """Trích xuất từng trang PDF (song song, đúng thứ tự), tách thành đoạn văn"""
+    for text in extractor.iter_pages(file_path):
+        yield from _split_paragraphs(text)
+
+
+# =========================
+# Spool
+# =========================
+
+class SpooledDocument:
+    """
+    Các khối đã làm sạch, ghi tạm ra đĩa (mỗi dòng một khối JSON).
+
+    Attributes:
+        total_chars : tổng độ dài nội dung (kể cả dấu ngăn đoạn)
+        units       : số khối
+        sample      : phần đầu nội dung, dùng để kiểm tra dữ liệu rác
+    """
+
+    SAMPLE_CHARS = 10000
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self._hash = hashlib.sha256()
+        self.total_chars = 0
+        self.units = 0
+        self.sample = ''
+
+    def append(self, block: str):
+        if self.units:
+            self._hash.update(PARAGRAPH_SEPARATOR.encode('utf-8'))
+            self.total_chars += len(PARAGRAPH_SEPARATOR)
+        self._hash.update(block.encode('utf-8'))
+        self.total_chars += len(block)
+        self.units += 1
+        if len(self.sample) < self.SAMPLE_CHARS:
+            self.sample = (self.sample + PARAGRAPH_SEPARATOR + block if self.sample else block)[:self.SAMPLE_CHARS]
+        self._file.write(json.dumps(block, ensure_ascii=False))
+        self._file.write('\n')
+
+    def content_digest(self) -> str:
+        """sha256 của nội dung đầy đủ (các khối nối bằng '\\n\\n')"""
+        return self._hash.hexdigest()
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def spool_blocks(blocks: Iterator[str]) -> SpooledDocument:
+    """Làm sạch và ghi từng khối ra spool (dữ liệu cũ bị bỏ nếu generator lỗi)"""
+    doc = SpooledDocument()
+    try:
+        for raw in blocks:
+            for paragraph in _split_paragraphs(raw):
+                block = clean_text(paragraph)
+                if block:
+                    doc.append(block)
+    except BaseException:
+        doc.close()
+        raise
+    return doc
+
+
+def spool_document(file_path: str, encodings: List[str], pdf_extractor=None) -> SpooledDocument:
+    """
+    Đọc file theo stream và ghi ra spool.
+
+    Args:
+        encodings     : thứ tự encoding thử cho .txt/.md (lỗi decode giữa chừng
+                        thì bỏ spool và thử encoding tiếp theo)
+        pdf_extractor : ParallelPdfExtractor dùng cho file .pdf
+    """
+    lower = file_path.lower()
+    if lower.endswith('.docx'):
+        return spool_blocks(iter_docx_blocks(file_path))
+    if lower.endswith('.pdf'):
+        if pdf_extractor is None:
+            from .pdf_extract import ParallelPdfExtractor
+            pdf_extractor = ParallelPdfExtractor()
+        return spool_blocks(iter_pdf_blocks(file_path, pdf_extractor))
+
+    markdown = lower.endswith('.md')
+    last_error = None
+    for encoding in encodings:
+        try:
+            doc = spool_blocks(iter_text_blocks(file_path, encoding, markdown=markdown))
+        except (UnicodeDecodeError, UnicodeError, LookupError) as e:
+            last_error = e
+            continue
+        if doc.units:
+            return doc
+        doc.close()
+    raise ValueError(f"Không đọc được file với các encoding thông dụng: {last_error}")
+
+
+def should_stream(file_path: str, min_bytes: int) -> bool:
+    """File đủ lớn để đi đường stream"""
+    try:
+        return os.path.getsize(file_path) >= min_bytes
+    except OSError:
+        return False
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Schema JSON của bài học/câu hỏi cho chế độ structured output của Gemini.
+
+Gửi kèm responseMimeType = application/json và responseSchema để model trả về
+đúng cấu trúc, thay vì phải "cứu" JSON bằng regex. Response vẫn được kiểm tra
+lại bằng validate() vì schema chỉ là ràng buộc mềm phía server.
+"""
+
+from typing import Dict, List, Optional
+
+QUESTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "question": {"type": "STRING"},
+        "choices": {"type": "ARRAY", "items": {"type": "STRING"}, "minItems": 4, "maxItems": 4},
+        "correct_answer": {"type": "INTEGER", "minimum": 0, "maximum": 3},
+        "difficulty": {"type": "STRING", "enum": ["easy", "medium", "hard"]},
+    },
+    "required": ["question", "choices", "correct_answer", "difficulty"],
+    "propertyOrdering": ["question", "choices", "correct_answer", "difficulty"],
+}
+
+LESSON_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "name": {"type": "STRING"},
+        "title": {"type": "STRING"},
+        "content": {"type": "STRING"},
+        "questions": {"type": "ARRAY", "items": QUESTION_SCHEMA},
+    },
+    "required": ["name", "title", "content", "questions"],
+    "propertyOrdering": ["name", "title", "content", "questions"],
+}
+
+# Prompt gộp: mỗi phần tử có thêm lesson_number để ghép lại đúng chunk
+LESSON_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": dict(LESSON_SCHEMA["properties"], lesson_number={"type": "INTEGER"}),
+        "required": ["lesson_number"] + LESSON_SCHEMA["required"],
+        "propertyOrdering": ["lesson_number"] + LESSON_SCHEMA["propertyOrdering"],
+    },
+}
+
+_PY_TYPES = {
+    "OBJECT": dict,
+    "ARRAY": list,
+    "STRING": str,
+    "INTEGER": int,
+    "NUMBER": (int, float),
+    "BOOLEAN": bool,
+}
+
+
+def build_generation_body(prompt: str, temperature: float = 0.7, max_output_tokens: int = 4096,
+                          response_schema: Optional[Dict] = None) -> Dict:
+    """Body request generateContent dùng chung cho client đồng bộ và async"""
+    generation_config = {
+        "temperature": temperature,
+        "maxOutputTokens": max_output_tokens,
+        "topP": 0.8,
+        "topK": 10,
+    }
+    if response_schema is not None:
+        generation_config["responseMimeType"] = "application/json"
+        generation_config["responseSchema"] = response_schema
+    return {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": generation_config,
+    }
+
+
+def validate(data, schema: Dict, path: str = "$") -> List[str]:
+    """
+    Kiểm tra data theo (tập con) schema kiểu OpenAPI mà Gemini dùng.
+
+    Returns:
+        danh sách lỗi, rỗng nếu hợp lệ
+    """
+    errors = []
+    expected = _PY_TYPES.get(str(schema.get("type", "")).upper())
+    # bool là lớp con của int nhưng không được coi là INTEGER
+    if expected and (not isinstance(data, expected) or (isinstance(data, bool) and expected is not bool)):
+        return [f"{path}: cần kiểu {schema['type']}"]
+
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: giá trị {data!r} không thuộc {schema['enum']}")
+    if "minimum" in schema and data < schema["minimum"]:
+        errors.append(f"{path}: nhỏ hơn {schema['minimum']}")
+    if "maximum" in schema and data > schema["maximum"]:
+        errors.append(f"{path}: lớn hơn {schema['maximum']}")
+
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: thiếu trường '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], sub_schema, f"{path}.{key}"))
+    elif isinstance(data, list):
+        if len(data) < schema.get("minItems", 0):
+            errors.append(f"{path}: cần ít nhất {schema['minItems']} phần tử")
+        if "maxItems" in schema and len(data) > schema["maxItems"]:
+            errors.append(f"{path}: tối đa {schema['maxItems']} phần tử")
+        if "items" in schema:
+            for i, item in enumerate(data):
+                errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
@@ -2,8 +2,8 @@ import pygame
 import json
 import os
 import config
+import ui_elements
 import time
-import hashlib
 
 pygame.init()
 pygame.font.init()
@@ -13,9 +13,9 @@ pygame.mixer.init()
 lesson_click_areas = []
 click_sound = None
 main_click_sound = None
-last_modified_time = 0
 list_lesson = []
 lessons_content_hash = None  # Hash của nội dung bài học
+_lessons_stale = True        # cần nạp lại list_lesson ở lần vẽ tới
 
 # Load âm thanh click
 click_sound_path = os.path.join(config.ASSETS_DIR, "sounds", "click.wav")
@@ -29,16 +29,6 @@ def set_click_sound(sound):
     main_click_sound = sound
 
 
-def calculate_lessons_hash(lessons_data):
-    """Tính hash của nội dung bài học để phát hiện thay đổi"""
-    try:
-        # Chuyển lessons data thành string và tính hash
-        lessons_str = json.dumps(lessons_data, sort_keys=True, ensure_ascii=False)
-        return hashlib.md5(lessons_str.encode('utf-8')).hexdigest()
-    except Exception as e:
-        return None
-
-
 def load_lessons_data():
     """Load lesson data từ JSON"""
     if not os.path.exists(config.LESSON_DATA_FILE_PATH):
@@ -50,51 +40,30 @@ def load_lessons_data():
         return []
 
 
+def on_lessons_changed(game_state, content_hash):
+    """
+    file_watcher báo lessons.json đổi nội dung: reset completed_lessons nếu hash
+    khác hash đã lưu và đánh dấu nạp lại danh sách bài ở lần vẽ tới.
+    """
+    global lessons_content_hash, _lessons_stale
+    if content_hash:
+        game_state.update_lessons_hash(content_hash)
+    lessons_content_hash = content_hash
+    _lessons_stale = True
+
+
 def check_for_updates(game_state):
-    """Kiểm tra file dữ liệu có thay đổi không và reset completed_lessons nếu cần"""
-    global last_modified_time, lessons_content_hash
-    
-    try:
-        current_time = os.path.getmtime(config.LESSON_DATA_FILE_PATH)
-        
-        # Nếu file đã được modify
-        if current_time > last_modified_time:
-            last_modified_time = current_time
-            
-            # Load lessons mới
-            new_lessons = load_lessons_data()
-            new_hash = calculate_lessons_hash(new_lessons)
-
-            if new_hash:
-                # Nếu hash khác hash đã lưu trong game_state
-                if game_state.lessons_hash and game_state.lessons_hash != new_hash:
-                    game_state.completed_lessons = []
-                    game_state.write_data()
-
-                # Cập nhật lại hash hiện tại
-                game_state.lessons_hash = new_hash
-                lessons_content_hash = new_hash
-                game_state.write_data()
-            
-            return True
-    except Exception as e:    
-        return False
+    """Có cần nạp lại dữ liệu bài học không (chỉ đổi khi có sự kiện file thay đổi)"""
+    global _lessons_stale
+    if _lessons_stale:
+        _lessons_stale = False
+        return True
+    return False
 
 
 def wrap_text(text, font, max_width):
     """Chia text thành nhiều dòng theo chiều rộng max_width"""
-    words = text.split()
-    lines, current_line = [], ""
-    for word in words:
-        test_line = current_line + word + " "
-        if font.size(test_line)[0] <= max_width:
-            current_line = test_line
-        else:
-            lines.append(current_line.strip())
-            current_line = word + " "
-    if current_line:
-        lines.append(current_line.strip())
-    return lines
+    return ui_elements.wrap_text(text, font, max_width)
 
 
 def draw_wrapped_text(surface, text, font, color, rect, line_height=5):
@@ -102,7 +71,7 @@ def draw_wrapped_text(surface, text, font, color, rect, line_height=5):
     lines = wrap_text(text, font, rect.width)
     y = rect.top
     for line in lines:
-        rendered = font.render(line, True, color)
+        rendered = ui_elements.render_text(line, font, color)
         surface.blit(rendered, (rect.left, y))
         y += font.get_height() + line_height
 
@@ -128,10 +97,9 @@ def draw_lesson(screen, font_path, font_title, font, colors, game_state, switch_
     lesson_click_areas = []  # reset mỗi lần vẽ
 
     # Fonts
-    font_path = os.path.join(config.ASSETS_DIR, "font", "svn.otf")
-    header_font = pygame.font.Font(font_path, 40)
-    name_font = pygame.font.Font(font_path, 28)
-    title_font = pygame.font.Font(font_path, 22)
+    header_font = config.get_font(config.SVN_FONT_PATH, 40)
+    name_font = config.get_font(config.SVN_FONT_PATH, 28)
+    title_font = config.get_font(config.SVN_FONT_PATH, 22)
 
     # Load dữ liệu mới nếu có cập nhật (sẽ tự động reset completed nếu nội dung thay đổi)
     if check_for_updates(game_state):
@@ -141,7 +109,7 @@ def draw_lesson(screen, font_path, font_title, font, colors, game_state, switch_
     # Nếu không có bài học
     if not lessons_data:
         # Tiêu đề chính
-        main_title = pygame.font.SysFont("arial", 60, bold=True).render("XIN CHÀO", True, colors["text"])
+        main_title = ui_elements.render_text("XIN CHÀO", config.get_sys_font("arial", 60, bold=True), colors["text"])
         screen.blit(main_title, main_title.get_rect(center=(260, 130)))
         # Giới thiệu ngắn
         intro_text = (
@@ -149,18 +117,18 @@ def draw_lesson(screen, font_path, font_title, font, colors, game_state, switch_
             "vừa trải nghiệm game. Thu thập gem, làm bài tập, và khám phá thế giới học tập thú vị."
         )
         for i, line in enumerate(wrap_text(intro_text, font, 350)):
-            surface = font.render(line, True, colors["text"])
+            surface = ui_elements.render_text(line, font, colors["text"])
             rect = surface.get_rect(center=(260, 200 + i * (surface.get_height() + 5)))
             screen.blit(surface, rect)
         no_data_msg = "Chưa có bài học nào. Hãy đưa cho tôi bài học của bạn ở 'Nạp File'."
         for i, line in enumerate(wrap_text(no_data_msg, font, 335)):
-            surface = font.render(line, True, colors["text"])
+            surface = ui_elements.render_text(line, font, colors["text"])
             rect = surface.get_rect(center=(700, 200 + i * (surface.get_height() + 5)))
             screen.blit(surface, rect)
         return
 
     # Vẽ tiêu đề "Bài học"
-    screen.blit(header_font.render("Bài học", True, colors["text"]), (200, 70))
+    screen.blit(ui_elements.render_text("Bài học", header_font, colors["text"]), (200, 70))
     pygame.draw.line(screen, colors["text"], (150, 130), (370, 130), 5)
 
     # Layout
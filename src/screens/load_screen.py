@@ -6,6 +6,9 @@ import threading
 import math
 import config
 import ui_elements
+from assets import assets
+from framerate import governor
+from file_watcher import file_watcher
 from .content_processor import ContentProcessor
 
 SCREEN = pygame.display.set_mode((config.WIDTH, config.HEIGHT))
@@ -16,25 +19,16 @@ def choose_file():
     file_path = filedialog.askopenfilename()
     return file_path
 def render_multiline(text, font, color, x, y, max_width, surface):
-    words = text.split(" ")
-    lines = []
-    current_line = ""
-    for word in words:
-        test_line = current_line + word + " "
-        if font.size(test_line)[0] <= max_width:
-            current_line = test_line
-        else:
-            lines.append(current_line)
-            current_line = word + " "
-    lines.append(current_line)
-
+    lines = ui_elements.wrap_text(text, font, max_width)
     for i, line in enumerate(lines):
-        txt_surface = font.render(line, True, color)
+        txt_surface = ui_elements.render_text(line, font, color)
         surface.blit(txt_surface, (x, y + i * (font.get_height() + 4)))
 
 def simulate_cmd_questions(filepath, update_status_callback):
     try:
         processor = ContentProcessor()
+        # Báo từng bài học ngay khi sinh xong thay vì chờ cả file
+        processor.progress_callback = update_status_callback
         
         if not processor.is_supported(filepath):
             update_status_callback("Định dạng file không được hỗ trợ\n" +
@@ -59,10 +53,9 @@ def simulate_cmd_questions(filepath, update_status_callback):
 
 def run(screen, switch_screen, click_sound=None):
     running = True
-    clock = pygame.time.Clock()
     
-    title_font = pygame.font.Font(config.FONT_PATH, 42)
-    status_font = pygame.font.Font(config.FONT_PATH, 25)
+    title_font = config.get_font(config.FONT_PATH, 42)
+    status_font = config.get_font(config.FONT_PATH, 25)
     
     angle = 0
     time_elapsed = 0
@@ -96,31 +89,24 @@ def run(screen, switch_screen, click_sound=None):
     upload_rect = pygame.Rect(115, config.HEIGHT // 2 - 100, 300, 200)
 
     # Load 2 ảnh (normal + hover)
-    normal_path = os.path.join(config.ASSETS_DIR, "setting", "load_icon.png")
-    hover_path = os.path.join(config.ASSETS_DIR, "setting", "load_icon_hover.png")
-
-    upload_img = pygame.image.load(normal_path).convert_alpha()
-    upload_img = pygame.transform.smoothscale(upload_img, (upload_rect.w, upload_rect.h))
-
-    upload_img_hover = pygame.image.load(hover_path).convert_alpha()
-    upload_img_hover = pygame.transform.smoothscale(upload_img_hover, (upload_rect.w, upload_rect.h))
+    upload_img = assets.get_setting("load_icon.png", upload_rect.size, smooth=True)
+    upload_img_hover = assets.get_setting("load_icon_hover.png", upload_rect.size, smooth=True)
 
     # Rect ảnh
     upload_img_rect = upload_img.get_rect(center=upload_rect.center)
 
     while running:
         # Background
-        background = os.path.join(config.ASSETS_DIR, "setting", "background.png")
-        back_bg = pygame.image.load(background).convert()
-        back_bg = pygame.transform.scale(back_bg, (960, 640))  
-        SCREEN.blit(back_bg, (0, 0))
+        back_bg = assets.get_setting("background.png", (960, 640), alpha=False)
+        if back_bg:
+            SCREEN.blit(back_bg, (0, 0))
         
         time_elapsed += 1
         angle = (angle + 2) % 360
 
         # Tiêu đề
-        title_text = title_font.render("TẢI LÊN TÀI LIỆU", True, config.COLORS["panel"])
-        shadow_text = title_font.render("TẢI LÊN TÀI LIỆU", True, (120, 160, 120))
+        title_text = ui_elements.render_text("TẢI LÊN TÀI LIỆU", title_font, config.COLORS["panel"])
+        shadow_text = ui_elements.render_text("TẢI LÊN TÀI LIỆU", title_font, (120, 160, 120))
         screen.blit(shadow_text, (104, 102))
         screen.blit(title_text, (100, 100))
         
@@ -153,11 +139,12 @@ def run(screen, switch_screen, click_sound=None):
             color = (0, 150, 0) if "True" in status_message else (200, 0, 0)
             lines = status_message.split('\n')
             for i, line in enumerate(lines):
-                status_line = status_font.render(line, True, color)
+                status_line = ui_elements.render_text(line, status_font, color)
                 screen.blit(status_line, (config.WIDTH // 2 - status_line.get_width() // 2, 400 + i * 25))
         
         # Hiệu ứng loading
         if processing:
+            governor.request_full_rate()
             pygame.draw.arc(screen, config.COLORS["hover"], 
                           (config.WIDTH // 2 - 20, 450, 40, 40), 
                           math.radians(angle), math.radians(angle + 270), 3)
@@ -165,6 +152,10 @@ def run(screen, switch_screen, click_sound=None):
         back_button.draw(screen)
 
         for event in pygame.event.get():
+            governor.notify_event(event)
+            # Bài học mới được ghi trong lúc ở màn hình này: chuyển tới các subscriber
+            if file_watcher.dispatch(event):
+                continue
             if event.type == pygame.QUIT:
                 return "quit"
             
@@ -187,4 +178,4 @@ def run(screen, switch_screen, click_sound=None):
                         ))
 
         pygame.display.flip()
-        clock.tick(60)
+        governor.tick()
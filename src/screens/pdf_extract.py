@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Trích xuất text PDF song song theo trang bằng process pool.
+
+page.extract_text() tốn CPU và chạy tuần tự trên một luồng là phần chậm nhất
+trước khi gọi AI. Ở đây các dải trang được chia cho nhiều process, mỗi process
+tự mở PdfReader riêng; kết quả được ghép lại đúng thứ tự trang, kèm thời gian
+và lỗi của từng trang.
+
+- Bản đóng gói (PyInstaller): "spawn", main.py gọi multiprocessing.freeze_support().
+- Chạy mã nguồn trên Linux: "fork", nhưng chỉ khi process còn đúng một luồng.
+  Fork một process nhiều luồng (scheduler, file watcher, luồng ghi, SDL...) có
+  thể làm process con kẹt ở lock được thừa hưởng, nên khi đó chạy tuần tự.
+  Không dùng "spawn"/"forkserver" vì process con sẽ import lại main.py, mà
+  main.py chạy game ngay khi import.
+- Các trường hợp khác (vd. chạy mã nguồn trên Windows) hoặc PDF ít trang: chạy tuần tự.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class ExtractionCancelled(Exception):
+    """Người dùng dừng xử lý giữa chừng"""
+    pass
+
+
+def _extract_range(file_path: str, start: int, end: int) -> List[Tuple[int, str, float, Optional[str]]]:
+    """Worker: trích xuất các trang [start, end), trả về (trang, text, giây, lỗi)"""
+    import PyPDF2
+    results = []
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for index in range(start, end):
+            t0 = time.perf_counter()
+            try:
+                text = reader.pages[index].extract_text() or ""
+                error = None
+            except Exception as e:
+                text, error = "", str(e)
+            results.append((index, text, time.perf_counter() - t0, error))
+    return results
+
+
+def _mp_context():
+    """Context multiprocessing dùng được, hoặc None nếu phải chạy tuần tự"""
+    if getattr(sys, 'frozen', False):
+        return multiprocessing.get_context('spawn')
+    if sys.platform.startswith('linux') and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def count_pages(file_path: str) -> int:
+    import PyPDF2
+    with open(file_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+class ParallelPdfExtractor:
+    """
+    Args:
+        max_workers        : số process tối đa (còn bị giới hạn bởi số CPU)
+        pages_per_task     : số trang mỗi task gửi cho worker
+        min_pages_parallel : PDF ít trang hơn thì chạy tuần tự (khởi động pool không đáng)
+    """
+
+    def __init__(self, max_workers: int = 4, pages_per_task: int = 8, min_pages_parallel: int = 16):
+        self.max_workers = max(1, min(max_workers, os.cpu_count() or 1))
+        self.pages_per_task = max(1, pages_per_task)
+        self.min_pages_parallel = min_pages_parallel
+        self._cancel = threading.Event()
+        self.last_stats: Dict = {}
+
+    def reset(self):
+        """Xoá cờ dừng; gọi khi bắt đầu xử lý một file mới"""
+        self._cancel.clear()
+
+    def cancel(self):
+        """Dừng lần trích xuất đang chạy (gọi được từ thread khác)"""
+        self._cancel.set()
+
+    def _check_cancel(self):
+        if self._cancel.is_set():
+            raise ExtractionCancelled("Đã dừng trích xuất PDF")
+
+    def iter_pages(self, file_path: str) -> Iterator[str]:
+        """
+        Text từng trang theo đúng thứ tự, trả về ngay khi các trang trước đã xong.
+
+        Trang lỗi được bỏ qua (ghi vào last_stats["errors"]).
+        """
+        started = time.perf_counter()
+        total = count_pages(file_path)
+        timings: List[float] = [0.0] * total
+        errors: Dict[int, str] = {}
+        self.last_stats = {"pages": total, "workers": 1, "mode": "serial"}
+
+        context = _mp_context()
+        ranges = [(s, min(s + self.pages_per_task, total)) for s in range(0, total, self.pages_per_task)]
+        use_pool = context is not None and self.max_workers > 1 and total >= self.min_pages_parallel
+
+        def _finish():
+            self.last_stats.update({
+                "elapsed": round(time.perf_counter() - started, 3),
+                "page_seconds": round(sum(timings), 3),
+                "slowest_pages": sorted(range(total), key=lambda i: timings[i], reverse=True)[:5],
+                "errors": errors,
+            })
+
+        if use_pool:
+            workers = min(self.max_workers, len(ranges))
+            try:
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            except (OSError, ValueError, NotImplementedError) as e:
+                print(f"⚠️ Không tạo được process pool ({e}), trích xuất PDF tuần tự")
+                use_pool = False
+
+        if not use_pool:
+            for start, end in ranges:
+                self._check_cancel()
+                for index, text, seconds, error in _extract_range(file_path, start, end):
+                    timings[index] = seconds
+                    if error:
+                        errors[index] = error
+                    elif text.strip():
+                        yield text
+            _finish()
+            return
+
+        self.last_stats.update({"workers": workers, "mode": "process"})
+        pending_results: Dict[int, List] = {}
+        next_range = 0
+        try:
+            futures = {executor.submit(_extract_range, file_path, s, e): i for i, (s, e) in enumerate(ranges)}
+            waiting = set(futures)
+            while waiting:
+                # Chờ ngắn để còn kiểm tra cờ dừng
+                done, waiting = wait(waiting, timeout=0.2, return_when=FIRST_COMPLETED)
+                self._check_cancel()
+                for future in done:
+                    pending_results[futures[future]] = future.result()
+                # Trả về các dải đã liền mạch từ đầu
+                while next_range in pending_results:
+                    for index, text, seconds, error in pending_results.pop(next_range):
+                        timings[index] = seconds
+                        if error:
+                            errors[index] = error
+                        elif text.strip():
+                            yield text
+                    next_range += 1
+        except BrokenProcessPool as e:
+            # Worker chết bất thường: làm nốt phần còn lại tuần tự
+            print(f"⚠️ Process pool lỗi ({e}), trích xuất tiếp tuần tự")
+            self.last_stats["mode"] = "process+serial"
+            for start, end in ranges[next_range:]:
+                self._check_cancel()
+                for index, text, seconds, error in _extract_range(file_path, start, end):
+                    timings[index] = seconds
+                    if error:
+                        errors[index] = error
+                    elif text.strip():
+                        yield text
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        _finish()
+
+    def extract(self, file_path: str) -> str:
+        """Toàn bộ text PDF, các trang nối bằng xuống dòng (như cách đọc cũ)"""
+        return "\n".join(self.iter_pages(file_path))
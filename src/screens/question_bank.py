@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Ngân hàng câu hỏi lập chỉ mục theo độ khó, bài học và hash nội dung.
+
+Quiz tổng hợp được lấy mẫu phân tầng trực tiếp từ câu hỏi đã validate của
+các bài học: mỗi độ khó lấy lần lượt xoay vòng qua các bài để quiz phủ đều nội
+dung. Câu hỏi trùng bị loại ngay khi thêm vào ngân hàng nên khi lấy mẫu không
+cần vòng lặp thử lại.
+"""
+
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Khi một độ khó thiếu câu, mượn từ độ khó gần nhất trước
+_NEIGHBOURS = {
+    "easy": ("medium", "hard"),
+    "medium": ("easy", "hard"),
+    "hard": ("medium", "easy"),
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def question_hash(question: str, choices: Iterable[str]) -> str:
+    """Hash của câu hỏi đã chuẩn hóa (chữ thường, gom khoảng trắng) kèm đáp án"""
+    normalized_question = _WHITESPACE.sub(' ', question.strip().lower())
+    normalized_choices = [_WHITESPACE.sub(' ', choice.strip().lower()) for choice in choices]
+    combined = normalized_question + '|' + '|'.join(normalized_choices)
+    return hashlib.md5(combined.encode('utf-8')).hexdigest()
+
+
+class QuestionBank:
+    """
+    Tập câu hỏi không trùng lặp.
+
+    - _questions : hash -> câu hỏi
+    - _index     : độ khó -> số bài -> [hash] theo thứ tự thêm vào
+    """
+
+    def __init__(self):
+        self._questions: Dict[str, Dict] = {}
+        self._index: Dict[str, Dict[int, List[str]]] = {d: {} for d in DIFFICULTIES}
+
+    @classmethod
+    def from_lessons(cls, lessons: List[Dict]) -> "QuestionBank":
+        bank = cls()
+        for lesson_number, lesson in enumerate(lessons, start=1):
+            for question in lesson.get("questions", []):
+                bank.add(question, lesson_number)
+        return bank
+
+    def add(self, question: Dict, lesson_number: int) -> bool:
+        """Thêm câu hỏi; trả về False nếu không hợp lệ hoặc đã có câu giống hệt"""
+        text = question.get("question")
+        choices = question.get("choices")
+        if not isinstance(text, str) or not isinstance(choices, list) or len(choices) != 4:
+            return False
+        key = question_hash(text, choices)
+        if key in self._questions:
+            return False
+
+        difficulty = question.get("difficulty")
+        if difficulty not in DIFFICULTIES:
+            difficulty = "medium"
+        self._questions[key] = question
+        self._index[difficulty].setdefault(lesson_number, []).append(key)
+        return True
+
+    def __len__(self):
+        return len(self._questions)
+
+    def count(self, difficulty: Optional[str] = None) -> int:
+        if difficulty is None:
+            return len(self._questions)
+        return sum(len(keys) for keys in self._index[difficulty].values())
+
+    def _round_robin(self, difficulty: str, rng: random.Random, taken: Set[str]) -> List[str]:
+        """Thứ tự lấy mẫu của một độ khó: xoay vòng qua các bài, trong mỗi bài xáo trộn"""
+        per_lesson = []
+        for lesson_number in sorted(self._index[difficulty]):
+            keys = [k for k in self._index[difficulty][lesson_number] if k not in taken]
+            rng.shuffle(keys)
+            if keys:
+                per_lesson.append(keys)
+        # Bắt đầu từ một bài ngẫu nhiên để các quiz khác nhau không luôn ưu tiên bài 1
+        if per_lesson:
+            start = rng.randrange(len(per_lesson))
+            per_lesson = per_lesson[start:] + per_lesson[:start]
+
+        order = []
+        depth = 0
+        while per_lesson:
+            per_lesson = [keys for keys in per_lesson if len(keys) > depth]
+            order.extend(keys[depth] for keys in per_lesson)
+            depth += 1
+        return order
+
+    def sample(self, counts: Dict[str, int], rng: Optional[random.Random] = None,
+               exclude: Optional[Set[str]] = None) -> Dict[str, List[Dict]]:
+        """
+        Lấy mẫu phân tầng không lặp lại.
+
+        Args:
+            counts  : số câu cần cho mỗi độ khó
+            rng     : bộ sinh số ngẫu nhiên (truyền vào để tái lập được kết quả)
+            exclude : hash câu hỏi không được chọn
+
+        Returns:
+            {độ khó: [câu hỏi]} - có thể ít hơn counts nếu ngân hàng không đủ câu
+        """
+        rng = rng or random.Random()
+        taken = set(exclude or ())
+        result = {d: [] for d in DIFFICULTIES}
+
+        def _take(difficulty, source, need):
+            for key in self._round_robin(source, rng, taken)[:need]:
+                taken.add(key)
+                result[difficulty].append(self._questions[key])
+
+        # Lượt 1: đúng độ khó
+        for difficulty in DIFFICULTIES:
+            _take(difficulty, difficulty, counts.get(difficulty, 0))
+        # Lượt 2: độ khó còn thiếu mượn từ độ khó lân cận còn dư
+        for difficulty in DIFFICULTIES:
+            for source in _NEIGHBOURS[difficulty]:
+                need = counts.get(difficulty, 0) - len(result[difficulty])
+                if need <= 0:
+                    break
+                _take(difficulty, source, need)
+        return result
+
+    def get_stats(self) -> Dict:
+        return {
+            "total": len(self._questions),
+            "by_difficulty": {d: self.count(d) for d in DIFFICULTIES},
+            "lessons": len({n for d in DIFFICULTIES for n in self._index[d]}),
+        }
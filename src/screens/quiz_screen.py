@@ -1,10 +1,7 @@
 import pygame
 import config
 import ui_elements
-import time
-import os
-import json
-import importlib
+from quiz_repository import quiz_repository
 
 correct_sound = None
 wrong_sound = None
@@ -17,55 +14,13 @@ def set_sounds(correct, wrong):
     wrong_sound = wrong
 
 
-# --- Fallback wrap_text: dùng khi ui_elements không có wrap_text ---
+# --- wrap_text dùng chung (textlayout, có cache) ---
 def _wrap_text(text: str, font: pygame.font.Font, max_width: int):
     """
     Trả về danh sách các dòng đã được wrap để vừa max_width.
     Xử lý newline trong text, và tách từ nếu một từ dài hơn max_width.
     """
-    if text is None:
-        return [""]
-    lines = []
-    paragraphs = text.split("\n")
-    for para in paragraphs:
-        words = para.split(" ")
-        if not words:
-            lines.append("")
-            continue
-        cur_line = ""
-        for w in words:
-            test = (cur_line + " " + w) if cur_line else w
-            if font.size(test)[0] <= max_width:
-                cur_line = test
-            else:
-                if cur_line:
-                    lines.append(cur_line)
-                # nếu từ w vẫn quá dài, tách theo ký tự
-                if font.size(w)[0] > max_width:
-                    part = ""
-                    for ch in w:
-                        if font.size(part + ch)[0] <= max_width:
-                            part += ch
-                        else:
-                            if part:
-                                lines.append(part)
-                            part = ch
-                    if part:
-                        cur_line = part
-                    else:
-                        cur_line = ""
-                else:
-                    cur_line = w
-        if cur_line:
-            lines.append(cur_line)
-    return lines or [""]
-
-
-def _get_wrap_func():
-    """Trả về hàm wrap từ ui_elements nếu có, còn không trả về fallback."""
-    if hasattr(ui_elements, "wrap_text") and callable(getattr(ui_elements, "wrap_text")):
-        return ui_elements.wrap_text
-    return _wrap_text
+    return ui_elements.wrap_text(text, font, max_width) or ("",)
 
 
 def _ensure_quiz_state(game_state):
@@ -93,23 +48,6 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
     để hệ thống UI chính có thể kiểm tra click.
     """
     _ensure_quiz_state(game_state)
-    wrap_func = _get_wrap_func()
-
-    # Try-safe lấy mtime (tránh crash khi file không tồn tại)
-    try:
-        file_mtime = os.path.getmtime(config.QUIZ_DATA_FILE_PATH)
-    except Exception:
-        file_mtime = None
-
-    try:
-        if file_mtime is not None:
-            if (not hasattr(game_state, 'last_quiz_update') or
-                    game_state.last_quiz_update < file_mtime):
-                reload_quiz_data(game_state)
-                game_state.last_quiz_update = time.time()
-    except Exception:
-        # không để crash UI nếu việc check/migration gặp lỗi
-        pass
 
     current_bai = game_state.quiz_state.get("bai")
 
@@ -148,7 +86,7 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
     # --- Vẽ tiêu đề "Câu thứ n" phía trên câu hỏi ---
     try:
         title_text = f"Câu {current_index + 1}"
-        title_surf = font_title.render(title_text, True, colors.get("completed", (0, 0, 0)))
+        title_surf = ui_elements.render_text(title_text, font_title, colors.get("completed", (0, 0, 0)))
         screen.blit(title_surf, (left_x, top_y - title_surf.get_height() - 20))
     except Exception:
         pass
@@ -167,7 +105,7 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
     except Exception:
         try:
             txt = q.get("question", "")[:200]
-            t_surf = font.render(txt, True, colors.get("text", (0, 0, 0)))
+            t_surf = ui_elements.render_text(txt, font, colors.get("text", (0, 0, 0)))
             screen.blit(t_surf, (left_x, top_y))
         except Exception:
             pass
@@ -181,7 +119,7 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
 
     choices = q.get("choices", [])
     # Precompute wrapped lines & heights
-    wrappeds = [wrap_func(choice, font, content_width - 20) for choice in choices]
+    wrappeds = [_wrap_text(choice, font, content_width - 20) for choice in choices]
 
     # Tính tổng chiều cao cần thiết; nếu vượt quá vùng có thể, giảm khoảng cách
     total_req_height = 0
@@ -245,9 +183,9 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
         line_y = y + 5
         for line in wrapped:
             try:
-                text_surface = font.render(line, True, colors.get("text", (0, 0, 0)))
+                text_surface = ui_elements.render_text(line, font, colors.get("text", (0, 0, 0)))
             except Exception:
-                text_surface = font.render(line, True, (0, 0, 0))
+                text_surface = ui_elements.render_text(line, font, (0, 0, 0))
             screen.blit(
                 text_surface,
                 (right_x + (content_width - text_surface.get_width()) // 2, line_y)
@@ -273,7 +211,7 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
             )
         except Exception:
             try:
-                t = font.render(feedback, True, feedback_color)
+                t = ui_elements.render_text(feedback, font, feedback_color)
                 screen.blit(t, (right_x + (content_width - t.get_width()) // 2, y + 10))
             except Exception:
                 pass
@@ -314,7 +252,7 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
     # --- Vẽ tiến trình "Câu i/n" ở góc dưới bên trái ---
     try:
         prog_text = f"Câu {current_index + 1}/{total_q}"
-        prog_surf = font_small.render(prog_text, True, colors.get("text", (0, 0, 0)))
+        prog_surf = ui_elements.render_text(prog_text, font_small, colors.get("text", (0, 0, 0)))
         screen.blit(prog_surf, (10, config.HEIGHT - prog_surf.get_height() - 10))
     except Exception:
         pass
@@ -323,49 +261,22 @@ def draw_quiz_screen(screen, font_title, font, font_small, colors, game_state,
 
 
 def reload_quiz_data(game_state):
-    """Reload dữ liệu quiz khi file thay đổi (an toàn với lỗi file)."""
-    try:
-        if not hasattr(game_state, 'last_quiz_update'):
-            game_state.last_quiz_update = 0
-
-        current_time = time.time()
-        try:
-            file_mtime = os.path.getmtime(config.QUIZ_DATA_FILE_PATH)
-        except OSError:
-            return
+    """Làm mới dữ liệu quiz khi file thay đổi (gọi khi file_watcher báo)."""
+    # Kho chỉ đánh dấu cần đọc lại; file hỏng thì giữ dữ liệu cũ
+    quiz_repository.invalidate()
+
+    # Nếu đang mở cùng một bài, reset trạng thái câu hỏi
+    if (hasattr(game_state, 'quiz_state') and
+            game_state.quiz_state.get("bai") == getattr(game_state, "current_lesson_id", None)):
+        game_state.quiz_state.update({
+            "index": 0,
+            "answered": False,
+            "selected": None,
+            "feedback": ""
+        })
 
-        if file_mtime > game_state.last_quiz_update + 1:
-            try:
-                # kiểm tra JSON hợp lệ trước khi reload module
-                with open(config.QUIZ_DATA_FILE_PATH, 'r', encoding='utf-8') as f:
-                    _ = json.load(f)
-
-                # reload module quiz_data (nếu bạn đang dùng quiz_data.py)
-                try:
-                    import quiz_data as quiz_data_module
-                    importlib.reload(quiz_data_module)
-                except Exception:
-                    # nếu không có module, bỏ qua
-                    pass
-
-                # Nếu đang mở cùng một bài, reset trạng thái câu hỏi
-                if (hasattr(game_state, 'quiz_state') and
-                        game_state.quiz_state.get("bai") == getattr(game_state, "current_lesson_id", None)):
-                    game_state.quiz_state.update({
-                        "index": 0,
-                        "answered": False,
-                        "selected": None,
-                        "feedback": ""
-                    })
-
-                game_state.last_quiz_update = current_time
-                # force redraw
-                pygame.event.post(pygame.event.Event(pygame.USEREVENT, {'force_redraw': True}))
-
-            except (json.JSONDecodeError, ImportError, AttributeError) as e:
-                print(f"[quiz_screen] Reload failed: {str(e)}")
-    except Exception as e:
-        print(f"[quiz_screen] Unexpected error in reload: {str(e)}")
+    # force redraw
+    pygame.event.post(pygame.event.Event(config.EVENT_FORCE_REDRAW, {'force_redraw': True}))
 
 
 def check_answer_mcq(game_state, bai, idx, selected):
@@ -373,15 +284,11 @@ def check_answer_mcq(game_state, bai, idx, selected):
     if game_state.quiz_state.get("answered"):
         return
 
-    try:
-        from quiz_data import quiz_data as all_quiz_data
-    except Exception:
-        all_quiz_data = {}
-
-    if bai not in all_quiz_data or idx >= len(all_quiz_data.get(bai, [])):
+    questions = quiz_repository.get_lesson_questions(bai)
+    if idx >= len(questions):
         return
 
-    q = all_quiz_data[bai][idx]
+    q = questions[idx]
 
     game_state.quiz_state.update({
         "selected": selected,
@@ -391,7 +298,7 @@ def check_answer_mcq(game_state, bai, idx, selected):
 
     if q.get("answer") == selected:
         try:
-            game_state.point += 10
+            game_state.add_points(10)
         except Exception:
             pass
         if correct_sound:
@@ -406,17 +313,17 @@ def check_answer_mcq(game_state, bai, idx, selected):
             except Exception:
                 pass
 
-    pygame.event.post(pygame.event.Event(pygame.USEREVENT, {'force_redraw': True}))
+    pygame.event.post(pygame.event.Event(config.EVENT_FORCE_REDRAW, {'force_redraw': True}))
 
 
 def finish_quiz_session(game_state, bonus_points=50):
     """Kết thúc buổi quiz: cộng điểm thưởng, quay về màn lesson."""
     try:
-        game_state.point += bonus_points
+        game_state.add_points(bonus_points)
     except Exception:
         pass
     try:
-        game_state.completed_lessons.append(game_state.quiz_state.get("bai"))
+        game_state.complete_lesson(game_state.quiz_state.get("bai"))
     except Exception:
         pass
     game_state.quiz_state = {
@@ -435,16 +342,11 @@ def finish_quiz_session(game_state, bonus_points=50):
 
 def next_quiz_question(game_state):
     """Chuyển sang câu tiếp theo."""
-    try:
-        from quiz_data import quiz_data as all_quiz_data
-    except Exception:
-        all_quiz_data = {}
-
-    current_bai = game_state.quiz_state.get("bai")
-    if current_bai not in all_quiz_data:
+    questions = quiz_repository.get_lesson_questions(game_state.quiz_state.get("bai"))
+    if not questions:
         return
 
-    if game_state.quiz_state.get("index", 0) < len(all_quiz_data[current_bai]) - 1:
+    if game_state.quiz_state.get("index", 0) < len(questions) - 1:
         game_state.quiz_state["index"] += 1
         game_state.quiz_state["answered"] = False
         game_state.quiz_state["selected"] = None
@@ -454,4 +356,4 @@ def next_quiz_question(game_state):
         except Exception:
             pass
 
-    pygame.event.post(pygame.event.Event(pygame.USEREVENT, {'force_redraw': True}))
+    pygame.event.post(pygame.event.Event(config.EVENT_FORCE_REDRAW, {'force_redraw': True}))
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Giới hạn tốc độ gọi Gemini API, dùng chung cho mọi ContentProcessor trong process.
+
+- Token bucket theo phút cho cả số request lẫn số token.
+- Khi server trả 429/503 kèm Retry-After (hoặc retryDelay trong body), toàn bộ
+  limiter bị chặn tới hết thời gian đó, để các worker không cùng thử lại và
+  lại vượt hạn mức.
+- Backoff lũy thừa có jitter ngẫu nhiên (full jitter).
+- Phân loại lỗi: 4xx (trừ 408/429) không thử lại.
+"""
+
+import asyncio
+import email.utils
+import json
+import random
+import re
+import threading
+import time
+
+import config
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+AUTH_STATUSES = {401, 403}
+
+_RETRY_DELAY_RE = re.compile(r'^\s*([\d.]+)s\s*$')
+
+
+def parse_retry_after(headers=None, body=None):
+    """
+    Thời gian (giây) server yêu cầu chờ, hoặc None.
+
+    Đọc header Retry-After (số giây hoặc HTTP-date), rồi tới retryDelay
+    ("12s") trong RetryInfo của body lỗi Google API.
+    """
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    value = headers.get("retry-after")
+    if value:
+        value = value.strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, when.timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    if body:
+        try:
+            data = json.loads(body) if isinstance(body, str) else body
+            for detail in data.get("error", {}).get("details", []):
+                match = _RETRY_DELAY_RE.match(str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+        except (ValueError, AttributeError, TypeError):
+            pass
+    return None
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Full jitter: ngẫu nhiên trong [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def estimate_tokens(text, expected_output=1500):
+    """Ước lượng token cho một request (~4 ký tự/token + phần trả về dự kiến)"""
+    return len(text) // 4 + expected_output
+
+
+class GeminiAPIError(Exception):
+    """
+    Lỗi trả về từ Gemini API.
+
+    Attributes:
+        status      : mã HTTP (None nếu là lỗi mạng/timeout)
+        retry_after : số giây server yêu cầu chờ, hoặc None
+        retryable   : có nên thử lại không
+    """
+
+    def __init__(self, status, message, retry_after=None, retryable=None):
+        prefix = f"Gemini API error {status}" if status is not None else "Gemini API error"
+        super().__init__(f"{prefix}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = (status is None or status in RETRYABLE_STATUSES) if retryable is None else retryable
+
+    @property
+    def is_auth_error(self):
+        return self.status in AUTH_STATUSES
+
+    @classmethod
+    def from_response(cls, status, headers, body_text):
+        return cls(status, body_text[:500], retry_after=parse_retry_after(headers, body_text))
+
+
+class RateLimiter:
+    """
+    Token bucket cho request/phút và token/phút, an toàn giữa các thread.
+
+    Args:
+        requests_per_minute : số request tối đa mỗi phút
+        tokens_per_minute   : số token (ước lượng) tối đa mỗi phút
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.rpm = float(requests_per_minute)
+        self.tpm = float(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._request_level = self.rpm
+        self._token_level = self.tpm
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.penalties = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_level = min(self.rpm, self._request_level + elapsed * self.rpm / 60.0)
+        self._token_level = min(self.tpm, self._token_level + elapsed * self.tpm / 60.0)
+
+    def reserve(self, tokens=0):
+        """
+        Giữ chỗ cho một request, trả về số giây phải chờ trước khi gửi.
+
+        Chỗ được trừ ngay (mức có thể âm) nên các lời gọi song song tự xếp hàng.
+        """
+        tokens = min(tokens, self.tpm)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._request_level -= 1
+            self._token_level -= tokens
+            wait = max(
+                self._blocked_until - now,
+                -self._request_level * 60.0 / self.rpm if self._request_level < 0 else 0.0,
+                -self._token_level * 60.0 / self.tpm if self._token_level < 0 else 0.0,
+                0.0,
+            )
+            if wait > 0:
+                self.waits += 1
+                self.total_wait += wait
+            return wait
+
+    def acquire(self, tokens=0):
+        """Chờ (blocking) tới khi được phép gửi request"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """Bản async của acquire()"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, delay):
+        """Chặn mọi request trong delay giây (sau 429/503 có Retry-After)"""
+        with self._lock:
+            until = time.monotonic() + max(0.0, delay)
+            if until > self._blocked_until:
+                self._blocked_until = until
+                self.penalties += 1
+
+    def update_from_headers(self, headers):
+        """Áp dụng header hạn mức dạng x-ratelimit-* nếu server gửi về"""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        reset = headers.get("x-ratelimit-reset-requests")
+        try:
+            if remaining is not None and int(float(remaining)) <= 0 and reset:
+                self.penalize(float(reset.rstrip("s")))
+        except ValueError:
+            pass
+
+    def get_stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "requests_per_minute": self.rpm,
+                "tokens_per_minute": self.tpm,
+                "request_level": round(self._request_level, 2),
+                "token_level": round(self._token_level),
+                "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 2),
+                "waits": self.waits,
+                "total_wait": round(self.total_wait, 2),
+                "penalties": self.penalties,
+            }
+
+
+# Dùng chung cho mọi ContentProcessor trong process
+gemini_limiter = RateLimiter(config.GEMINI_REQUESTS_PER_MINUTE, config.GEMINI_TOKENS_PER_MINUTE)
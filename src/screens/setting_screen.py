@@ -8,6 +8,7 @@ import time
 import math
 from typing import List, Dict, Tuple, Optional, Callable
 import ui_elements
+from assets import assets
 import threading
 import webbrowser
 import tempfile
@@ -594,15 +595,12 @@ GEM_AI_HTML = '''<!DOCTYPE html>
 
 # ===== BẮT ĐẦU PHẦN TỐI ƯU (thay thế từ ~dòng 552 trở xuống) =====
 
-# Cache chung để tránh load/scale nhiều lần mỗi frame
-_image_cache: Dict[str, pygame.Surface] = {}
-_scaled_cache: Dict[Tuple[str, int, int], pygame.Surface] = {}
+# Cache chung để tránh load/scale nhiều lần mỗi frame (ảnh nằm trong assets.AssetManager)
 _glow_cache: Dict[Tuple[int, int], pygame.Surface] = {}
-_text_surface_cache: Dict[Tuple[str, int, Tuple[int, int, int]], pygame.Surface] = {}
 
 # Tạo font nhỏ 1 lần (fallback nếu cần)
 try:
-    SMALL_FONT = pygame.font.Font(None, 20)
+    SMALL_FONT = config.get_font(None, 20)
 except Exception:
     SMALL_FONT = config.FONT  # fallback nhẹ
 
@@ -610,28 +608,13 @@ except Exception:
 def _load_image(path: str) -> Optional[pygame.Surface]:
     if not path:
         return None
-    if path in _image_cache:
-        return _image_cache[path]
-    try:
-        img = pygame.image.load(path).convert_alpha()
-        _image_cache[path] = img
-        return img
-    except Exception:
-        _image_cache[path] = None
-        return None
+    return assets.get(path)
 
-# Helper: get scaled image with cache
+# Helper: get scaled image with cache (dùng chung AssetManager)
 def _get_scaled_image(path: str, w: int, h: int) -> Optional[pygame.Surface]:
-    key = (path, w, h)
-    if key in _scaled_cache:
-        return _scaled_cache[key]
-    img = _load_image(path)
-    if img is None:
-        _scaled_cache[key] = None
+    if not path:
         return None
-    scaled = pygame.transform.smoothscale(img, (w, h))
-    _scaled_cache[key] = scaled
-    return scaled
+    return assets.get(path, (w, h), smooth=True)
 
 # Helper: create or get glow surface for size (cheap approximation)
 def _get_glow_surface(diameter: int, color: Tuple[int, int, int]) -> pygame.Surface:
@@ -650,12 +633,8 @@ def _get_glow_surface(diameter: int, color: Tuple[int, int, int]) -> pygame.Surf
 
 # Helper: cached text render
 def _render_text_cached(text: str, font: pygame.font.Font, color: Tuple[int, int, int]) -> pygame.Surface:
-    key = (text, id(font), color)
-    if key in _text_surface_cache:
-        return _text_surface_cache[key]
-    surf = font.render(text, True, color)
-    _text_surface_cache[key] = surf
-    return surf
+    # Dùng TextCache chung (LRU) của ui_elements
+    return ui_elements.render_text(text, font, color)
 
 # Tối ưu ModernButton: cache icon surfaces tại thuộc tính để không load mỗi frame
 class ModernButton(ui_elements.Button):
@@ -717,13 +696,8 @@ class ModernButton(ui_elements.Button):
 # SỬA LỖI: purchase với kiểm tra đủ điểm + tránh trừ nhiều lần nếu ko đủ
 def _purchase_avatar(avatar: Dict, game_state):
     price = avatar.get("price", 0)
-    if getattr(game_state, "point", 0) >= price:
-        game_state.point -= price
-        # chỉ append nếu chưa có
-        if avatar["path"] not in game_state.owned_avatars:
-            game_state.owned_avatars.append(avatar["path"])
-        game_state.avatar_path = avatar["path"]
-    else:
+    # trừ điểm + thêm avatar trong một bước (dưới lock của GameState)
+    if not game_state.purchase_avatar(avatar["path"], price):
         # nhẹ: show message hoặc in log (game_state có thể có method show_message)
         try:
             game_state.show_message("Không đủ điểm để mua avatar.")
@@ -732,6 +706,9 @@ def _purchase_avatar(avatar: Dict, game_state):
 
 def _use_avatar(avatar: Dict, game_state):
     if avatar["path"] in game_state.owned_avatars:
+        if game_state.avatar_path != avatar["path"]:
+            # Bỏ mọi bản scale của avatar cũ khỏi cache ảnh
+            assets.invalidate(game_state.avatar_path)
         game_state.avatar_path = avatar["path"]
     else:
         _purchase_avatar(avatar, game_state)
@@ -1169,7 +1146,7 @@ def _draw_avatar_card_status(surface: pygame.Surface, avatar: Dict, rect: pygame
     else:
         pygame.draw.rect(surface, (150, 150, 150), img_rect, border_radius=6)
 
-    name = SMALL_FONT.render(avatar["name"], True, config.COLORS.get("text", (240, 240, 240)))
+    name = ui_elements.render_text(avatar["name"], SMALL_FONT, config.COLORS.get("text", (240, 240, 240)))
     surface.blit(name, (rect.centerx - name.get_width() // 2, img_rect.bottom + 5))
 
     if current:
@@ -1179,7 +1156,7 @@ def _draw_avatar_card_status(surface: pygame.Surface, avatar: Dict, rect: pygame
     else:
         status_text, status_color = f"{avatar.get('price', 0)} ĐIỂM", (230, 140, 50)
 
-    status = SMALL_FONT.render(status_text, True, status_color)
+    status = ui_elements.render_text(status_text, SMALL_FONT, status_color)
     tag_rect = pygame.Rect(0, 0, status.get_width() + 12, status.get_height() + 6)
     tag_rect.centerx = rect.centerx
     tag_rect.y = rect.bottom - 25
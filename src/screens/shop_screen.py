@@ -1,10 +1,14 @@
 # shop_screen.py
 import pygame
 import config
+import ui_elements
 import os
 
 _images_loaded = False
 
+# Vùng ảnh có hiệu ứng hover của từng sản phẩm (cập nhật mỗi lần vẽ)
+item_hover_rects = []
+
 # Danh sách sản phẩm (chỉ định tên ảnh, giá, tên hiển thị)
 shop_items = [
     {"name": "Thẻ bảo vệ streak", "price": 150, "image": "item1.png", "hover": "item1_hover.png"},
@@ -48,11 +52,12 @@ def draw_shop(screen, font_title, font, colors, game_state, handle_button_click_
     shop_x = menu_width
 
     # Title
-    title = font_title.render("CỬA HÀNG", True, (30, 30, 30))
-    title_main = font_title.render("CỬA HÀNG", True, (255, 215, 0))
+    title = ui_elements.render_text("CỬA HÀNG", font_title, (30, 30, 30))
+    title_main = ui_elements.render_text("CỬA HÀNG", font_title, (255, 215, 0))
     screen.blit(title, (shop_x, 50))
     screen.blit(title_main, (shop_x - 3, 52))
     pygame.draw.line(screen, (255, 215, 0), (shop_x - 20, 110), (shop_x + 200, 110), 4)
+    del item_hover_rects[:]
 
     item_width, item_height = 300, 170
     item_margin = 140
@@ -73,6 +78,7 @@ def draw_shop(screen, font_title, font, colors, game_state, handle_button_click_
 
         if img_normal:  # chỉ khi có ảnh mới tính rect
             img_rect = img_normal.get_rect(center=(x + item_width // 2, y + 60))
+            item_hover_rects.append(img_rect)
             mouse_pos = pygame.mouse.get_pos()
             hover = img_rect.collidepoint(mouse_pos)
 
@@ -84,15 +90,15 @@ def draw_shop(screen, font_title, font, colors, game_state, handle_button_click_
 
 
         # Tên sản phẩm
-        name_text = config.FONT_SMALL.render(item["name"], True, (255, 255, 255))
+        name_text = ui_elements.render_text(item["name"], config.FONT_SMALL, (255, 255, 255))
         name_rect = name_text.get_rect(center=(x + item_width // 2 + 30, y + 35))
         screen.blit(name_text, name_rect)
 
         # Giá sản phẩm
-        price_text = font.render(f"{item['price']}", True, (255, 255, 0))
+        price_text = ui_elements.render_text(f"{item['price']}", font, (255, 255, 0))
         price_rect = price_text.get_rect(center=(x + item_width // 2 + 25, y + 75))
         screen.blit(price_text, price_rect)
 
-        coin_icon = font.render("$", True, (255, 255, 0))
+        coin_icon = ui_elements.render_text("$", font, (255, 255, 0))
         screen.blit(coin_icon, (price_rect.right + 3, price_rect.top))
 
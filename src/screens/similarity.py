@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Phát hiện câu hỏi gần trùng bằng MinHash + LSH.
+
+Hash MD5 chỉ bắt được câu giống hệt sau khi chuẩn hóa, nên hai câu khác nhau
+một từ hoặc đảo thứ tự đáp án vẫn lọt qua. Ở đây mỗi câu hỏi (kèm tập đáp án,
+không phụ thuộc thứ tự) được chia thành các shingle ký tự, tóm tắt bằng chữ ký
+MinHash và chia band vào các bucket LSH: chỉ những câu chung bucket mới được so
+sánh, nên tra cứu không phải duyệt toàn bộ ngân hàng câu hỏi.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+_MAX_HASH = (1 << 32) - 1
+_CHOICE_PREFIX = re.compile(r'^\s*[A-Da-d][.)]\s*')
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def normalize_question(question: str, choices) -> str:
+    """Chuỗi đại diện: câu hỏi + đáp án đã bỏ nhãn A./B. và sắp xếp"""
+    normalized_choices = sorted(
+        _NON_WORD.sub(' ', _CHOICE_PREFIX.sub('', str(c))).strip().lower() for c in choices
+    )
+    text = _NON_WORD.sub(' ', question).strip().lower()
+    return text + ' | ' + ' | '.join(normalized_choices)
+
+
+class MinHashIndex:
+    """
+    Args:
+        threshold : độ tương đồng Jaccard ước lượng để coi là gần trùng
+        num_perm  : số hàm băm của chữ ký MinHash
+        bands     : số band LSH (num_perm phải chia hết cho bands)
+        shingle   : độ dài shingle ký tự
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle: int = 4):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.clear()
+
+    def clear(self):
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._texts: Dict[str, str] = {}
+        self._buckets = defaultdict(list)
+        self._duplicates = defaultdict(list)
+        self._last = (None, None)
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """
+        Chữ ký MinHash kiểu one-permutation hashing: mỗi shingle chỉ băm một lần
+        rồi rơi vào một trong num_perm ngăn, ngăn giữ giá trị nhỏ nhất. Ngăn rỗng
+        mượn giá trị của ngăn kế tiếp (densification) để chữ ký luôn đủ dài.
+        """
+        if self._last[0] == text:
+            return self._last[1]
+        k = self.shingle
+        padded = f" {text} "
+        shingles = {padded[i:i + k] for i in range(max(1, len(padded) - k + 1))}
+
+        n = self.num_perm
+        bins = [None] * n
+        for s in shingles:
+            h = int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+            slot, value = h % n, h // n
+            if bins[slot] is None or value < bins[slot]:
+                bins[slot] = value
+
+        sig = []
+        for i in range(n):
+            offset = 0
+            while bins[(i + offset) % n] is None:
+                offset += 1
+            # Trộn offset vào giá trị mượn để ngăn rỗng không trùng ngẫu nhiên với ngăn thật
+            sig.append((bins[(i + offset) % n] + offset * 0x9E3779B97F4A7C15) & _MAX_HASH)
+        sig = tuple(sig)
+        self._last = (text, sig)
+        return sig
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [(band, sig[band * r:(band + 1) * r]) for band in range(self.bands)]
+
+    def query(self, text: str) -> Optional[Tuple[str, float]]:
+        """Câu đã có giống text nhất (khóa, độ tương đồng) nếu vượt threshold"""
+        sig = self.signature(text)
+        candidates = set()
+        for band_key in self._band_keys(sig):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            self.comparisons += 1
+            other = self._signatures[key]
+            similarity = sum(1 for x, y in zip(sig, other) if x == y) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def add(self, key: str, text: str):
+        if key in self._signatures:
+            return
+        sig = self.signature(text)
+        self._signatures[key] = sig
+        self._texts[key] = text
+        for band_key in self._band_keys(sig):
+            self._buckets[band_key].append(key)
+
+    def record_duplicate(self, key: str, text: str):
+        """Ghi lại câu bị loại vì gần trùng với câu key"""
+        if text not in self._duplicates[key]:
+            self._duplicates[key].append(text)
+
+    def clusters(self, limit: int = 10) -> List[Dict]:
+        """Các cụm gần trùng lớn nhất: câu đại diện và các biến thể bị loại"""
+        ranked = sorted(self._duplicates.items(), key=lambda item: len(item[1]), reverse=True)
+        return [
+            {"representative": self._texts.get(key, ""), "duplicates": list(texts)}
+            for key, texts in ranked[:limit]
+        ]
+
+    def get_stats(self) -> Dict:
+        return {
+            "indexed": len(self._signatures),
+            "buckets": len(self._buckets),
+            "comparisons": self.comparisons,
+            "near_duplicates": sum(len(v) for v in self._duplicates.values()),
+            "clusters": len(self._duplicates),
+        }
+
+
+class NearDuplicateSet(set):
+    """
+    Tập hash câu hỏi (như set cũ) kèm chỉ mục MinHash để tra câu gần trùng.
+
+    Vẫn dùng được ở mọi chỗ đang coi used_questions là set[str].
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        super().__init__()
+        self.index = MinHashIndex(threshold=threshold)
+
+    def clear(self):
+        super().clear()
+        self.index.clear()
+
+    def find_similar(self, question: str, choices) -> Optional[Tuple[str, float]]:
+        return self.index.query(normalize_question(question, choices))
+
+    def add_question(self, key: str, question: str, choices):
+        self.add(key)
+        self.index.add(key, normalize_question(question, choices))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Chia dòng (word wrap) dùng chung cho mọi màn hình.
+
+Các hàm wrap cũ gọi font.size() cho mỗi tiền tố dòng đang dài dần (O(n²) theo
+độ dài dòng), riêng từ quá dài còn đo từng ký tự, và được gọi lại mỗi frame.
+Ở đây mỗi từ chỉ được đo một lần cho mỗi font (cache độ rộng), dòng được ngắt
+tham lam trong một lượt bằng cách cộng độ rộng các từ, và kết quả chia dòng
+được ghi nhớ theo (text, font, max_width).
+"""
+
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TextLayout:
+    """
+    Args:
+        max_layouts       : số kết quả chia dòng giữ lại (LRU)
+        max_words_per_font: số từ được nhớ độ rộng cho mỗi font, vượt quá thì xóa
+    """
+
+    def __init__(self, max_layouts=512, max_words_per_font=8192):
+        self.max_layouts = max_layouts
+        self.max_words_per_font = max_words_per_font
+        # Font dùng làm khóa trực tiếp (so sánh theo identity) như TextCache
+        self._widths = {}
+        self._layouts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.measured = 0
+
+    def _width_table(self, font):
+        table = self._widths.get(font)
+        if table is None or len(table) > self.max_words_per_font:
+            table = {" ": font.size(" ")[0]}
+            self._widths[font] = table
+        return table
+
+    def measure(self, word, font):
+        """Độ rộng (pixel) của một từ, đo bằng font.size() một lần rồi nhớ lại"""
+        table = self._width_table(font)
+        width = table.get(word)
+        if width is None:
+            width = font.size(word)[0]
+            table[word] = width
+            self.measured += 1
+        return width
+
+    def _split_long_word(self, word, font, max_width):
+        """
+        Tách từ rộng hơn max_width: (các phần đầy, phần còn lại, độ rộng phần còn lại).
+
+        Tổng độ rộng từng ký tự lệch khá nhiều so với độ rộng thật của cả chuỗi,
+        nên mỗi phần được tìm nhị phân theo font.size() của tiền tố (O(log n) lần đo).
+        """
+        parts = []
+        while True:
+            width = font.size(word)[0]
+            if width <= max_width or len(word) == 1:
+                return parts, word, width
+            lo, hi = 1, len(word) - 1
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if font.size(word[:mid])[0] <= max_width:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            parts.append(word[:lo])
+            word = word[lo:]
+
+    def _break_paragraph(self, paragraph, font, max_width, lines):
+        space = self._width_table(font)[" "]
+        current, current_width = [], 0
+        for word in paragraph.split():
+            width = self.measure(word, font)
+            if current and current_width + space + width <= max_width:
+                current.append(word)
+                current_width += space + width
+                continue
+            if current:
+                lines.append(" ".join(current))
+            if width > max_width:
+                full_parts, rest, width = self._split_long_word(word, font, max_width)
+                lines.extend(full_parts)
+                word = rest
+            current, current_width = [word], width
+        if current:
+            lines.append(" ".join(current))
+
+    def wrap(self, text, font, max_width) -> Tuple[str, ...]:
+        """
+        Chia text thành các dòng vừa max_width.
+
+        Xuống dòng "\\n" trong text được giữ (đoạn trống thành dòng rỗng), khoảng
+        trắng liên tiếp được gom lại, từ dài hơn max_width bị tách theo ký tự.
+        Độ rộng dòng là tổng độ rộng từ và dấu cách (bỏ qua kerning giữa các từ).
+
+        Returns:
+            tuple các dòng (dùng chung giữa các lần gọi, không được sửa)
+        """
+        if not text:
+            return ()
+        key = (text, font, int(max_width))
+        lines = self._layouts.get(key)
+        if lines is not None:
+            self._layouts.move_to_end(key)
+            self.hits += 1
+            return lines
+
+        self.misses += 1
+        result = []
+        for paragraph in str(text).split("\n"):
+            if paragraph.strip():
+                self._break_paragraph(paragraph, font, max(1, int(max_width)), result)
+            else:
+                result.append("")
+        # Bỏ dòng rỗng thừa ở đầu/cuối (do "\n" ở đầu/cuối text)
+        while result and not result[-1]:
+            result.pop()
+        while result and not result[0]:
+            result.pop(0)
+        lines = tuple(result)
+
+        self._layouts[key] = lines
+        if len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+        return lines
+
+    def clear(self):
+        self._widths.clear()
+        self._layouts.clear()
+
+    def get_cache_info(self):
+        """Thông tin cache để debug"""
+        return {
+            "layouts": len(self._layouts),
+            "max_layouts": self.max_layouts,
+            "fonts": len(self._widths),
+            "words": sum(len(t) for t in self._widths.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "measured": self.measured,
+        }
+
+
+# Instance dùng chung
+text_layout = TextLayout()
+
+
+def wrap_text(text, font, max_width):
+    """Các dòng của text sau khi chia theo max_width (có cache)"""
+    return text_layout.wrap(text, font, max_width)
@@ -1,13 +1,65 @@
 import pygame
 import time
 import config # Import config for constants like WIDTH, HEIGHT
+import textlayout
 pygame.init()
 pygame.font.init()
 import os
 
+from collections import OrderedDict
+
 # Cooldown for button clicks (to prevent multiple rapid clicks)
 _last_click_time = 0
 
+
+class TextCache:
+    """
+    Cache surface chữ đã render, dùng chung cho mọi màn hình (LRU có giới hạn).
+
+    Khóa là (text, font, color, antialias). Font được giữ làm khóa trực tiếp
+    (so sánh theo identity) nên không bị nhầm khi id() của font cũ được tái sử dụng.
+    """
+
+    def __init__(self, max_items=1024):
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font, color, antialias=True):
+        key = (text, font, tuple(color), bool(antialias))
+        surf = self._cache.get(key)
+        if surf is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self._cache[key] = surf
+        if len(self._cache) > self.max_items:
+            self._cache.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_cache_info(self):
+        """Thông tin cache để debug"""
+        return {
+            "items": len(self._cache),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Instance dùng chung
+text_cache = TextCache()
+
+def render_text(text, font, color, antialias=True):
+    """Thay cho font.render(text, antialias, color) nhưng lấy từ cache nếu đã render"""
+    return text_cache.render(text, font, color, antialias)
+
 class CircleButton:
     def __init__(self, x, y, radius, callback, color, hover_color=None, click_sound=None):
         self.x = x
@@ -48,7 +100,7 @@ class Button:
         pygame.draw.rect(surface, current_color, self.rect, border_radius=self.border_radius)
         
         if self.text:
-            text_render = config.FONT.render(self.text, True, config.COLORS["white"])
+            text_render = render_text(self.text, config.FONT, config.COLORS["white"])
             text_rect = text_render.get_rect(center=self.rect.center)
             surface.blit(text_render, text_rect)
 
@@ -61,7 +113,6 @@ class Button:
                     self.click_sound.play()
                 self.callback()
                 _last_click_time = current_time
-                pygame.display.flip()  # Cập nhật màn hình ngay sau khi nhấn
                 return True
         return False
 def draw_button(surface, text, x, y, width, height, color, hover_color, action=None):
@@ -88,36 +139,14 @@ def draw_rounded_rect(surface, color, rect, radius=20, border=0, border_color=No
     
     inner_rect = rect.inflate(-border*2, -border*2)
     pygame.draw.rect(surface, color, inner_rect, 0, border_radius=max(0, radius-border))
-def draw_multiline_text(surface, text, x, y, font, color, max_width, line_spacing=10):
-    words = text.split(' ')
-    lines = []
-    current_line = []
-
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        if font.size(test_line)[0] <= max_width:
-            current_line.append(word)
-        else:
-            lines.append(' '.join(current_line))
-            current_line = [word]
-
-    if current_line:
-        lines.append(' '.join(current_line))
-
-    for i, line in enumerate(lines):
-        text_surface = font.render(line, True, color)
-        surface.blit(text_surface, (x, y + i * (font.get_height() + line_spacing)))
-
-    return len(lines)
-
 def draw_text_centered(screen, text, x, y, font, color):
-    rendered = font.render(text, True, color)
+    rendered = render_text(text, font, color)
     rect = rendered.get_rect(center=(x, y))
     screen.blit(rendered, rect)
 
 
 def draw_feedback(surface, text, y, font=config.FONT, color=config.COLORS["text"]):
-    surf = font.render(text, True, color)
+    surf = render_text(text, font, color)
     rect = surf.get_rect(center=(config.WIDTH//2 + 50, y)) # Adjusted center for quiz feedback
     surface.blit(surf, rect)
 
@@ -125,7 +154,7 @@ def draw_message(surface, msg, font, colors, screen_width, screen_height):
     msg_box = pygame.Rect(screen_width // 2 - 200, screen_height - 70, 400, 50)
     pygame.draw.rect(surface, colors["white"], msg_box, border_radius=10)
     pygame.draw.rect(surface, colors["black"], msg_box, 2, border_radius=10)
-    msg_surface = font.render(msg, True, colors["accent"])
+    msg_surface = render_text(msg, font, colors["accent"])
     surface.blit(msg_surface, (msg_box.centerx - msg_surface.get_width()//2, msg_box.centery - msg_surface.get_height()//2))
 
 class RecButton:
@@ -157,7 +186,6 @@ class RecButton:
                     self.click_sound.play()
                 self.callback()
                 _last_click_time = current_time
-                pygame.display.flip()  # Cập nhật màn hình ngay sau khi nhấn
                 return True
         return False
 def draw_button(surface, text, x, y, width, height, color, hover_color, action=None):
@@ -184,36 +212,14 @@ def draw_rounded_rect(surface, color, rect, radius=20, border=0, border_color=No
     
     inner_rect = rect.inflate(-border*2, -border*2)
     pygame.draw.rect(surface, color, inner_rect, 0, border_radius=max(0, radius-border))
-def draw_multiline_text(surface, text, x, y, font, color, max_width, line_spacing=10):
-    words = text.split(' ')
-    lines = []
-    current_line = []
-
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        if font.size(test_line)[0] <= max_width:
-            current_line.append(word)
-        else:
-            lines.append(' '.join(current_line))
-            current_line = [word]
-
-    if current_line:
-        lines.append(' '.join(current_line))
-
-    for i, line in enumerate(lines):
-        text_surface = font.render(line, True, color)
-        surface.blit(text_surface, (x, y + i * (font.get_height() + line_spacing)))
-
-    return len(lines)
-
 def draw_text_centered(screen, text, x, y, font, color):
-    rendered = font.render(text, True, color)
+    rendered = render_text(text, font, color)
     rect = rendered.get_rect(center=(x, y))
     screen.blit(rendered, rect)
 
 
 def draw_feedback(surface, text, y, font=config.FONT, color=config.COLORS["text"]):
-    surf = font.render(text, True, color)
+    surf = render_text(text, font, color)
     rect = surf.get_rect(center=(config.WIDTH//2 + 50, y)) # Adjusted center for quiz feedback
     surface.blit(surf, rect)
 
@@ -221,7 +227,7 @@ def draw_message(surface, msg, font, colors, screen_width, screen_height):
     msg_box = pygame.Rect(screen_width // 2 - 200, screen_height - 70, 400, 50)
     pygame.draw.rect(surface, colors["white"], msg_box, border_radius=10)
     pygame.draw.rect(surface, colors["black"], msg_box, 2, border_radius=10)
-    msg_surface = font.render(msg, True, colors["accent"])
+    msg_surface = render_text(msg, font, colors["accent"])
     surface.blit(msg_surface, (msg_box.centerx - msg_surface.get_width()//2, msg_box.centery - msg_surface.get_height()//2))
 
 class TextButton:
@@ -242,18 +248,17 @@ class TextButton:
         self.callback = callback
         self.click_sound = click_sound
         self.is_hover = False
-        font_path=os.path.join(config.ASSETS_DIR,"font","svn.otf")
-        self.font=pygame.font.Font(font_path, 24)
-        self.text_surface = self.font.render(str(self.text), True, (20, 60, 20))
+        self.font=config.get_font(config.SVN_FONT_PATH, 24)
+        self.text_surface = render_text(str(self.text), self.font, (20, 60, 20))
         self.rect = self.text_surface.get_rect(center=(x, y))
 
     def draw(self, surface):
         mouse_pos = pygame.mouse.get_pos()
         if self.rect.collidepoint(mouse_pos):
-            self.text_surface = self.font.render(str(self.text), True, (90, 160, 90))
+            self.text_surface = render_text(str(self.text), self.font, (90, 160, 90))
             self.is_hover = True
         else:
-            self.text_surface = self.font.render(str(self.text), True, (20, 60, 20))
+            self.text_surface = render_text(str(self.text), self.font, (20, 60, 20))
             self.is_hover = False
         surface.blit(self.text_surface, self.rect)
         self.rect = self.text_surface.get_rect(center=(self.x, self.y))
@@ -299,36 +304,26 @@ def draw_rounded_rect(surface, color, rect, radius=20, border=0, border_color=No
     
     inner_rect = rect.inflate(-border*2, -border*2)
     pygame.draw.rect(surface, color, inner_rect, 0, border_radius=max(0, radius-border))
-def draw_multiline_text(surface, text, x, y, font, color, max_width, line_spacing=10):
-    words = text.split(' ')
-    lines = []
-    current_line = []
-
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        if font.size(test_line)[0] <= max_width:
-            current_line.append(word)
-        else:
-            lines.append(' '.join(current_line))
-            current_line = [word]
-
-    if current_line:
-        lines.append(' '.join(current_line))
+def wrap_text(text, font, max_width):
+    """Chia text thành các dòng vừa max_width (dùng chung textlayout, có cache)"""
+    return textlayout.wrap_text(text, font, max_width)
 
+def draw_multiline_text(surface, text, x, y, font, color, max_width, line_spacing=10):
+    lines = wrap_text(text, font, max_width)
     for i, line in enumerate(lines):
-        text_surface = font.render(line, True, color)
+        text_surface = render_text(line, font, color)
         surface.blit(text_surface, (x, y + i * (font.get_height() + line_spacing)))
 
     return len(lines)
 
 def draw_text_centered(screen, text, x, y, font, color):
-    rendered = font.render(text, True, color)
+    rendered = render_text(text, font, color)
     rect = rendered.get_rect(center=(x, y))
     screen.blit(rendered, rect)
 
 
 def draw_feedback(surface, text, y, font=config.FONT, color=config.COLORS["text"]):
-    surf = font.render(text, True, color)
+    surf = render_text(text, font, color)
     rect = surf.get_rect(center=(config.WIDTH//2 + 50, y)) # Adjusted center for quiz feedback
     surface.blit(surf, rect)
 
@@ -336,5 +331,36 @@ def draw_message(surface, msg, font, colors, screen_width, screen_height):
     msg_box = pygame.Rect(screen_width // 2 - 200, screen_height - 70, 400, 50)
     pygame.draw.rect(surface, colors["white"], msg_box, border_radius=10)
     pygame.draw.rect(surface, colors["black"], msg_box, 2, border_radius=10)
-    msg_surface = font.render(msg, True, colors["accent"])
-    surface.blit(msg_surface, (msg_box.centerx - msg_surface.get_width()//2, msg_box.centery - msg_surface.get_height()//2))
\ No newline at end of file
+    msg_surface = render_text(msg, font, colors["accent"])
+    surface.blit(msg_surface, (msg_box.centerx - msg_surface.get_width()//2, msg_box.centery - msg_surface.get_height()//2))
+
+class WidgetRegistry:
+    """
+    Giữ lại danh sách widget (nút) đã dựng cho từng màn hình.
+
+    Mỗi màn hình được lưu kèm một "khóa" mô tả trạng thái mà các nút phụ thuộc
+    (vd: bài học đang mở, trang hiện tại, mtime của file dữ liệu). Chỉ khi khóa
+    thay đổi thì builder mới được gọi lại, còn lại mỗi event chỉ duyệt qua list
+    nút đã có sẵn.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.builds = 0
+
+    def get(self, screen_name, key, builder):
+        """Trả về widget của màn hình, dựng lại bằng builder() nếu khóa thay đổi"""
+        entry = self._entries.get(screen_name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        widgets = builder() or []
+        self._entries[screen_name] = (key, widgets)
+        self.builds += 1
+        return widgets
+
+    def invalidate(self, screen_name=None):
+        """Buộc dựng lại widget của một màn hình (hoặc tất cả nếu screen_name=None)"""
+        if screen_name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(screen_name, None)
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""chunk_stream phải phủ cả tài liệu ngay cả khi không có điểm neo."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from screens import chunking  # noqa: E402
+
+
+def test_stream_chunks_follow_planned_cut_points(monkeypatch):
+    # Không đơn vị nào là điểm neo và max_size rất lớn: chỉ còn mốc dự kiến
+    monkeypatch.setattr(chunking, "_unit_hash", lambda unit: 1)
+    chunker = chunking.ContentDefinedChunker(max_ratio=1000)
+    units = [f"[{i}]" + "y" * 496 for i in range(2000)]
+    total = sum(len(u) for u in units)
+
+    chunks = chunker.chunk_stream(iter(units), total, len(units), 5, 8000)
+
+    assert [c.split("]")[0] + "]" for c in chunks] == ["[0]", "[401]", "[801]", "[1201]", "[1601]"]
+    assert all(len(c) <= 8000 + 2 * 16 for c in chunks)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Hình dạng cấp cao nhất của structured output phải khớp schema."""
+
+import json
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from screens import lesson_schema  # noqa: E402
+from screens.content_processor import ContentProcessor  # noqa: E402
+
+
+def _lesson(**extra):
+    lesson = {
+        "name": "Bài 1",
+        "title": "Tiêu đề",
+        "content": "Nội dung",
+        "questions": [{
+            "question": "Câu hỏi?",
+            "choices": ["A", "B", "C", "D"],
+            "correct_answer": 0,
+            "difficulty": "easy",
+        }],
+    }
+    lesson.update(extra)
+    return lesson
+
+
+def _processor():
+    # Không cần API key: chỉ dùng phần parse
+    processor = ContentProcessor.__new__(ContentProcessor)
+    processor.parse_stats = {"structured": 0, "salvaged": 0, "failed": 0}
+    return processor
+
+
+def test_object_schema_unwraps_single_element_array():
+    processor = _processor()
+    parsed = processor._parse_structured(json.dumps([_lesson()]), lesson_schema.LESSON_SCHEMA)
+    assert isinstance(parsed, dict)
+    assert parsed["name"] == "Bài 1"
+
+
+def test_object_schema_rejects_other_shapes():
+    processor = _processor()
+    text = json.dumps([_lesson(), _lesson(name="Bài 2")])
+    assert processor._parse_structured(text, lesson_schema.LESSON_SCHEMA) is None
+    assert processor._parse_structured('"chuỗi"', lesson_schema.LESSON_SCHEMA) is None
+
+
+def test_array_schema_wraps_bare_object():
+    processor = _processor()
+    parsed = processor._parse_structured(json.dumps(_lesson(lesson_number=1)),
+                                         lesson_schema.LESSON_BATCH_SCHEMA)
+    assert isinstance(parsed, list) and len(parsed) == 1
+    assert parsed[0]["lesson_number"] == 1
+
+
+def test_array_schema_rejects_non_object_items():
+    processor = _processor()
+    assert processor._parse_structured('["a", "b"]', lesson_schema.LESSON_BATCH_SCHEMA) is None